@@ -0,0 +1,2 @@
+# keep a build daemon running, build with python3 src/build_client.py
+python3 src/build_daemon.py "/static-site-generator-py/"
@@ -0,0 +1,24 @@
+# build the site as N shards in separate processes, then merge them into docs/
+shards=${1:-4}
+basepath=${2:-/static-site-generator-py/}
+
+pids=""
+for i in $(seq 1 "$shards"); do
+    python3 src/main.py "$basepath" --shard "$i/$shards" > /dev/null &
+    pids="$pids $!"
+done
+
+status=0
+for pid in $pids; do
+    wait "$pid" || status=1
+done
+if [ "$status" -ne 0 ]; then
+    echo "a shard failed to build" >&2
+    exit 1
+fi
+
+dirs=""
+for i in $(seq 1 "$shards"); do
+    dirs="$dirs .cache/shards/$i-of-$shards"
+done
+python3 src/main.py --merge $dirs
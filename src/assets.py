@@ -0,0 +1,140 @@
+import json
+import os
+
+from build_manifest import hash_text
+from file_utils import (
+    copy_file,
+    files_match,
+    hash_file,
+    walk_files,
+    write_if_changed,
+)
+
+# static files that get a content hash in their name. anything else (e.g.
+# robots.txt, favicon.ico) keeps the name other sites expect
+FINGERPRINT_EXTENSIONS = (
+    ".css",
+    ".js",
+    ".png",
+    ".jpg",
+    ".jpeg",
+    ".gif",
+    ".webp",
+    ".svg",
+    ".woff",
+    ".woff2",
+)
+
+# hex digits of the content hash kept in fingerprinted names
+HASH_LENGTH = 10
+
+
+def fingerprint_path(rel_path, digest):
+    """return rel_path with a content hash before its extension"""
+    root, ext = os.path.splitext(rel_path)
+    return f"{root}.{digest[:HASH_LENGTH]}{ext}"
+
+
+class AssetMap:
+    """
+    maps the root-relative url of every static file to the url of its
+    published copy, e.g. /index.css to /index.1a2b3c4d5e.css. two maps with
+    the same urls compare (and hash) equal, so compiled templates can be
+    cached per map.
+    """
+
+    def __init__(self, files, hashes=None):
+        # files maps a static file's path relative to static/ to the path
+        # it is published under
+        self.files = files
+        self.urls = {
+            "/" + src.replace(os.sep, "/"): "/" + dst.replace(os.sep, "/")
+            for src, dst in files.items()
+        }
+        # (size, mtime_ns, sha256) per static file, to skip rehashing
+        self.hashes = hashes if hashes is not None else {}
+        self.digest = hash_text(json.dumps(self.urls, sort_keys=True))
+
+    def get(self, url, default=None):
+        return self.urls.get(url, default)
+
+    def __eq__(self, other):
+        return isinstance(other, AssetMap) and self.digest == other.digest
+
+    def __hash__(self):
+        return hash(self.digest)
+
+
+def scan_assets(static_dir, previous_hashes=None):
+    """
+    hash every static file and return its AssetMap. files whose size and
+    mtime match previous_hashes reuse the recorded hash instead of being
+    read again.
+    """
+    previous_hashes = previous_hashes or {}
+    files = {}
+    hashes = {}
+    for rel_path in sorted(walk_files(static_dir)):
+        src_path = os.path.join(static_dir, rel_path)
+        if not rel_path.lower().endswith(FINGERPRINT_EXTENSIONS):
+            files[rel_path] = rel_path
+            continue
+
+        st = os.stat(src_path)
+        record = previous_hashes.get(rel_path)
+        if record is not None and record[:2] == [st.st_size, st.st_mtime_ns]:
+            digest = record[2]
+        else:
+            digest = hash_file(src_path)
+        hashes[rel_path] = [st.st_size, st.st_mtime_ns, digest]
+        files[rel_path] = fingerprint_path(rel_path, digest)
+    return AssetMap(files, hashes)
+
+
+def load_hashes(path):
+    """load the static file hashes recorded by the previous build"""
+    try:
+        with open(path, "r") as f:
+            hashes = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return hashes if isinstance(hashes, dict) else {}
+
+
+def save_hashes(assets, path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(assets.hashes, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def publish_assets(assets, static_dir, dest_dir, stats=None):
+    """
+    copy static files to dest_dir under their fingerprinted names and return
+    the paths written. files already published are left alone.
+    """
+    outputs = []
+    for src, dst in assets.files.items():
+        src_path = os.path.join(static_dir, src)
+        dst_path = os.path.join(dest_dir, dst)
+        outputs.append(dst_path)
+        if files_match(src_path, dst_path):
+            if stats is not None:
+                stats.assets_unchanged += 1
+            continue
+        os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+        copy_file(src_path, dst_path)
+        print(f"Copied file: {src_path} -> {dst_path}")
+        if stats is not None:
+            stats.assets_copied += 1
+    return outputs
+
+
+def write_asset_manifest(assets, path):
+    """write the url of every published asset, for CDN and deploy tooling"""
+    data = json.dumps(assets.urls, indent=1, sort_keys=True).encode("utf-8")
+    # left untouched when unchanged, so it isn't recompressed or redeployed
+    write_if_changed(path, data)
@@ -0,0 +1,120 @@
+import os
+import random
+
+WORDS = (
+    "elf ring shadow mountain river forest tower kingdom sword wizard hobbit "
+    "dragon journey council fellowship harbor valley lantern ancient silver"
+).split()
+
+
+class CorpusConfig:
+    """knobs for the synthetic markdown generator"""
+
+    def __init__(
+        self,
+        pages=100,
+        page_size=4000,
+        link_density=0.05,
+        emphasis_density=0.05,
+        block_mix=None,
+        seed=1,
+    ):
+        self.pages = pages
+        # approximate characters of markdown per page
+        self.page_size = page_size
+        # chance that any given word becomes a link / emphasized span
+        self.link_density = link_density
+        self.emphasis_density = emphasis_density
+        # relative weights of each block kind
+        self.block_mix = block_mix or {
+            "paragraph": 6,
+            "heading": 1,
+            "ulist": 1,
+            "olist": 1,
+            "code": 1,
+            "quote": 1,
+        }
+        self.seed = seed
+
+
+def generate_page(rng, config, index):
+    """return the markdown text of one synthetic page"""
+    kinds = list(config.block_mix)
+    weights = [config.block_mix[kind] for kind in kinds]
+
+    blocks = [f"# Page {index}"]
+    size = len(blocks[0])
+    while size < config.page_size:
+        kind = rng.choices(kinds, weights)[0]
+        block = BLOCK_MAKERS[kind](rng, config)
+        blocks.append(block)
+        size += len(block) + 2
+    return "\n\n".join(blocks) + "\n"
+
+
+def generate_corpus(root, config):
+    """write config.pages markdown files under root, nested a few levels deep"""
+    rng = random.Random(config.seed)
+    total_bytes = 0
+    for i in range(config.pages):
+        section = os.path.join(root, f"section-{i % 10}", f"group-{i % 7}")
+        os.makedirs(section, exist_ok=True)
+        markdown = generate_page(rng, config, i)
+        with open(os.path.join(section, f"page-{i}.md"), "w") as f:
+            f.write(markdown)
+        total_bytes += len(markdown.encode("utf-8"))
+    return total_bytes
+
+
+def _inline_text(rng, config, words):
+    parts = []
+    for _ in range(words):
+        word = rng.choice(WORDS)
+        roll = rng.random()
+        if roll < config.link_density:
+            parts.append(f"[{word}](/section-{rng.randrange(10)}/{word})")
+        elif roll < config.link_density + config.emphasis_density:
+            parts.append(rng.choice(("**{}**", "_{}_", "`{}`")).format(word))
+        else:
+            parts.append(word)
+    return " ".join(parts)
+
+
+def _paragraph(rng, config):
+    return _inline_text(rng, config, rng.randint(20, 80))
+
+
+def _heading(rng, config):
+    return "#" * rng.randint(2, 4) + " " + _inline_text(rng, config, 4)
+
+
+def _ulist(rng, config):
+    items = rng.randint(2, 8)
+    return "\n".join("- " + _inline_text(rng, config, 8) for _ in range(items))
+
+
+def _olist(rng, config):
+    items = rng.randint(2, 8)
+    return "\n".join(
+        f"{i}. " + _inline_text(rng, config, 8) for i in range(1, items + 1)
+    )
+
+
+def _code(rng, config):
+    lines = [f"def {rng.choice(WORDS)}():"]
+    lines.extend(f"    return '{rng.choice(WORDS)}'" for _ in range(rng.randint(1, 6)))
+    return "```\n" + "\n".join(lines) + "\n```"
+
+
+def _quote(rng, config):
+    return "\n".join("> " + _inline_text(rng, config, 10) for _ in range(3))
+
+
+BLOCK_MAKERS = {
+    "paragraph": _paragraph,
+    "heading": _heading,
+    "ulist": _ulist,
+    "olist": _olist,
+    "code": _code,
+    "quote": _quote,
+}
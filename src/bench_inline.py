@@ -0,0 +1,151 @@
+import argparse
+import re
+import timeit
+
+from inline_markdown import split_nodes_delimiter, split_nodes_link, text_to_textnodes
+from textnode import TextNode, TextType
+
+
+def chained_text_to_textnodes(text):
+    """
+    the previous multi-pass implementation, kept for comparison. it uses the
+    legacy image and link splitters below, not the ones inline_markdown has
+    now, so later changes there don't move the baseline
+    """
+    nodes = [TextNode(text, TextType.TEXT)]
+    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+    nodes = split_nodes_delimiter(nodes, "*", TextType.ITALIC)
+    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+    nodes = legacy_split_nodes_image(nodes)
+    nodes = legacy_split_nodes_link(nodes)
+    return nodes
+
+
+def legacy_split_nodes_image(old_nodes):
+    """the previous image splitter, kept for comparison like the link one"""
+    new_nodes = []
+    for node in old_nodes:
+        if node.text_type != TextType.TEXT:
+            new_nodes.append(node)
+            continue
+
+        images = re.findall(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)", node.text)
+        if len(images) == 0:
+            new_nodes.append(node)
+            continue
+
+        original_text = node.text
+        for image in images:
+            parts = original_text.split(f"![{image[0]}]({image[1]})", 1)
+            if parts[0] != "":
+                new_nodes.append(TextNode(parts[0], TextType.TEXT))
+            new_nodes.append(TextNode(image[0], TextType.IMAGE, image[1]))
+            original_text = parts[1]
+
+        if original_text != "":
+            new_nodes.append(TextNode(original_text, TextType.TEXT))
+
+    return new_nodes
+
+
+def legacy_split_nodes_link(old_nodes):
+    """
+    the previous link splitter, kept for comparison: re.findall with a string
+    pattern on every node, then a str.split per link on the remaining text
+    """
+    new_nodes = []
+    for node in old_nodes:
+        if node.text_type != TextType.TEXT:
+            new_nodes.append(node)
+            continue
+
+        links = re.findall(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)", node.text)
+        if len(links) == 0:
+            new_nodes.append(node)
+            continue
+
+        original_text = node.text
+        for link in links:
+            parts = original_text.split(f"[{link[0]}]({link[1]})", 1)
+            if parts[0] != "":
+                new_nodes.append(TextNode(parts[0], TextType.TEXT))
+            new_nodes.append(TextNode(link[0], TextType.LINK, link[1]))
+            original_text = parts[1]
+
+        if original_text != "":
+            new_nodes.append(TextNode(original_text, TextType.TEXT))
+
+    return new_nodes
+
+
+def make_plain_nodes(count):
+    """build text nodes like a page's worth of paragraphs without markup"""
+    return [
+        TextNode(f"plain sentence number {i} with nothing to parse", TextType.TEXT)
+        for i in range(count)
+    ]
+
+
+def make_link_nodes(count):
+    """build text nodes that each hold a few links"""
+    return [TextNode(make_link_paragraph(3), TextType.TEXT) for _ in range(count)]
+
+
+def make_link_paragraph(links):
+    """build a paragraph that is nothing but links"""
+    return "".join(f"see [page {i}](/blog/post-{i}) and " for i in range(links))
+
+
+def make_mixed_paragraph(links):
+    """build a paragraph with the given number of links and some emphasis"""
+    parts = []
+    for i in range(links):
+        parts.append(f"see [page {i}](/blog/post-{i}) and ")
+        if i % 10 == 0:
+            parts.append(f"**bold {i}** with *italic* and `code` then ")
+        if i % 25 == 0:
+            parts.append(f"![figure {i}](/images/fig-{i}.png) ")
+    return "".join(parts)
+
+
+def bench(func, text, repeat):
+    """return the best time per call in milliseconds"""
+    timer = timeit.Timer(lambda: func(text))
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark inline markdown parsing")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    header = f"{'paragraph':>10} {'links':>6} {'chained ms':>12} {'single-pass ms':>15}"
+    print(f"{header} {'speedup':>8}")
+    for name, make in (("links", make_link_paragraph), ("mixed", make_mixed_paragraph)):
+        for links in (10, 100, 500, 1000, 5000):
+            text = make(links)
+            assert chained_text_to_textnodes(text) == text_to_textnodes(text)
+            chained = bench(chained_text_to_textnodes, text, args.repeat)
+            single = bench(text_to_textnodes, text, args.repeat)
+            print(
+                f"{name:>10} {links:>6} {chained:>12.3f} {single:>15.3f} "
+                f"{chained / single:>7.1f}x"
+            )
+
+    print(f"\n{'nodes':>10} {'count':>6} {'legacy ms':>12} {'compiled ms':>15}")
+    for name, make in (("plain", make_plain_nodes), ("links", make_link_nodes)):
+        for count in (100, 1000, 10000):
+            nodes = make(count)
+            assert legacy_split_nodes_link(nodes) == split_nodes_link(nodes)
+            legacy = bench(legacy_split_nodes_link, nodes, args.repeat)
+            fast = bench(split_nodes_link, nodes, args.repeat)
+            print(
+                f"{name:>10} {count:>6} {legacy:>12.3f} {fast:>15.3f} "
+                f"{legacy / fast:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
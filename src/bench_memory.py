@@ -0,0 +1,145 @@
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import tracemalloc
+
+from block_markdown import generate_page, markdown_to_html_node
+from htmlnode import LeafNode
+from textnode import TextNode, TextType
+
+
+class DictTextNode:
+    """TextNode layout before __slots__, kept for comparison"""
+
+    def __init__(self, text, text_type, url=None):
+        self.text = text
+        self.text_type = text_type
+        self.url = url
+
+
+class DictLeafNode:
+    """LeafNode layout before __slots__, kept for comparison"""
+
+    def __init__(self, tag, value, props=None):
+        self.tag = tag
+        self.value = value
+        self.children = None
+        self.props = props
+
+
+def bytes_per_object(factory, count):
+    """
+    measure the average allocation size of objects made by factory.
+    factories share their attribute values, so only the objects are counted.
+    """
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    objects = [factory() for _ in range(count)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    total = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    # don't count the list holding the objects
+    total -= objects.__sizeof__()
+    return total / count
+
+
+def count_nodes(node):
+    """count html nodes in a tree"""
+    total = 1
+    for child in node.children or ():
+        total += count_nodes(child)
+    return total
+
+
+def make_page(paragraphs):
+    """build a synthetic page dominated by inline spans"""
+    parts = ["# Synthetic page"]
+    for i in range(paragraphs):
+        parts.append(
+            f"Paragraph {i} has **bold**, *italic*, `code` and a "
+            f"[link](/blog/{i}) plus ![image](/images/{i}.png) inline."
+        )
+        parts.append(f"- item {i}\n- item with **bold**\n- item with [link](/x)")
+    return "\n\n".join(parts)
+
+
+def peak_bytes(func):
+    """return the peak traced memory while running func"""
+    tracemalloc.start()
+    result = func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark node memory usage")
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--paragraphs", type=int, default=2_000)
+    parser.add_argument(
+        "--large-pages",
+        type=int,
+        default=10,
+        help="copies of the synthetic page in the streamed page benchmark",
+    )
+    args = parser.parse_args()
+
+    text = "span"
+    props = {"href": "/x"}
+    rows = [
+        (
+            "TextNode",
+            bytes_per_object(lambda: DictTextNode(text, TextType.TEXT), args.count),
+            bytes_per_object(lambda: TextNode(text, TextType.TEXT), args.count),
+        ),
+        (
+            "LeafNode",
+            bytes_per_object(lambda: DictLeafNode("a", text, props), args.count),
+            bytes_per_object(lambda: LeafNode("a", text, props), args.count),
+        ),
+    ]
+
+    print(f"{'node':>10} {'__dict__ B':>11} {'__slots__ B':>12} {'saved':>7}")
+    for name, dict_size, slot_size in rows:
+        saved = 1 - slot_size / dict_size
+        print(f"{name:>10} {dict_size:>11.1f} {slot_size:>12.1f} {saved:>6.0%}")
+
+    markdown = make_page(args.paragraphs)
+    peak, root = peak_bytes(lambda: markdown_to_html_node(markdown))
+    nodes = count_nodes(root)
+    leaf_saving = rows[1][1] - rows[1][2]
+    print()
+    print(f"page: {len(markdown):,} bytes of markdown, {nodes:,} html nodes")
+    print(f"peak while parsing: {peak / 1024:,.0f} KiB")
+    print(f"saved on html nodes alone: ~{nodes * leaf_saving / 1024:,.0f} KiB")
+
+    # whole-file vs streamed page generation on a much larger page
+    with tempfile.TemporaryDirectory() as root:
+        md_path = os.path.join(root, "big.md")
+        template_path = os.path.join(root, "template.html")
+        dest_path = os.path.join(root, "big.html")
+        with open(md_path, "w") as f:
+            for _ in range(args.large_pages):
+                f.write(markdown)
+                f.write("\n\n")
+        with open(template_path, "w") as f:
+            f.write("<title>{{ Title }}</title><main>{{ Content }}</main>")
+        size = os.path.getsize(md_path)
+
+        print()
+        print(f"page: {size / 2**20:,.1f} MiB of markdown")
+        for label, stream in (("whole file", False), ("streamed", True)):
+            with contextlib.redirect_stdout(io.StringIO()):
+                peak, _ = peak_bytes(
+                    lambda: generate_page(
+                        md_path, template_path, dest_path, stream=stream
+                    )
+                )
+            print(f"peak generating page, {label}: {peak / 1024:,.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import argparse
+import contextlib
+import gzip
+import io
+import os
+import tempfile
+import time
+
+from bench_corpus import CorpusConfig, generate_corpus
+from block_markdown import generate_pages_recursive
+from file_utils import walk_files
+
+# an indented template like the site's own, used when none is given
+DEFAULT_TEMPLATE = """<!doctype html>
+<html>
+    <head>
+        <meta charset="utf-8" />
+        <meta name="viewport" content="width=device-width, initial-scale=1" />
+        <title>{{ Title }}</title>
+        <link href="/index.css" rel="stylesheet" />
+    </head>
+
+    <body>
+        <article>{{ Content }}</article>
+    </body>
+</html>
+"""
+
+
+def output_bytes(root):
+    """return (raw, gzipped) bytes of every file under root"""
+    raw = zipped = 0
+    for rel_path in walk_files(root):
+        with open(os.path.join(root, rel_path), "rb") as f:
+            data = f.read()
+        raw += len(data)
+        zipped += len(gzip.compress(data, mtime=0))
+    return raw, zipped
+
+
+def build(content_dir, template_path, dest_dir, minify):
+    """return the seconds a full build takes"""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        generate_pages_recursive(content_dir, template_path, dest_dir, minify=minify)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="compare output size and build time with and without --minify"
+    )
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--page-size", type=int, default=4000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--template", help="template to build with")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        content_dir = os.path.join(root, "content")
+        generate_corpus(
+            content_dir, CorpusConfig(pages=args.pages, page_size=args.page_size)
+        )
+        template_path = args.template
+        if template_path is None:
+            template_path = os.path.join(root, "template.html")
+            with open(template_path, "w") as f:
+                f.write(DEFAULT_TEMPLATE)
+
+        # alternate the two so disk and cpu noise hits both alike
+        variants = {"plain": False, "minified": True}
+        best = {}
+        for _ in range(args.repeat):
+            for label, minify in variants.items():
+                dest_dir = os.path.join(root, label)
+                seconds = build(content_dir, template_path, dest_dir, minify)
+                best[label] = min(seconds, best.get(label, seconds))
+        results = {
+            label: (best[label], *output_bytes(os.path.join(root, label)))
+            for label in variants
+        }
+
+    print(f"{args.pages} pages")
+    print(f"{'':<9} {'seconds':>9} {'bytes':>11} {'gzipped':>11}")
+    for label, (seconds, raw, zipped) in results.items():
+        print(f"{label:<9} {seconds:>9.3f} {raw:>11,} {zipped:>11,}")
+
+    plain, minified = results["plain"], results["minified"]
+    print()
+    print(f"bytes saved: {1 - minified[1] / plain[1]:.1%}")
+    print(f"gzipped bytes saved: {1 - minified[2] / plain[2]:.1%}")
+    print(f"build time: {minified[0] / plain[0] - 1:+.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from bench_corpus import CorpusConfig, generate_corpus
+from block_markdown import (
+    BlockType,
+    generate_pages_recursive,
+    iter_blocks,
+    markdown_to_html_node,
+)
+from inline_markdown import text_to_textnodes
+from page_index import build_page_index
+
+# a stage counts as regressed when it gets this much slower than the baseline
+REGRESSION_THRESHOLD = 0.10
+
+
+def load_pages(content_dir):
+    pages = []
+    for page in build_page_index(content_dir, ""):
+        with open(page.source, "r") as f:
+            pages.append(f.read())
+    return pages
+
+
+def stage_block_parse(pages):
+    for markdown in pages:
+        for _ in iter_blocks(markdown.split("\n")):
+            pass
+
+
+def stage_inline_parse(inline_texts):
+    for text in inline_texts:
+        text_to_textnodes(text)
+
+
+def stage_render(trees):
+    for tree in trees:
+        tree.to_html()
+
+
+def inline_inputs(pages):
+    """the text every non-code block hands to the inline parser"""
+    texts = []
+    for markdown in pages:
+        for block in iter_blocks(markdown.split("\n")):
+            if block.block_type != BlockType.CODE:
+                texts.append(" ".join(block.lines))
+    return texts
+
+
+def measure(func, repeat):
+    """return (best seconds, peak bytes) for func"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    # measured separately, tracing slows everything down
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def run(config, repeat):
+    """generate a corpus and time every pipeline stage over it"""
+    with tempfile.TemporaryDirectory() as root:
+        content_dir = os.path.join(root, "content")
+        template_path = os.path.join(root, "template.html")
+        with open(template_path, "w") as f:
+            f.write("<html><title>{{ Title }}</title><body>{{ Content }}</body></html>")
+        total_bytes = generate_corpus(content_dir, config)
+
+        pages = load_pages(content_dir)
+        texts = inline_inputs(pages)
+        trees = [markdown_to_html_node(markdown) for markdown in pages]
+
+        def full_build():
+            dest_dir = tempfile.mkdtemp(dir=root)
+            with contextlib.redirect_stdout(io.StringIO()):
+                generate_pages_recursive(content_dir, template_path, dest_dir)
+
+        stages = {
+            "block parse": lambda: stage_block_parse(pages),
+            "inline parse": lambda: stage_inline_parse(texts),
+            "render": lambda: stage_render(trees),
+            "full build": full_build,
+        }
+
+        results = {}
+        for name, func in stages.items():
+            seconds, peak = measure(func, repeat)
+            results[name] = {
+                "seconds": seconds,
+                "pages_per_sec": len(pages) / seconds,
+                "bytes_per_sec": total_bytes / seconds,
+                "peak_bytes": peak,
+            }
+
+    return {
+        "config": vars(config),
+        "markdown_bytes": total_bytes,
+        "python": platform.python_version(),
+        "stages": results,
+    }
+
+
+def print_results(results):
+    print(
+        f"{results['config']['pages']} pages, "
+        f"{results['markdown_bytes'] / 1024:,.0f} KiB of markdown"
+    )
+    print(
+        f"{'stage':<13} {'seconds':>9} {'pages/s':>10} {'MiB/s':>8} {'peak MiB':>9}"
+    )
+    for name, stage in results["stages"].items():
+        print(
+            f"{name:<13} {stage['seconds']:>9.3f} {stage['pages_per_sec']:>10,.0f} "
+            f"{stage['bytes_per_sec'] / 2**20:>8.2f} "
+            f"{stage['peak_bytes'] / 2**20:>9.2f}"
+        )
+
+
+def compare(results, baseline):
+    """print the change against a baseline run and return regressed stages"""
+    regressed = []
+    print(f"\n{'stage':<13} {'baseline s':>11} {'now s':>9} {'change':>8}")
+    for name, stage in results["stages"].items():
+        old = baseline["stages"].get(name)
+        if old is None:
+            continue
+        change = stage["seconds"] / old["seconds"] - 1
+        flag = ""
+        if change > REGRESSION_THRESHOLD:
+            flag = "  REGRESSION"
+            regressed.append(name)
+        print(
+            f"{name:<13} {old['seconds']:>11.3f} {stage['seconds']:>9.3f} "
+            f"{change:>+7.1%}{flag}"
+        )
+    return regressed
+
+
+def parse_mix(text):
+    """parse a block mix like "paragraph=6,code=1" into weights"""
+    mix = {}
+    for item in text.split(","):
+        kind, _, weight = item.partition("=")
+        mix[kind.strip()] = float(weight)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="benchmark the markdown to html pipeline on a synthetic corpus"
+    )
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--page-size", type=int, default=4000)
+    parser.add_argument("--link-density", type=float, default=0.05)
+    parser.add_argument("--emphasis-density", type=float, default=0.05)
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        help="block weights, e.g. paragraph=6,heading=1,ulist=1,olist=1,code=1,quote=1",
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", metavar="FILE", help="write results as json")
+    parser.add_argument(
+        "--compare", metavar="FILE", help="compare against saved results"
+    )
+    args = parser.parse_args()
+
+    config = CorpusConfig(
+        pages=args.pages,
+        page_size=args.page_size,
+        link_density=args.link_density,
+        emphasis_density=args.emphasis_density,
+        block_mix=args.mix,
+        seed=args.seed,
+    )
+    results = run(config, args.repeat)
+    print_results(results)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=1)
+        print(f"\nSaved results to {args.save}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        if compare(results, baseline):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
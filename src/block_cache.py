@@ -0,0 +1,43 @@
+from collections import OrderedDict
+
+
+class BlockCache:
+    """
+    in-memory LRU cache of rendered block html, keyed on the block's markdown
+    and the basepath it was rendered for. shared disclaimers, callouts and
+    code samples that repeat across pages are only parsed and rendered once.
+    """
+
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, key, check=None):
+        """
+        return the cached value for key, or None. check, if given, is called
+        with the value, and values it rejects count as misses.
+        """
+        value = self._entries.get(key)
+        if value is None or (check is not None and not check(value)):
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """store value under key, dropping the least recently used entries"""
+        if self.capacity <= 0:
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
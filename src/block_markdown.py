@@ -1,8 +1,29 @@
+import contextlib
+import io
 import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from enum import Enum
 
-from htmlnode import ParentNode, text_node_to_html_node
+import profiler
+from block_cache import BlockCache
+from build_manifest import BuildManifest, UrlLookups, lookups_match, page_inputs
+from build_stats import BuildStats
+from file_utils import hash_file
+from htmlnode import (
+    LeafNode,
+    ParentNode,
+    apply_basepath,
+    apply_image_sizes,
+    minify_node,
+    text_node_to_html_node,
+)
 from inline_markdown import text_to_textnodes
+from link_check import LinkIndex, extract_targets
+from output_writer import OutputWriter
+from page_index import build_page_index
+from search_index import tokenize
+from template import load_template
 from textnode import TextNode, TextType
 
 
@@ -15,43 +36,178 @@ class BlockType(Enum):
     ORDERED_LIST = "ordered_list"
 
 
+HEADING_PREFIXES = ("# ", "## ", "### ", "#### ", "##### ", "###### ")
+
+
+class Block:
+    """a markdown block: its type, its lines and the span of source lines"""
+
+    __slots__ = ("block_type", "lines", "start", "end")
+
+    def __init__(self, block_type, lines, start=0, end=None):
+        self.block_type = block_type
+        self.lines = lines
+        self.start = start
+        self.end = end if end is not None else start + len(lines)
+
+    @property
+    def text(self):
+        return "\n".join(self.lines)
+
+    def to_html_node(self, targets=None):
+        """
+        convert the block to the appropriate HTML node, appending its
+        root-relative link and image targets to targets, if given
+        """
+        if self.block_type == BlockType.PARAGRAPH:
+            return paragraph_to_html_node(self.lines, targets)
+        if self.block_type == BlockType.HEADING:
+            return heading_to_html_node(self.lines, targets)
+        if self.block_type == BlockType.CODE:
+            return code_to_html_node(self.lines)
+        if self.block_type == BlockType.QUOTE:
+            return quote_to_html_node(self.lines, targets)
+        if self.block_type == BlockType.UNORDERED_LIST:
+            return ulist_to_html_node(self.lines, targets)
+        if self.block_type == BlockType.ORDERED_LIST:
+            return olist_to_html_node(self.lines, targets)
+        raise ValueError(f"Invalid block type: {self.block_type}")
+
+    def __eq__(self, other):
+        return (
+            self.block_type == other.block_type
+            and self.lines == other.lines
+            and self.start == other.start
+            and self.end == other.end
+        )
+
+    def __repr__(self):
+        return (
+            f"Block({self.block_type}, {self.lines!r}, "
+            f"start={self.start}, end={self.end})"
+        )
+
+
+def iter_blocks(lines):
+    """
+    scan markdown lines once, yielding typed blocks as they complete.
+    blocks are separated by empty lines, except inside a fenced code block,
+    which runs until a line ending with ``` even across blank lines.
+    """
+    raw = []
+    start = 0
+    has_content = False
+    in_fence = False
+
+    for lineno, line in enumerate(lines):
+        if in_fence:
+            raw.append(line)
+            if line.rstrip().endswith("```"):
+                in_fence = False
+            continue
+
+        if line == "":
+            if raw:
+                block = _finish_block(raw, start)
+                if block is not None:
+                    yield block
+                raw = []
+                has_content = False
+            continue
+
+        if not raw:
+            start = lineno
+        raw.append(line)
+
+        if not has_content and line.strip():
+            has_content = True
+            # an opening fence that doesn't close on the same line
+            fence = line.strip()
+            if fence.startswith("```") and not (
+                len(fence) > 3 and fence.endswith("```")
+            ):
+                in_fence = True
+
+    if in_fence:
+        # the fence never closed, so blank lines separate blocks after all
+        sub_start = start
+        sub = []
+        for offset, line in enumerate(raw):
+            if line == "":
+                if sub:
+                    block = _finish_block(sub, sub_start)
+                    if block is not None:
+                        yield block
+                sub = []
+                continue
+            if not sub:
+                sub_start = start + offset
+            sub.append(line)
+        raw = sub
+        start = sub_start
+
+    if raw:
+        block = _finish_block(raw, start)
+        if block is not None:
+            yield block
+
+
+def _finish_block(raw, start):
+    """trim surrounding whitespace from a block's lines and classify it"""
+    first = 0
+    last = len(raw) - 1
+    while first <= last and not raw[first].strip():
+        first += 1
+    while last >= first and not raw[last].strip():
+        last -= 1
+    if first > last:
+        return None
+
+    lines = raw[first : last + 1]
+    lines[0] = lines[0].lstrip()
+    lines[-1] = lines[-1].rstrip()
+    return Block(classify_lines(lines), lines, start + first, start + last + 1)
+
+
 def markdown_to_blocks(markdown):
     """split markdown into blocks separated by blank lines"""
-    blocks = markdown.split("\n\n")
-    filtered_blocks = []
-    for block in blocks:
-        block = block.strip()
-        if block:
-            filtered_blocks.append(block)
-    return filtered_blocks
+    return [block.text for block in iter_blocks(markdown.split("\n"))]
 
 
 def block_to_block_type(block):
     """determine the type of a markdown block"""
-    lines = block.split("\n")
+    return classify_lines(block.split("\n"))
+
+
+def classify_lines(lines):
+    """determine the type of a markdown block from its lines"""
+    first = lines[0]
 
     # check for heading (1-6 # characters followed by space)
-    if block.startswith(("# ", "## ", "### ", "#### ", "##### ", "###### ")):
+    if first.startswith(HEADING_PREFIXES):
         return BlockType.HEADING
 
     # check for code block (starts and ends with 3 backticks)
-    if block.startswith("```") and block.endswith("```"):
+    if first.startswith("```") and lines[-1].endswith("```"):
         return BlockType.CODE
 
-    # check for quote (every line starts with >)
-    if all(line.startswith(">") for line in lines):
-        return BlockType.QUOTE
-
-    # check for unordered list (every line starts with "- ")
-    if all(line.startswith("- ") for line in lines):
-        return BlockType.UNORDERED_LIST
-
-    # check for ordered list (lines start with 1. 2. 3. etc.)
-    is_ordered = True
+    # check quote (every line starts with >), unordered list (every line
+    # starts with "- ") and ordered list (1. 2. 3. etc.) in one pass
+    is_quote = is_unordered = is_ordered = True
     for i, line in enumerate(lines, start=1):
-        if not line.startswith(f"{i}. "):
+        if is_quote and not line.startswith(">"):
+            is_quote = False
+        if is_unordered and not line.startswith("- "):
+            is_unordered = False
+        if is_ordered and not line.startswith(f"{i}. "):
             is_ordered = False
+        if not (is_quote or is_unordered or is_ordered):
             break
+
+    if is_quote:
+        return BlockType.QUOTE
+    if is_unordered:
+        return BlockType.UNORDERED_LIST
     if is_ordered:
         return BlockType.ORDERED_LIST
 
@@ -59,51 +215,236 @@ def block_to_block_type(block):
     return BlockType.PARAGRAPH
 
 
-def markdown_to_html_node(markdown):
-    """convert full markdown string to HTML node tree"""
-    blocks = markdown_to_blocks(markdown)
+class RenderOptions:
+    """
+    the output options of a build, passed down to every page as one object:
+    the basepath root-relative urls are rewritten to start with, the asset
+    map and image sizes (if any), whether output is minified, and the search
+    store and link index pages record their terms and targets in (if any).
+    """
+
+    __slots__ = ("basepath", "assets", "images", "minify", "search", "links")
+
+    def __init__(
+        self,
+        basepath="/",
+        assets=None,
+        images=None,
+        minify=False,
+        search=None,
+        links=None,
+    ):
+        self.basepath = basepath
+        self.assets = assets
+        self.images = images
+        self.minify = minify
+        self.search = search
+        self.links = links
+
+    def replace(self, **changes):
+        """return a copy with some options changed"""
+        values = {name: getattr(self, name) for name in self.__slots__}
+        values.update(changes)
+        return RenderOptions(**values)
+
+    def maps(self):
+        """the maps pages look urls up in, by name, None for options not used"""
+        return {"assets": self.assets, "images": self.images}
+
+    def new_lookups(self):
+        """return empty lookups to record the urls a page looks up into"""
+        return {name: {} for name, mapping in self.maps().items() if mapping}
+
+
+def markdown_to_html_node(
+    markdown,
+    basepath="/",
+    block_cache=None,
+    assets=None,
+    images=None,
+    minify=False,
+    terms=None,
+    targets=None,
+):
+    """
+    convert full markdown string to HTML node tree.
+    root-relative link and image urls are rewritten to start with basepath,
+    and to fingerprinted asset urls when an asset map is given.
+    when image sizes are given, img tags get their dimensions and lazy
+    loading attributes. with minify set, the tree renders compactly.
+    when a block cache is given, blocks rendered before are reused as raw
+    html leaves instead of being parsed again.
+    when terms is given (a Counter), the search terms of each block are
+    counted into it along the way. when targets is given (a list), the
+    root-relative link and image targets are appended to it.
+    """
+    options = RenderOptions(basepath, assets, images, minify)
+    return _render_markdown(markdown, options, block_cache, terms, targets)
+
+
+def _render_markdown(
+    markdown, options, block_cache=None, terms=None, targets=None, lookups=None
+):
+    """
+    markdown_to_html_node with the output options bundled. the urls looked
+    up in the asset map and image sizes are recorded into lookups, if given.
+    """
     children = []
-    for block in blocks:
-        html_node = block_to_html_node(block)
-        children.append(html_node)
-    return ParentNode("div", children)
+    with profiler.phase("block parse"):
+        if block_cache is None:
+            for block in iter_blocks(markdown.split("\n")):
+                _scan_block(block, terms)
+                html_node = block.to_html_node(targets)
+                children.append(html_node)
+            root = ParentNode("div", children)
+            return _finish_tree(root, options, lookups)
+
+        for block in iter_blocks(markdown.split("\n")):
+            _scan_block(block, terms)
+            html = _block_html(block, options, block_cache, lookups, targets)
+            children.append(LeafNode(None, html))
+        return ParentNode("div", children)
+
+
+def _scan_block(block, terms):
+    """count a block's search terms, if asked"""
+    if terms is not None:
+        terms.update(tokenize(block.text))
+
+
+def _finish_tree(node, options, lookups=None):
+    """
+    apply the output options of a build to a freshly parsed tree, recording
+    the urls looked up in the asset map and image sizes into lookups, if given
+    """
+    assets, images = options.assets, options.images
+    if lookups is not None:
+        if assets is not None:
+            assets = UrlLookups(assets, lookups.setdefault("assets", {}))
+        if images is not None:
+            images = UrlLookups(images, lookups.setdefault("images", {}))
+    if images is not None:
+        # sized by the original urls, before they are rewritten
+        apply_image_sizes(node, images)
+    node = apply_basepath(node, options.basepath, assets)
+    if options.minify:
+        # collapsing whitespace renders the tree, there's no separate pass
+        with profiler.phase("render"):
+            node = minify_node(node)
+    return node
+
+
+def _block_html(block, options, block_cache=None, lookups=None, targets=None):
+    """
+    render one block to html, through the block cache when there is one.
+    blocks are cached with the urls they looked up, and reused while those
+    resolve the same, however the rest of the asset map and image sizes
+    changed. they're cached with their link targets too, which are appended
+    to targets, if given.
+    """
+    key = (
+        options.basepath,
+        options.assets is not None,
+        options.images is not None,
+        options.minify,
+        block.text,
+    )
+    entry = None
+    if block_cache is not None:
+        maps = options.maps()
+        entry = block_cache.get(key, lambda entry: lookups_match(entry[1], maps))
+    if entry is None:
+        block_lookups = options.new_lookups()
+        block_targets = []
+        html_node = _finish_tree(
+            block.to_html_node(block_targets), options, block_lookups
+        )
+        with profiler.phase("render"):
+            html = html_node.to_html()
+        entry = (html, block_lookups, block_targets)
+        if block_cache is not None:
+            block_cache.put(key, entry)
+    if lookups is not None:
+        for name, used in entry[1].items():
+            lookups.setdefault(name, {}).update(used)
+    if targets is not None:
+        targets.extend(entry[2])
+    return entry[0]
+
+
+class StreamedContent:
+    """
+    {{ Content }} value that reads a markdown file as the page is written,
+    rendering each block as soon as it is complete. only one block is held
+    in memory at a time, however large the file is. search terms, link
+    targets and url lookups are collected into terms, targets and lookups,
+    if given, as blocks go by.
+    """
+
+    def __init__(
+        self,
+        path,
+        options,
+        block_cache=None,
+        terms=None,
+        targets=None,
+        lookups=None,
+    ):
+        self.path = path
+        self.options = options
+        self.block_cache = block_cache
+        self.terms = terms
+        self.targets = targets
+        self.lookups = lookups
+
+    def iter_html(self):
+        yield "<div>"
+        empty = True
+        with open(self.path, "r") as f:
+            lines = (line.rstrip("\n") for line in f)
+            for block in iter_blocks(lines):
+                with profiler.phase("block parse"):
+                    _scan_block(block, self.terms)
+                    html = _block_html(
+                        block,
+                        self.options,
+                        self.block_cache,
+                        self.lookups,
+                        self.targets,
+                    )
+                empty = False
+                yield html
+        if empty:
+            raise ValueError("ParentNode must have children")
+        yield "</div>"
 
 
 def block_to_html_node(block):
     """convert a single block to appropriate HTML node"""
-    block_type = block_to_block_type(block)
-    if block_type == BlockType.PARAGRAPH:
-        return paragraph_to_html_node(block)
-    if block_type == BlockType.HEADING:
-        return heading_to_html_node(block)
-    if block_type == BlockType.CODE:
-        return code_to_html_node(block)
-    if block_type == BlockType.QUOTE:
-        return quote_to_html_node(block)
-    if block_type == BlockType.UNORDERED_LIST:
-        return ulist_to_html_node(block)
-    if block_type == BlockType.ORDERED_LIST:
-        return olist_to_html_node(block)
-    raise ValueError(f"Invalid block type: {block_type}")
-
-
-def text_to_children(text):
-    text_nodes = text_to_textnodes(text)
-    children = []
-    for text_node in text_nodes:
-        html_node = text_node_to_html_node(text_node)
-        children.append(html_node)
-    return children
+    lines = block.split("\n")
+    return Block(classify_lines(lines), lines).to_html_node()
 
 
-def paragraph_to_html_node(block):
-    lines = block.split("\n")
+def text_to_children(text, targets=None):
+    with profiler.phase("inline parse"):
+        text_nodes = text_to_textnodes(text)
+        if targets is not None:
+            targets.extend(extract_targets(text_nodes))
+        children = []
+        for text_node in text_nodes:
+            html_node = text_node_to_html_node(text_node)
+            children.append(html_node)
+        return children
+
+
+def paragraph_to_html_node(lines, targets=None):
     paragraph = " ".join(lines)
-    children = text_to_children(paragraph)
+    children = text_to_children(paragraph, targets)
     return ParentNode("p", children)
 
 
-def heading_to_html_node(block):
+def heading_to_html_node(lines, targets=None):
+    block = "\n".join(lines)
     level = 0
     for char in block:
         if char == "#":
@@ -113,11 +454,12 @@ def heading_to_html_node(block):
     if level > 6:
         raise ValueError(f"Invalid heading level: {level}")
     text = block[level + 1 :]
-    children = text_to_children(text)
+    children = text_to_children(text, targets)
     return ParentNode(f"h{level}", children)
 
 
-def code_to_html_node(block):
+def code_to_html_node(lines):
+    block = "\n".join(lines)
     if not block.startswith("```") or not block.endswith("```"):
         raise ValueError("Invalid code block")
     text = block[3:-3].strip()
@@ -127,98 +469,589 @@ def code_to_html_node(block):
     return ParentNode("pre", [code_node])
 
 
-def quote_to_html_node(block):
-    lines = block.split("\n")
+def quote_to_html_node(lines, targets=None):
     new_lines = []
     for line in lines:
         if not line.startswith(">"):
             raise ValueError("Invalid quote block")
         new_lines.append(line.lstrip(">").strip())
     content = " ".join(new_lines)
-    children = text_to_children(content)
+    children = text_to_children(content, targets)
     return ParentNode("blockquote", children)
 
 
-def ulist_to_html_node(block):
-    items = block.split("\n")
+def ulist_to_html_node(lines, targets=None):
     html_items = []
-    for item in items:
+    for item in lines:
         text = item[2:]
-        children = text_to_children(text)
+        children = text_to_children(text, targets)
         html_items.append(ParentNode("li", children))
     return ParentNode("ul", html_items)
 
 
-def olist_to_html_node(block):
-    items = block.split("\n")
+def olist_to_html_node(lines, targets=None):
     html_items = []
-    for item in items:
+    for item in lines:
         text = item[3:]
-        children = text_to_children(text)
+        children = text_to_children(text, targets)
         html_items.append(ParentNode("li", children))
     return ParentNode("ol", html_items)
 
 
 def extract_title(markdown):
     """extract h1 header from markdown and return the title text"""
-    lines = markdown.split("\n")
+    return extract_title_from_lines(markdown.split("\n"))
+
+
+def extract_title_from_lines(lines):
+    """extract the h1 title from an iterable of lines, stopping at the first"""
     for line in lines:
         if line.startswith("# "):
             return line[2:].strip()
     raise Exception("no h1 header found")
 
 
-def generate_page(from_path, template_path, dest_path, basepath="/"):
-    """generate html page from markdown using template"""
-    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
+# pages handed to an output writer are rendered to one string first, larger
+# ones are streamed to disk instead so they're never held in memory whole
+WRITER_MAX_MARKDOWN = 256 * 1024
+
+
+def generate_page(
+    from_path,
+    template_path,
+    dest_path,
+    basepath="/",
+    manifest=None,
+    stats=None,
+    content_cache=None,
+    block_cache=None,
+    writer=None,
+    stream=False,
+    assets=None,
+    search=None,
+    links=None,
+    images=None,
+    minify=False,
+):
+    """
+    generate html page from markdown using template.
+    when a manifest is given, pages whose inputs are unchanged are skipped.
+    when a content cache is given, the rendered content of markdown seen in
+    an earlier build is reused instead of parsing it again.
+    when a block cache is given, blocks repeated across pages are reused.
+    when an output writer is given, a page of up to WRITER_MAX_MARKDOWN
+    characters of markdown is handed to it to write in the background
+    instead of being written here.
+    when stream is set, the markdown is read and rendered incrementally while
+    the page is written, so memory use doesn't grow with the file size. the
+    content cache and writer are not used for streamed pages.
+    when an asset map is given, references to static files point at their
+    fingerprinted copies.
+    when image sizes are given, images are tagged with their dimensions.
+    with minify set, the template and content are written without needless
+    whitespace.
+    when a search store is given, the page's search terms are recorded in it.
+    when a link index is given, the page's link and image targets are too.
+    returns True if the page was (or is queued to be) written, False if it
+    was skipped.
+    """
+    options = RenderOptions(basepath, assets, images, minify, search, links)
+    return _build_page(
+        from_path,
+        template_path,
+        dest_path,
+        options,
+        manifest=manifest,
+        stats=stats,
+        content_cache=content_cache,
+        block_cache=block_cache,
+        writer=writer,
+        stream=stream,
+    )
+
+
+def _build_page(
+    from_path,
+    template_path,
+    dest_path,
+    options,
+    manifest=None,
+    stats=None,
+    content_cache=None,
+    block_cache=None,
+    writer=None,
+    stream=False,
+):
+    """generate_page with the output options bundled"""
+    if stats is None:
+        stats = BuildStats()
+    with profiler.page(from_path):
+        if stream:
+            return _generate_page_streamed(
+                from_path,
+                template_path,
+                dest_path,
+                options,
+                manifest=manifest,
+                stats=stats,
+                block_cache=block_cache,
+            )
+        return _generate_page(
+            from_path,
+            template_path,
+            dest_path,
+            options,
+            manifest=manifest,
+            stats=stats,
+            content_cache=content_cache,
+            block_cache=block_cache,
+            writer=writer,
+        )
 
+
+def _generate_page(
+    from_path,
+    template_path,
+    dest_path,
+    options,
+    manifest,
+    stats,
+    content_cache,
+    block_cache,
+    writer,
+):
     # read markdown file
-    with open(from_path, "r") as f:
-        markdown = f.read()
+    with profiler.phase("read"):
+        with open(from_path, "r") as f:
+            st = os.fstat(f.fileno())
+            markdown = f.read()
+    source_stat = (st.st_size, st.st_mtime_ns)
+
+    # compiled once per build and reused while the file is unchanged
+    template = _load_page_template(template_path, options)
+
+    # skip pages built from identical inputs last time
+    maps = options.maps()
+    inputs = None
+    if manifest is not None:
+        inputs = _page_inputs(markdown, template, options)
+        if manifest.is_fresh(dest_path, inputs, maps):
+            # the source was touched but not changed, remember its new stat
+            # so the next build can skip it without reading it
+            manifest.refresh(dest_path, source_stat)
+            stats.pages_skipped += 1
+            return False
 
-    # read template file
-    with open(template_path, "r") as f:
-        template = f.read()
+    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
+
+    # reuse the rendered content when only the template or output changed
+    content = lookups = cached_targets = None
+    if content_cache is not None:
+        cache_key = content_cache.key(
+            markdown, options.basepath, options.assets, options.images, options.minify
+        )
+        cached = content_cache.get(cache_key)
+        if cached is not None and lookups_match(cached[1], maps):
+            content, lookups, cached_targets = cached
+            stats.content_cache_hits += 1
+        else:
+            stats.content_cache_misses += 1
 
-    # convert markdown to html
-    html_node = markdown_to_html_node(markdown)
-    html_content = html_node.to_html()
+    search, links = options.search, options.links
+    terms = Counter() if search is not None else None
+    # fragments are cached with their targets, whether or not this build
+    # checks links, so a later build that does can reuse them
+    targets = [] if links is not None or content_cache is not None else None
+    if content is None:
+        # convert markdown to html, rewriting root paths to the basepath
+        if block_cache is not None:
+            hits, misses = block_cache.hits, block_cache.misses
+        lookups = options.new_lookups()
+        content = _render_markdown(
+            markdown, options, block_cache, terms, targets, lookups
+        )
+        if block_cache is not None:
+            stats.block_cache_hits += block_cache.hits - hits
+            stats.block_cache_misses += block_cache.misses - misses
+        if content_cache is not None:
+            with profiler.phase("render"):
+                content = content.to_html()
+            content_cache.put(cache_key, content, lookups, targets)
+    else:
+        targets = cached_targets
+        if terms is not None:
+            # the cached fragment skipped parsing, scan the blocks on their own
+            for block in iter_blocks(markdown.split("\n")):
+                _scan_block(block, terms)
 
     # extract title
     title = extract_title(markdown)
+    if search is not None:
+        search.put(dest_path, title, terms)
+    if links is not None:
+        links.record(dest_path, targets)
+
+    if writer is not None and len(markdown) <= WRITER_MAX_MARKDOWN:
+        # queue the finished page and get on with rendering the next one
+        page = _render_page(template, title, content)
+        with profiler.phase("write"):
+            writer.write(dest_path, page)
+    else:
+        _write_page(dest_path, template, title, content)
+
+    if manifest is not None:
+        manifest.record(dest_path, inputs, source_stat, lookups)
+    stats.pages_rebuilt += 1
+    return True
+
+
+def _generate_page_streamed(
+    from_path, template_path, dest_path, options, manifest, stats, block_cache
+):
+    template = _load_page_template(template_path, options)
+    st = os.stat(from_path)
+    source_stat = (st.st_size, st.st_mtime_ns)
+
+    # hash the source in chunks rather than reading it into one string
+    inputs = None
+    if manifest is not None:
+        with profiler.phase("read"):
+            source_digest = hash_file(from_path)
+        inputs = _page_inputs(None, template, options, source_digest)
+        if manifest.is_fresh(dest_path, inputs, options.maps()):
+            manifest.refresh(dest_path, source_stat)
+            stats.pages_skipped += 1
+            return False
+
+    print(f"Streaming page from {from_path} to {dest_path} using {template_path}")
+
+    # a first pass for the title, which the template may need before content
+    with profiler.phase("read"):
+        with open(from_path, "r") as f:
+            title = extract_title_from_lines(line.rstrip("\n") for line in f)
+
+    search, links = options.search, options.links
+    terms = Counter() if search is not None else None
+    targets = [] if links is not None else None
+    lookups = options.new_lookups()
+    content = StreamedContent(
+        from_path, options, block_cache, terms, targets, lookups
+    )
+    if block_cache is not None:
+        hits, misses = block_cache.hits, block_cache.misses
+
+    dest_dir = os.path.dirname(dest_path)
+    if dest_dir:
+        os.makedirs(dest_dir, exist_ok=True)
+    tmp_path = dest_path + ".tmp"
+    try:
+        with profiler.phase("write"):
+            with open(tmp_path, "w") as f:
+                f.writelines(template.iter_render(Title=title, Content=content))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, dest_path)
+    if search is not None:
+        search.put(dest_path, title, terms)
+    if links is not None:
+        links.record(dest_path, targets)
+
+    if block_cache is not None:
+        stats.block_cache_hits += block_cache.hits - hits
+        stats.block_cache_misses += block_cache.misses - misses
+    if manifest is not None:
+        manifest.record(dest_path, inputs, source_stat, lookups)
+    stats.pages_rebuilt += 1
+    return True
+
 
-    # replace placeholders in template
-    page = template.replace("{{ Title }}", title)
-    page = page.replace("{{ Content }}", html_content)
+def _load_page_template(template_path, options):
+    return load_template(
+        template_path, options.basepath, options.assets, options.minify
+    )
 
-    # replace root paths with basepath
-    page = page.replace('href="/', f'href="{basepath}')
-    page = page.replace('src="/', f'src="{basepath}')
 
+def _page_inputs(markdown, template, options, source_digest=None):
+    """page_inputs for a page rendered with options"""
+    return page_inputs(
+        markdown, template.digest, options.basepath, source_digest=source_digest
+    )
+
+
+def _write_page(dest_path, template, title, content):
     # create directories if needed
     dest_dir = os.path.dirname(dest_path)
     if dest_dir:
         os.makedirs(dest_dir, exist_ok=True)
 
-    # write the final html page
-    with open(dest_path, "w") as f:
-        f.write(page)
+    # a temp file keeps a failed render from leaving a half written page
+    tmp_path = dest_path + ".tmp"
+    try:
+        if profiler.is_enabled():
+            _write_page_profiled(tmp_path, template, title, content)
+        else:
+            # stream the filled template straight to disk, so the full page
+            # is never held in memory as one string
+            with open(tmp_path, "w") as f:
+                f.writelines(template.iter_render(Title=title, Content=content))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, dest_path)
+
+
+def _render_page(template, title, content):
+    """render content and fill the template, timing each step"""
+    html_content = content
+    if not isinstance(content, str):
+        with profiler.phase("render"):
+            html_content = content.to_html()
+    with profiler.phase("template fill"):
+        return template.render(Title=title, Content=html_content)
+
+
+def _write_page_profiled(path, template, title, content):
+    """
+    render, fill and write as separate steps so each can be timed. streaming
+    interleaves the three, so profiled builds trade it for the breakdown.
+    """
+    page = _render_page(template, title, content)
+    with profiler.phase("write"):
+        with open(path, "w") as f:
+            f.write(page)
 
 
 def generate_pages_recursive(
-    dir_path_content, template_path, dest_dir_path, basepath="/"
+    dir_path_content,
+    template_path,
+    dest_dir_path,
+    basepath="/",
+    manifest=None,
+    stats=None,
+    jobs=1,
+    content_cache=None,
+    block_cache=None,
+    pages=None,
+    writer=None,
+    stream=False,
+    assets=None,
+    search=None,
+    links=None,
+    images=None,
+    minify=False,
 ):
-    """recursively generate html pages from all markdown files in content directory"""
-    for entry in os.listdir(dir_path_content):
-        entry_path = os.path.join(dir_path_content, entry)
-        if os.path.isfile(entry_path):
-            # check if it's a markdown file
-            if entry.endswith(".md"):
-                # convert .md to .html for destination
-                html_filename = entry[:-3] + ".html"
-                dest_path = os.path.join(dest_dir_path, html_filename)
-                generate_page(entry_path, template_path, dest_path, basepath)
+    """
+    recursively generate html pages from all markdown files in content directory.
+    pages can be a page index of the content directory built earlier, to save
+    walking it again. the output writer is only used by serial builds, worker
+    processes write their own pages.
+    """
+    options = RenderOptions(basepath, assets, images, minify, search, links)
+    if pages is None:
+        pages = build_page_index(dir_path_content, dest_dir_path)
+    if manifest is not None:
+        pages = _stale_pages(pages, template_path, options, manifest, stats)
+
+    if jobs > 1:
+        _generate_pages_parallel(
+            pages,
+            template_path,
+            options,
+            manifest,
+            stats,
+            jobs=jobs,
+            content_cache=content_cache,
+            block_cache_size=block_cache.capacity if block_cache is not None else 0,
+            stream=stream,
+        )
+        return
+
+    for page in pages:
+        _build_page(
+            page.source,
+            template_path,
+            page.output,
+            options,
+            manifest=manifest,
+            stats=stats,
+            content_cache=content_cache,
+            block_cache=block_cache,
+            writer=writer,
+            stream=stream,
+        )
+
+
+def _stale_pages(pages, template_path, options, manifest, stats):
+    """
+    drop pages whose source size and mtime match the manifest, counting them
+    as skipped. the rest still get the full hash check in generate_page.
+    """
+    template_digest = _load_page_template(template_path, options).digest
+    maps = options.maps()
+    stale = []
+    for page in pages:
+        if manifest.is_unchanged(
+            page.output, page.stat, template_digest, options.basepath, maps
+        ):
+            if stats is not None:
+                stats.pages_skipped += 1
         else:
-            # it's a directory, recurse into it
-            new_dest_dir = os.path.join(dest_dir_path, entry)
-            generate_pages_recursive(entry_path, template_path, new_dest_dir, basepath)
+            stale.append(page)
+    return stale
+
+
+def discover_pages(dir_path_content, dest_dir_path):
+    """return a sorted list of (markdown path, html path) pairs for every page"""
+    return [
+        (page.source, page.output)
+        for page in build_page_index(dir_path_content, dest_dir_path)
+    ]
+
+
+# each worker process keeps its own block cache for the life of the pool
+_worker_block_cache = None
+# and writes its pages inline, skipping identical ones like serial builds do
+_worker_writer = None
+
+
+def _init_worker(block_cache_size):
+    global _worker_block_cache, _worker_writer
+    if block_cache_size > 0:
+        _worker_block_cache = BlockCache(block_cache_size)
+    _worker_writer = OutputWriter(workers=0)
+
+
+class BuildError(Exception):
+    """raised after a build when one or more pages failed to generate"""
+
+    def __init__(self, failures):
+        self.failures = failures
+        lines = [f"{len(failures)} page(s) failed to build:"]
+        lines.extend(f"  {path}: {error!r}" for path, error in failures)
+        super().__init__("\n".join(lines))
+
+
+def _generate_page_job(
+    from_path,
+    template_path,
+    dest_path,
+    options,
+    use_manifest,
+    previous,
+    profile,
+    content_cache,
+    stream,
+):
+    """
+    worker entry point for parallel builds. runs generate_page against a
+    detached single-page manifest, stats, link index (and profiler, when
+    profiling) and hands the results back, with what the page printed, so
+    the parent process can merge them.
+    """
+    manifest = None
+    if use_manifest:
+        entries = {dest_path: previous} if previous is not None else {}
+        manifest = BuildManifest(None, entries)
+    stats = BuildStats()
+    if _worker_writer is not None:
+        _worker_writer.stats = stats
+    # options came with an empty link index of its own, see below
+    links = options.links
+
+    page_profiler = None
+    if profile:
+        page_profiler = profiler.BuildProfiler()
+        profiler.enable(page_profiler)
+    # workers share the parent's stdout, so the page's log line goes back
+    # with its results instead of interleaving with other workers' lines
+    log = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(log):
+            _build_page(
+                from_path,
+                template_path,
+                dest_path,
+                options,
+                manifest=manifest,
+                stats=stats,
+                content_cache=content_cache,
+                block_cache=_worker_block_cache,
+                writer=_worker_writer,
+                stream=stream,
+            )
+    finally:
+        if profile:
+            profiler.disable()
+
+    entry = manifest.entries.get(dest_path) if manifest is not None else None
+    records = page_profiler.records() if page_profiler is not None else None
+    targets = links.entries.get(dest_path) if links is not None else None
+    return stats, entry, records, targets, log.getvalue()
+
+
+def _generate_pages_parallel(
+    pages,
+    template_path,
+    options,
+    manifest,
+    stats,
+    jobs,
+    content_cache,
+    block_cache_size,
+    stream,
+):
+    """fan page generation out over a process pool"""
+    links = options.links
+    job_options = options
+    if links is not None:
+        # workers record targets into an empty index rather than a copy of
+        # the whole site's, and hand them back
+        job_options = options.replace(links=LinkIndex())
+    failures = []
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=_init_worker, initargs=(block_cache_size,)
+    ) as executor:
+        futures = []
+        for page in pages:
+            from_path, dest_path = page.source, page.output
+            previous = None
+            if manifest is not None:
+                previous = manifest.entries.get(dest_path)
+            futures.append(
+                executor.submit(
+                    _generate_page_job,
+                    from_path,
+                    template_path,
+                    dest_path,
+                    job_options,
+                    use_manifest=manifest is not None,
+                    previous=previous,
+                    profile=profiler.is_enabled(),
+                    content_cache=content_cache,
+                    stream=stream,
+                )
+            )
+
+        # collect results in discovery order so reporting is deterministic
+        for page, future in zip(pages, futures):
+            from_path, dest_path = page.source, page.output
+            try:
+                page_stats, entry, records, targets, log = future.result()
+            except Exception as e:
+                failures.append((from_path, e))
+                continue
+            print(log, end="")
+            if records is not None:
+                profiler.current().merge(records)
+            if manifest is not None and entry is not None:
+                manifest.record(dest_path, entry)
+            if links is not None and targets is not None:
+                links.record(dest_path, targets)
+            if stats is not None:
+                stats.merge(page_stats)
+
+    if failures:
+        raise BuildError(failures)
@@ -0,0 +1,101 @@
+import argparse
+import json
+import os
+import socket
+import sys
+
+# the client only imports the standard library, so it starts quickly. the
+# build modules are imported when there's no daemon to hand the build to
+SOCKET_PATH = os.path.join(".cache", "build.sock")
+# the options the daemon was started with, kept after it stops so one-shot
+# builds without arguments build the same site it would have
+ARGV_PATH = os.path.join(".cache", "build-daemon-argv.json")
+
+# options the daemon refuses, these always run in this process
+LOCAL_OPTIONS = ("--shard", "--merge", "--watch")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="build through a running build daemon, or in this process "
+        "if there is none. other arguments are passed on to the build",
+    )
+    parser.add_argument(
+        "--changed",
+        metavar="PATH",
+        action="append",
+        help="only rebuild the outputs of this source file (can be repeated)",
+    )
+    parser.add_argument(
+        "--stop", action="store_true", help="ask the running build daemon to exit"
+    )
+    return parser.parse_known_args(argv)
+
+
+def request(message, path=SOCKET_PATH):
+    """send one request to the daemon at path and return its reply"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        sock.sendall(json.dumps(message).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as f:
+            return json.loads(f.readline())
+
+
+def save_daemon_argv(argv, path=ARGV_PATH):
+    """record the options a daemon was started with"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(list(argv), f)
+
+
+def load_daemon_argv(path=ARGV_PATH):
+    """return the options the last daemon was started with, or None"""
+    try:
+        with open(path, "r") as f:
+            argv = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return argv if isinstance(argv, list) else None
+
+
+def main(argv=None):
+    args, build_argv = parse_args(argv)
+    if args.stop:
+        message = {"stop": True}
+    elif args.changed:
+        message = {"paths": [os.path.abspath(path) for path in args.changed]}
+    else:
+        # an empty argv builds with the options the daemon was started with
+        message = {"argv": build_argv or None}
+
+    local = any(arg.split("=")[0] in LOCAL_OPTIONS for arg in build_argv)
+    reply = None
+    if not local:
+        try:
+            reply = request(message)
+        except (FileNotFoundError, ConnectionRefusedError):
+            pass
+
+    if reply is None:
+        if args.stop:
+            print("No build daemon is running")
+            return
+        # no daemon: an ordinary one-shot build, which is incremental anyway.
+        # --changed is dropped, the build finds the changed pages itself.
+        # without arguments, it builds with the options the daemon had
+        import main as build_main
+
+        if not build_argv:
+            build_argv = load_daemon_argv() or []
+        build_main.main(build_argv)
+        return
+
+    sys.stdout.write(reply["stdout"])
+    sys.stderr.write(reply["stderr"])
+    if not args.stop:
+        print(f"Built by daemon in {reply['ms']:.1f} ms")
+    sys.exit(reply["status"])
+
+
+if __name__ == "__main__":
+    main()
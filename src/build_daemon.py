@@ -0,0 +1,233 @@
+import contextlib
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import time
+
+from block_cache import BlockCache
+from build_client import SOCKET_PATH, save_daemon_argv
+from build_manifest import BuildManifest
+from build_stats import BuildStats
+from content_cache import MemoryContentCache
+from main import (
+    CONTENT_CACHE_DIR,
+    CONTENT_DIR,
+    MANIFEST_PATH,
+    STATIC_DIR,
+    TEMPLATE_PATH,
+    output_dir,
+    parse_args,
+    run_build,
+    watch_compatible,
+)
+from page_index import PageIndex
+from watch import SiteWatcher
+
+
+class BuildDaemon:
+    """
+    runs builds inside one long lived process, so the block cache, rendered
+    content, compiled templates, the page index and the manifest stay in
+    memory between them instead of being reloaded (and the interpreter
+    restarted) for every build.
+    """
+
+    def __init__(self, args):
+        self.args = args
+        self.block_cache = None
+        if args.block_cache > 0:
+            self.block_cache = BlockCache(args.block_cache)
+        self.content_cache = MemoryContentCache(
+            CONTENT_CACHE_DIR, args.cache_size * 1024 * 1024
+        )
+        self.manifest = None
+        self.manifest_mtime = None
+        self.watcher = None
+        # one per output directory, requests can pass --out
+        self.page_indexes = {}
+
+    def _manifest(self):
+        """return a copy of the last build's manifest, or None to load it"""
+        if self.manifest is None or self.manifest_mtime != _mtime(MANIFEST_PATH):
+            # another process built since, its manifest on disk is newer
+            return None
+        return BuildManifest(MANIFEST_PATH, dict(self.manifest.entries))
+
+    def build(self, argv=None):
+        """build with argv (or the daemon's own options) and return the status"""
+        args = self.args if argv is None else parse_args(argv)
+        if args.shard or args.merge or args.watch:
+            print(
+                "--shard, --merge and --watch can't be run by the build daemon",
+                file=sys.stderr,
+            )
+            return 2
+        if (args.block_cache, args.cache_size) != (
+            self.args.block_cache,
+            self.args.cache_size,
+        ):
+            # the caches were sized when the daemon started
+            print(
+                "--block-cache and --cache-size can only be set when the build "
+                "daemon is started",
+                file=sys.stderr,
+            )
+            return 2
+
+        dest_dir = output_dir(args)
+        page_index = self.page_indexes.get(dest_dir)
+        if page_index is None:
+            page_index = self.page_indexes[dest_dir] = PageIndex(CONTENT_DIR, dest_dir)
+        stats, manifest = run_build(
+            args, self.block_cache, self.content_cache, self._manifest(), page_index
+        )
+        self.manifest = manifest
+        self.manifest_mtime = _mtime(MANIFEST_PATH)
+        if self.watcher is not None:
+            self.watcher.manifest = manifest
+        return 1 if stats.broken_links else 0
+
+    def rebuild(self, paths):
+        """
+        rebuild the outputs of changed source paths. options the watcher
+        can't honour, and a manifest written by another build since the
+        daemon's last one, fall back to an incremental build of the whole site.
+        """
+        args = self.args
+        stale = self.manifest_mtime != _mtime(MANIFEST_PATH)
+        if self.manifest is None or stale or not watch_compatible(args):
+            # the watcher would save its stale manifest over the newer one
+            return self.build()
+
+        if self.watcher is None:
+            self.watcher = SiteWatcher(
+                CONTENT_DIR,
+                STATIC_DIR,
+                TEMPLATE_PATH,
+                output_dir(args),
+                args.basepath,
+                self.manifest,
+                block_cache=self.block_cache,
+                content_cache=None if args.no_cache else self.content_cache,
+                stream=args.stream,
+                jobs=args.jobs,
+            )
+        self.watcher.stats = BuildStats()
+        self.watcher.rebuild([os.path.relpath(path) for path in paths])
+        self.manifest_mtime = _mtime(MANIFEST_PATH)
+        print(self.watcher.stats.report())
+        return 0
+
+    def handle(self, request):
+        """run one request and return its reply"""
+        out = io.StringIO()
+        err = io.StringIO()
+        start = time.perf_counter()
+        status = 0
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            try:
+                if "paths" in request:
+                    status = self.rebuild(request["paths"])
+                else:
+                    status = self.build(request.get("argv"))
+            except SystemExit as e:
+                # argparse errors and --help
+                status = e.code if isinstance(e.code, int) else 1
+            except Exception as e:
+                # keep serving, the next request will most likely fix it
+                print(f"Build failed: {e}", file=sys.stderr)
+                status = 1
+        elapsed = (time.perf_counter() - start) * 1000
+        return _reply(status, out.getvalue(), err.getvalue(), elapsed)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+        except ValueError:
+            request = None
+        if not isinstance(request, dict):
+            reply = _reply(2, stderr="bad request\n")
+        elif request.get("stop"):
+            self.server.stopping = True
+            reply = _reply(0, stdout="Build daemon stopped\n")
+        else:
+            reply = self.server.build_daemon.handle(request)
+            print(
+                f"{_describe(request)}: status {reply['status']} "
+                f"in {reply['ms']:.1f} ms"
+            )
+        self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+
+
+def _reply(status, stdout="", stderr="", ms=0.0):
+    return {"status": status, "stdout": stdout, "stderr": stderr, "ms": ms}
+
+
+def _describe(request):
+    if "paths" in request:
+        return f"rebuild {', '.join(request['paths'])}"
+    return "build " + " ".join(request.get("argv") or ["(daemon options)"])
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def serve(daemon, path=SOCKET_PATH):
+    """answer requests on a unix socket at path until asked to stop"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    _remove_stale_socket(path)
+    # requests are handled one at a time: builds share the warm caches and
+    # redirect the process's stdout
+    server = socketserver.UnixStreamServer(path, _Handler)
+    server.build_daemon = daemon
+    server.stopping = False
+    print(f"Build daemon listening on {path}")
+    try:
+        while not server.stopping:
+            server.handle_request()
+    finally:
+        server.server_close()
+        os.remove(path)
+
+
+def _remove_stale_socket(path):
+    """remove a socket left behind by a daemon that died, refuse a live one"""
+    if not os.path.exists(path):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.remove(path)
+            return
+    sys.exit(f"a build daemon is already listening on {path}")
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    args = parse_args(argv)
+    if args.shard or args.merge or args.watch:
+        sys.exit("--shard, --merge and --watch can't be run by the build daemon")
+
+    save_daemon_argv(argv)
+    daemon = BuildDaemon(args)
+    # the first build warms every cache before requests come in
+    daemon.build()
+    try:
+        serve(daemon)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import hashlib
+import json
+import os
+
+
+def hash_text(text):
+    """return the sha256 hex digest of a string"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class BuildManifest:
+    """
+    persistent record of the inputs every output page was last built from.
+    a page whose source, template and basepath hashes all match its record
+    (and whose output still exists) can be skipped on the next build. the
+    source's size and mtime are recorded too, so most unchanged pages can be
+    skipped without reading their source at all.
+    """
+
+    def __init__(self, path=None, entries=None):
+        self.path = path
+        self.entries = entries if entries is not None else {}
+        self._seen = set()
+
+    @classmethod
+    def load(cls, path):
+        """load a manifest from disk, starting empty if missing or unreadable"""
+        try:
+            with open(path, "r") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            entries = {}
+        if not isinstance(entries, dict):
+            entries = {}
+        return cls(path, entries)
+
+    def save(self):
+        """write entries seen during this build back to disk"""
+        if self.path is None:
+            return
+
+        # only keep pages that were part of this build, so outputs whose
+        # markdown was deleted drop out of the manifest
+        entries = {k: v for k, v in self.entries.items() if k in self._seen}
+
+        manifest_dir = os.path.dirname(self.path)
+        if manifest_dir:
+            os.makedirs(manifest_dir, exist_ok=True)
+
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entries, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def is_fresh(self, dest_path, inputs, maps=None):
+        """
+        check whether dest_path was already built from exactly these inputs,
+        and whether the urls it looked up in maps (see lookups_match) still
+        resolve the same
+        """
+        self._seen.add(dest_path)
+        entry = self.entries.get(dest_path)
+        if entry is None:
+            return False
+        maps = maps or {}
+        # everything but the source stat, which is only a shortcut, and the
+        # recorded lookups, which are checked against maps instead
+        recorded = {
+            key: value
+            for key, value in entry.items()
+            if key != "stat" and key not in maps
+        }
+        return (
+            recorded == inputs
+            and lookups_match(entry, maps)
+            and os.path.exists(dest_path)
+        )
+
+    def is_unchanged(
+        self, dest_path, source_stat, template_digest, basepath, maps=None
+    ):
+        """
+        quick check against the recorded source size and mtime, for skipping
+        a page without reading and hashing its source. a False result only
+        means the page needs the full is_fresh check.
+        """
+        entry = self.entries.get(dest_path)
+        if (
+            entry is None
+            or entry.get("stat") != list(source_stat)
+            or entry.get("template") != template_digest
+            or entry.get("basepath") != basepath
+            or not lookups_match(entry, maps or {})
+            or not os.path.exists(dest_path)
+        ):
+            return False
+        self._seen.add(dest_path)
+        return True
+
+    def record(self, dest_path, inputs, source_stat=None, lookups=None):
+        """
+        remember the inputs dest_path was just built from, and the urls it
+        looked up (as recorded by UrlLookups, by map name)
+        """
+        self._seen.add(dest_path)
+        entry = dict(inputs)
+        if lookups:
+            entry.update(lookups)
+        if source_stat is not None:
+            entry["stat"] = list(source_stat)
+        self.entries[dest_path] = entry
+
+    def refresh(self, dest_path, source_stat):
+        """remember the new stat of a source that was touched but not changed"""
+        self._seen.add(dest_path)
+        self.entries[dest_path]["stat"] = list(source_stat)
+
+    def discard(self, dest_path):
+        """forget a page whose source was removed"""
+        self._seen.discard(dest_path)
+        self.entries.pop(dest_path, None)
+
+
+def page_inputs(markdown, template_digest, basepath, source_digest=None):
+    """
+    describe everything a generated page depends on. source_digest can be
+    given instead of the markdown when the source was hashed from the file.
+    the asset urls and image sizes a page uses are recorded next to its
+    inputs instead, see UrlLookups.
+    """
+    if source_digest is None:
+        source_digest = hash_text(markdown)
+    inputs = {
+        "source": source_digest,
+        "template": template_digest,
+        "basepath": basepath,
+    }
+    return inputs
+
+
+class UrlLookups:
+    """
+    stands in for an asset map or image sizes while rendering, recording
+    what every url looked up in it resolved to (None for urls it doesn't
+    have) into used.
+    a page or block depends on those urls only, not on the rest of the map.
+    """
+
+    def __init__(self, mapping, used=None):
+        self.mapping = mapping
+        self.used = used if used is not None else {}
+
+    def get(self, url, default=None):
+        value = self.mapping.get(url)
+        self.used[url] = value
+        return default if value is None else value
+
+
+def lookups_match(lookups, maps):
+    """
+    check whether urls recorded by UrlLookups still resolve the same.
+    lookups holds the recorded urls by map name (e.g. "assets"), and maps
+    the map now in use by the same name, None for an option that's off.
+    """
+    for name, mapping in maps.items():
+        used = lookups.get(name)
+        if mapping is None:
+            if used is not None:
+                return False
+        elif not isinstance(used, dict):
+            return False
+        elif any(mapping.get(url) != value for url, value in used.items()):
+            return False
+    return True
@@ -0,0 +1,57 @@
+class BuildStats:
+    """counters collected while building the site"""
+
+    def __init__(self):
+        self.pages_rebuilt = 0
+        self.pages_skipped = 0
+        self.assets_copied = 0
+        self.assets_unchanged = 0
+        self.assets_deleted = 0
+        self.content_cache_hits = 0
+        self.content_cache_misses = 0
+        self.block_cache_hits = 0
+        self.block_cache_misses = 0
+        self.outputs_written = 0
+        self.outputs_unchanged = 0
+        self.compressed_written = 0
+        self.compressed_unchanged = 0
+        self.compressed_dropped = 0
+        self.broken_links = 0
+
+    def merge(self, other):
+        """add the counters of another BuildStats, e.g. from a worker process"""
+        for name, value in vars(other).items():
+            setattr(self, name, getattr(self, name) + value)
+
+    def report(self):
+        """return a human readable summary"""
+        lines = [
+            f"Pages rebuilt: {self.pages_rebuilt}, "
+            f"skipped (unchanged): {self.pages_skipped}",
+            f"Static files copied: {self.assets_copied}, "
+            f"unchanged: {self.assets_unchanged}, deleted: {self.assets_deleted}",
+        ]
+        if self.content_cache_hits or self.content_cache_misses:
+            lines.append(
+                f"Content cache hits: {self.content_cache_hits}, "
+                f"misses: {self.content_cache_misses}"
+            )
+        if self.block_cache_hits or self.block_cache_misses:
+            lines.append(
+                f"Block cache hits: {self.block_cache_hits}, "
+                f"misses: {self.block_cache_misses}"
+            )
+        if self.outputs_written or self.outputs_unchanged:
+            lines.append(
+                f"Pages written: {self.outputs_written}, "
+                f"identical on disk: {self.outputs_unchanged}"
+            )
+        if self.compressed_written or self.compressed_unchanged:
+            lines.append(
+                f"Compressed variants written: {self.compressed_written}, "
+                f"unchanged: {self.compressed_unchanged}, "
+                f"not smaller: {self.compressed_dropped}"
+            )
+        if self.broken_links:
+            lines.append(f"Broken links: {self.broken_links}")
+        return "\n".join(lines)
@@ -0,0 +1,175 @@
+import gzip
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from file_utils import walk_files, write_if_changed
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# text outputs worth serving precompressed
+COMPRESS_EXTENSIONS = (".html", ".css", ".js", ".svg", ".json", ".xml", ".txt")
+
+
+def gzip_bytes(data):
+    # a fixed mtime keeps the output identical for identical input
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def brotli_bytes(data):
+    return brotli.compress(data, quality=11)
+
+
+# (suffix, encoder) for every variant written next to an output
+ENCODERS = [(".gz", gzip_bytes)]
+if brotli is not None:
+    ENCODERS.append((".br", brotli_bytes))
+
+VARIANT_SUFFIXES = tuple(suffix for suffix, _ in ENCODERS)
+
+
+def variant_paths(paths):
+    """return the precompressed variants paths may have"""
+    return [
+        path + suffix
+        for path in paths
+        if path.endswith(COMPRESS_EXTENSIONS)
+        for suffix in VARIANT_SUFFIXES
+    ]
+
+
+def variant_source(path):
+    """return the text output path is a precompressed variant of, or None"""
+    source, suffix = os.path.splitext(path)
+    # only variants of text outputs are ours, a static .tar.gz isn't
+    if suffix in VARIANT_SUFFIXES and source.endswith(COMPRESS_EXTENSIONS):
+        return source
+    return None
+
+
+def variant_is_current(path, source):
+    """check whether the variant at path was written from source as it is now"""
+    try:
+        return os.stat(path).st_mtime_ns == os.stat(source).st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+def compress_file(path, record=None):
+    """
+    write every precompressed variant of path that is smaller than path
+    itself. a variant carries its source's mtime, so a variant whose mtime
+    still matches is up to date and skipped. record is what compress_tree
+    remembers of the variants that weren't smaller last time; while the
+    source's size and mtime match it, those aren't tried again. returns the
+    number of variants (written, unchanged, dropped for not being smaller).
+    """
+    return _compress_file(path, record)[0]
+
+
+def _compress_file(path, record):
+    """compress_file, also returning the record of variants not written"""
+    st = os.stat(path)
+    skip = ()
+    if record is not None and record[:2] == [st.st_mtime_ns, st.st_size]:
+        skip = record[2]
+    data = None
+    written = unchanged = dropped = 0
+    not_smaller = []
+    for suffix, encode in ENCODERS:
+        if suffix in skip:
+            unchanged += 1
+            not_smaller.append(suffix)
+            continue
+        variant = path + suffix
+        try:
+            variant_mtime = os.stat(variant).st_mtime_ns
+        except FileNotFoundError:
+            variant_mtime = None
+        if variant_mtime == st.st_mtime_ns:
+            unchanged += 1
+            continue
+
+        if data is None:
+            with open(path, "rb") as f:
+                data = f.read()
+        compressed = encode(data)
+        if len(compressed) >= len(data):
+            if variant_mtime is not None:
+                os.remove(variant)
+            dropped += 1
+            not_smaller.append(suffix)
+            continue
+
+        write_if_changed(variant, compressed)
+        os.utime(variant, ns=(st.st_atime_ns, st.st_mtime_ns))
+        written += 1
+
+    record = None
+    if not_smaller:
+        record = [st.st_mtime_ns, st.st_size, not_smaller]
+    return (written, unchanged, dropped), record
+
+
+def compress_tree(root, workers=None, stats=None, records_path=None):
+    """
+    precompress every text output under root on a thread pool (zlib and
+    brotli release the GIL while compressing), and remove variants whose
+    source is gone. sources whose variants weren't smaller are recorded in
+    records_path, if given, so they aren't compressed again until they
+    change.
+    """
+    records = load_records(records_path) if records_path is not None else {}
+    sources = []
+    for rel_path in walk_files(root):
+        path = os.path.join(root, rel_path)
+        if path.endswith(COMPRESS_EXTENSIONS):
+            sources.append(path)
+            continue
+        source = variant_source(path)
+        if source is not None and not os.path.exists(source):
+            os.remove(path)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(
+            executor.map(
+                _compress_file, sources, [records.get(path) for path in sources]
+            )
+        )
+
+    if records_path is not None:
+        records = {
+            path: record
+            for path, (_, record) in zip(sources, results)
+            if record is not None
+        }
+        save_records(records, records_path)
+
+    if stats is not None:
+        for (written, unchanged, dropped), _ in results:
+            stats.compressed_written += written
+            stats.compressed_unchanged += unchanged
+            stats.compressed_dropped += dropped
+
+
+def load_records(path):
+    """load the sources recorded by the previous compress_tree"""
+    try:
+        with open(path, "r") as f:
+            records = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return records if isinstance(records, dict) else {}
+
+
+def save_records(records, path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(records, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
@@ -0,0 +1,182 @@
+import functools
+import importlib.util
+import json
+import os
+import zlib
+from collections import OrderedDict
+
+from build_manifest import hash_text
+from file_utils import hash_file
+
+# the modules that turn markdown into a fragment. their source is part of
+# every key, so fragments rendered by another version of them aren't reused
+RENDERER_MODULES = ("block_markdown", "inline_markdown", "htmlnode", "textnode")
+
+
+@functools.cache
+def renderer_version():
+    """return a hash of the renderer modules' source"""
+    digests = [
+        hash_file(importlib.util.find_spec(name).origin) for name in RENDERER_MODULES
+    ]
+    return hash_text("\0".join(digests))
+
+
+class ContentCache:
+    """
+    on-disk cache of rendered {{ Content }} fragments keyed by a hash of the
+    page markdown, so a page whose markdown is unchanged only needs its
+    template refilled. each fragment is stored with the asset urls it looked
+    up while rendering (see UrlLookups), which the caller checks against the
+    current map, and with its link targets. fragments are zlib compressed,
+    and the least recently used ones are evicted once the cache grows past
+    max_bytes.
+    """
+
+    def __init__(self, directory, max_bytes=64 * 1024 * 1024, read=True):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.read = read
+
+    def without_reads(self):
+        """
+        return a cache over the same directory that stores fragments but
+        never returns them, for --full builds that mustn't trust earlier ones
+        """
+        return ContentCache(self.directory, self.max_bytes, read=False)
+
+    def key(self, markdown, basepath="/", assets=None, images=None, minify=False):
+        """
+        return the cache key for a page's markdown rendered at basepath, with
+        asset urls fingerprinted if assets is given, img tags sized by images
+        if given, and minified if minify is set. only whether assets and
+        images are used is part of the key, the urls each fragment looked up
+        in them are stored with it
+        """
+        fingerprint = int(assets is not None)
+        sized = int(images is not None)
+        options = f"{basepath}\0{fingerprint}\0{sized}\0{int(minify)}"
+        return hash_text(f"{renderer_version()}\0{options}\0{markdown}")
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key):
+        """return the cached (fragment, lookups, targets) for key, or None"""
+        if not self.read:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            # the lookups and targets are stored as a line of json before
+            # the fragment
+            header, html = zlib.decompress(data).decode("utf-8").split("\n", 1)
+            header = json.loads(header)
+            lookups, targets = header["lookups"], header["targets"]
+        except (OSError, zlib.error, UnicodeDecodeError, ValueError, KeyError):
+            return None
+
+        # refresh the mtime so eviction sees this entry as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return html, lookups, targets
+
+    def put(self, key, html, lookups=None, targets=None):
+        """
+        store a rendered fragment, the urls it looked up and its link targets
+        under key
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        header = {"lookups": lookups or {}, "targets": targets or []}
+        data = json.dumps(header, sort_keys=True) + "\n" + html
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(zlib.compress(data.encode("utf-8"), 6))
+        os.replace(tmp_path, path)
+
+    def evict(self):
+        """delete least recently used entries until the cache fits max_bytes"""
+        entries = []
+        total = 0
+        if not os.path.isdir(self.directory):
+            return 0
+
+        # other builds (e.g. shards on this machine) may share the cache and
+        # evict at the same time, so entries can vanish underneath us
+        for bucket in os.scandir(self.directory):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime_ns, st.st_size, entry.path))
+                total += st.st_size
+
+        removed = 0
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
+
+
+class MemoryContentCache(ContentCache):
+    """
+    a ContentCache that also keeps recently used fragments in memory, for a
+    process that builds many times (the build daemon). fragments are still
+    written through to disk, so one-shot builds find them too. worker
+    processes get a copy without the memory part.
+    """
+
+    def __init__(self, directory, max_bytes=64 * 1024 * 1024):
+        super().__init__(directory, max_bytes)
+        self.fragments = OrderedDict()
+        self.memory_bytes = 0
+
+    def __getstate__(self):
+        return {"directory": self.directory, "max_bytes": self.max_bytes}
+
+    def __setstate__(self, state):
+        self.__init__(state["directory"], state["max_bytes"])
+
+    def without_reads(self):
+        # the fragments in memory are no more trusted than those on disk
+        self.fragments.clear()
+        self.memory_bytes = 0
+        return super().without_reads()
+
+    def get(self, key):
+        entry = self.fragments.get(key)
+        if entry is not None:
+            self.fragments.move_to_end(key)
+            return entry
+        entry = super().get(key)
+        if entry is not None:
+            self._remember(key, entry)
+        return entry
+
+    def put(self, key, html, lookups=None, targets=None):
+        super().put(key, html, lookups, targets)
+        self._remember(key, (html, lookups or {}, targets or []))
+
+    def _remember(self, key, entry):
+        previous = self.fragments.pop(key, None)
+        if previous is not None:
+            self.memory_bytes -= len(previous[0])
+        self.fragments[key] = entry
+        self.memory_bytes += len(entry[0])
+        while self.memory_bytes > self.max_bytes and len(self.fragments) > 1:
+            _, (evicted, *_) = self.fragments.popitem(last=False)
+            self.memory_bytes -= len(evicted)
@@ -1,12 +1,26 @@
+import hashlib
 import os
 import shutil
 
 
-def copy_directory(src, dst):
+def copy_directory(src, dst, sync=False, checksum=False, keep=(), stats=None):
     """
     recursively copy all contents from src directory to dst directory.
-    deletes dst contents first for a clean copy.
+    deletes dst contents first for a clean copy, unless sync is set, in
+    which case only changed files are copied and orphaned files are removed.
+    paths listed in keep are never deleted by a sync.
     """
+    if sync:
+        keep = {os.path.normpath(path) for path in keep}
+        keep_dirs = set()
+        for path in keep:
+            parent = os.path.dirname(path)
+            while parent and parent not in keep_dirs:
+                keep_dirs.add(parent)
+                parent = os.path.dirname(parent)
+        _sync_contents(src, dst, checksum, keep, keep_dirs, stats)
+        return
+
     # delete destination if it exists
     if os.path.exists(dst):
         shutil.rmtree(dst)
@@ -17,20 +31,174 @@ def copy_directory(src, dst):
     print(f"Created directory: {dst}")
 
     # copy all contents recursively
-    _copy_contents(src, dst)
+    _copy_contents(src, dst, stats)
 
 
-def _copy_contents(src, dst):
+def _copy_contents(src, dst, stats=None):
     """helper function to recursively copy contents."""
     for item in os.listdir(src):
         src_path = os.path.join(src, item)
         dst_path = os.path.join(dst, item)
 
         if os.path.isfile(src_path):
-            shutil.copy(src_path, dst_path)
+            # keep metadata, so the next sync sees the file as unchanged
+            copy_file(src_path, dst_path)
             print(f"Copied file: {src_path} -> {dst_path}")
+            if stats is not None:
+                stats.assets_copied += 1
         else:
             # it's a directory, create it and recurse
             os.mkdir(dst_path)
             print(f"Created directory: {dst_path}")
-            _copy_contents(src_path, dst_path)
+            _copy_contents(src_path, dst_path, stats)
+
+
+def _sync_contents(src, dst, checksum, keep, keep_dirs, stats):
+    """helper function to copy only changed files and drop orphans."""
+    if not os.path.isdir(dst):
+        if os.path.lexists(dst):
+            os.remove(dst)
+        os.mkdir(dst)
+        print(f"Created directory: {dst}")
+
+    names = set()
+    with os.scandir(src) as entries:
+        for entry in entries:
+            names.add(entry.name)
+            dst_path = os.path.join(dst, entry.name)
+
+            if entry.is_dir():
+                _sync_contents(entry.path, dst_path, checksum, keep, keep_dirs, stats)
+                continue
+
+            if os.path.isdir(dst_path):
+                shutil.rmtree(dst_path)
+            if files_match(entry.path, dst_path, checksum, entry.stat()):
+                if stats is not None:
+                    stats.assets_unchanged += 1
+                continue
+
+            copy_file(entry.path, dst_path)
+            print(f"Copied file: {entry.path} -> {dst_path}")
+            if stats is not None:
+                stats.assets_copied += 1
+
+    _remove_orphans(dst, names, keep, keep_dirs, stats)
+
+
+def _remove_orphans(dst, names, keep, keep_dirs, stats):
+    """delete entries of dst not in names, sparing kept paths."""
+    with os.scandir(dst) as entries:
+        orphans = [entry for entry in entries if entry.name not in names]
+
+    for entry in orphans:
+        path = os.path.normpath(entry.path)
+        if path in keep:
+            continue
+        if entry.is_dir(follow_symlinks=False):
+            if path in keep_dirs:
+                # holds generated files, only clear out what isn't kept
+                _remove_orphans(entry.path, (), keep, keep_dirs, stats)
+                continue
+            shutil.rmtree(entry.path)
+        else:
+            os.remove(entry.path)
+        print(f"Deleted orphan: {entry.path}")
+        if stats is not None:
+            stats.assets_deleted += 1
+
+
+def files_match(src_path, dst_path, checksum=False, src_stat=None):
+    """
+    check whether dst_path already holds a copy of src_path.
+    compares size and mtime, or size and content hash when checksum is set.
+    """
+    try:
+        dst_stat = os.stat(dst_path)
+    except FileNotFoundError:
+        return False
+    if src_stat is None:
+        src_stat = os.stat(src_path)
+
+    if src_stat.st_size != dst_stat.st_size:
+        return False
+    if checksum:
+        return hash_file(src_path) == hash_file(dst_path)
+    return src_stat.st_mtime_ns == dst_stat.st_mtime_ns
+
+
+def copy_file(src_path, dst_path):
+    """
+    copy a file with its metadata, replacing dst_path atomically so a web
+    server never sees a partially written file.
+    """
+    tmp_path = dst_path + ".tmp"
+    shutil.copy2(src_path, tmp_path)
+    os.replace(tmp_path, dst_path)
+
+
+def hash_file(path, chunk_size=1 << 20):
+    """return the sha256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_if_changed(path, data):
+    """
+    atomically write bytes to path unless it already holds exactly those
+    bytes. returns True if the file was written.
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        st = None
+    if st is not None and st.st_size == len(data):
+        with open(path, "rb") as f:
+            if f.read() == data:
+                return False
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return True
+
+
+def prune_outputs(dest_dir, keep):
+    """delete files under dest_dir that aren't listed in keep"""
+    keep = {os.path.normpath(path) for path in keep}
+    for rel_path in list(walk_files(dest_dir)):
+        path = os.path.join(dest_dir, rel_path)
+        if os.path.normpath(path) not in keep:
+            os.remove(path)
+    remove_empty_dirs(dest_dir)
+
+
+def walk_files(root):
+    """yield the path of every file under root, relative to root"""
+    if not os.path.isdir(root):
+        return
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    stack.append(entry.path)
+                else:
+                    yield os.path.relpath(entry.path, root)
+
+
+def remove_empty_dirs(root):
+    """delete empty directories below root"""
+    for dirpath, _, _ in os.walk(root, topdown=False):
+        if dirpath == root:
+            continue
+        try:
+            os.rmdir(dirpath)
+        except OSError:
+            # not empty
+            pass
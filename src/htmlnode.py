@@ -1,9 +1,19 @@
+import re
+
 from textnode import TextType
 
+# elements that have no content and no closing tag
+VOID_ELEMENTS = frozenset({"br", "hr", "img", "input", "link", "meta", "source", "wbr"})
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
 
 class HTMLNode:
     """base class for HTML nodes with tag, value, children, and properties"""
 
+    # pages create a node per inline span, so skip the per-instance __dict__
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
         self.value = value
@@ -14,6 +24,22 @@ class HTMLNode:
         """convert node to HTML string (must be implemented by subclasses)"""
         raise NotImplementedError
 
+    def to_compact_html(self):
+        """
+        convert node to HTML string with runs of whitespace in text outside
+        <pre> collapsed to one space and void elements left unclosed (must be
+        implemented by subclasses)
+        """
+        raise NotImplementedError
+
+    def iter_html(self):
+        """yield the node's HTML as a sequence of string fragments"""
+        yield self.to_html()
+
+    def write_html(self, fp):
+        """stream the node's HTML to a file object without building it in memory"""
+        fp.writelines(self.iter_html())
+
     def props_to_html(self):
         """convert properties dict to HTML attribute string"""
         if not self.props:
@@ -28,6 +54,8 @@ class HTMLNode:
 class LeafNode(HTMLNode):
     """HTML node with no children, represents leaf elements like text or img"""
 
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
         super().__init__(tag=tag, value=value, props=props)
 
@@ -41,10 +69,26 @@ class LeafNode(HTMLNode):
 
         return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
 
+    def to_compact_html(self):
+        """render leaf node as compact HTML string"""
+        if self.value is None:
+            raise ValueError
+
+        if self.tag in VOID_ELEMENTS:
+            return f"<{self.tag}{self.props_to_html()}>"
+
+        value = _collapse(self.value)
+        if not self.tag:
+            return value
+
+        return f"<{self.tag}{self.props_to_html()}>{value}</{self.tag}>"
+
 
 class ParentNode(HTMLNode):
     """HTML node with children, represents container elements like div, p, etc"""
 
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         super().__init__(tag=tag, children=children, props=props)
 
@@ -60,6 +104,34 @@ class ParentNode(HTMLNode):
 
         return f"<{self.tag}{self.props_to_html()}>{children_html}</{self.tag}>"
 
+    def to_compact_html(self):
+        """render parent node and all children as compact HTML string"""
+        if not self.tag:
+            raise ValueError("ParentNode must have a tag")
+
+        if not self.children:
+            raise ValueError("ParentNode must have children")
+
+        if self.tag == "pre":
+            children_html = "".join(child.to_html() for child in self.children)
+        else:
+            children_html = "".join(child.to_compact_html() for child in self.children)
+
+        return f"<{self.tag}{self.props_to_html()}>{children_html}</{self.tag}>"
+
+    def iter_html(self):
+        """yield opening tag, each child's fragments, then closing tag"""
+        if not self.tag:
+            raise ValueError("ParentNode must have a tag")
+
+        if not self.children:
+            raise ValueError("ParentNode must have children")
+
+        yield f"<{self.tag}{self.props_to_html()}>"
+        for child in self.children:
+            yield from child.iter_html()
+        yield f"</{self.tag}>"
+
 
 def text_node_to_html_node(text_node):
     """convert a text node to the appropriate HTML node based on text type"""
@@ -78,3 +150,63 @@ def text_node_to_html_node(text_node):
             return LeafNode("img", "", {"src": text_node.url, "alt": text_node.text})
         case _:
             raise ValueError(f"Invalid text type: {text_node.text_type}")
+
+
+def apply_basepath(node, basepath, assets=None):
+    """
+    rewrite root-relative href and src attributes in a node tree to basepath.
+    urls of fingerprinted static files are swapped for their published urls
+    when an asset map is given.
+    """
+    if basepath == "/" and assets is None:
+        return node
+
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if current.props:
+            for attr in ("href", "src"):
+                url = current.props.get(attr)
+                if url is not None and url.startswith("/"):
+                    if assets is not None:
+                        url = assets.get(url, url)
+                    current.props[attr] = basepath + url[1:]
+        if current.children:
+            stack.extend(current.children)
+    return node
+
+
+def apply_image_sizes(node, images):
+    """
+    add width and height to img tags whose root-relative src is a static
+    image in images, and mark every img for lazy loading and async decoding.
+    must run before apply_basepath rewrites the src.
+    """
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if current.tag == "img" and current.props is not None:
+            size = images.get(current.props.get("src"))
+            if size is not None:
+                current.props["width"] = str(size[0])
+                current.props["height"] = str(size[1])
+            current.props["loading"] = "lazy"
+            current.props["decoding"] = "async"
+        if current.children:
+            stack.extend(current.children)
+    return node
+
+
+def minify_node(node):
+    """
+    render a node tree compactly (see to_compact_html), in the same pass
+    that renders it, and return the html as a raw leaf node
+    """
+    return LeafNode(None, node.to_compact_html())
+
+
+def _collapse(value):
+    # most text has nothing to collapse, skip the regex for it
+    if value and ("  " in value or "\n" in value or "\t" in value or "\r" in value):
+        return WHITESPACE_PATTERN.sub(" ", value)
+    return value
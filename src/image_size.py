@@ -0,0 +1,148 @@
+import json
+import os
+import struct
+
+from build_manifest import hash_text
+from file_utils import walk_files
+
+# static files whose dimensions are read
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".webp")
+
+# jpeg start-of-frame markers, which hold the image size. c4, c8 and cc
+# share the range but mean something else
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def read_image_size(path):
+    """
+    return (width, height) of a png, jpeg, gif or webp image, or None if it
+    isn't one of those or its header is damaged. only the header is read,
+    however large the file is.
+    """
+    with open(path, "rb") as f:
+        head = f.read(32)
+        try:
+            if head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR":
+                return struct.unpack(">II", head[16:24])
+            if head[:6] in (b"GIF87a", b"GIF89a"):
+                return struct.unpack("<HH", head[6:10])
+            if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+                return _webp_size(head)
+            if head[:2] == b"\xff\xd8":
+                f.seek(2)
+                return _jpeg_size(f)
+        except (struct.error, IndexError):
+            pass
+    return None
+
+
+def _webp_size(head):
+    chunk = head[12:16]
+    if chunk == b"VP8 " and head[23:26] == b"\x9d\x01\x2a":
+        # lossy: 14 bit dimensions after the frame start code
+        width, height = struct.unpack("<HH", head[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and head[20] == 0x2F:
+        # lossless: 14 bits each of width - 1 and height - 1
+        bits = int.from_bytes(head[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        # extended: 24 bits each of width - 1 and height - 1
+        width = int.from_bytes(head[24:27], "little") + 1
+        height = int.from_bytes(head[27:30], "little") + 1
+        return width, height
+    return None
+
+
+def _jpeg_size(f):
+    """walk jpeg segment headers, seeking past their data, to the frame header"""
+    while True:
+        # every segment starts with 0xff, optionally padded with more of them
+        if f.read(1) != b"\xff":
+            return None
+        marker = f.read(1)
+        while marker == b"\xff":
+            marker = f.read(1)
+        if not marker:
+            return None
+        marker = marker[0]
+        if marker == 0xD8 or 0xD0 <= marker <= 0xD7:
+            # standalone markers without a length
+            continue
+        if marker in (0xD9, 0xDA):
+            # end of image or start of scan, there was no frame header
+            return None
+        length = struct.unpack(">H", f.read(2))[0]
+        if length < 2:
+            return None
+        if marker in JPEG_SOF_MARKERS:
+            height, width = struct.unpack(">xHH", f.read(5))
+            return width, height
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+class ImageSizes:
+    """
+    maps the root-relative url of every static image to its (width, height).
+    two maps with the same sizes compare (and hash) equal.
+    """
+
+    def __init__(self, sizes, records=None):
+        self.sizes = sizes
+        # (size, mtime_ns, width, height) per image, to skip rereading it
+        self.records = records if records is not None else {}
+        self.digest = hash_text(json.dumps(sizes, sort_keys=True))
+
+    def get(self, url, default=None):
+        return self.sizes.get(url, default)
+
+    def __eq__(self, other):
+        return isinstance(other, ImageSizes) and self.digest == other.digest
+
+    def __hash__(self):
+        return hash(self.digest)
+
+
+def scan_image_sizes(static_dir, previous_records=None):
+    """
+    read the size of every static image and return its ImageSizes. images
+    whose size and mtime match previous_records reuse the recorded size
+    instead of being opened again.
+    """
+    previous_records = previous_records or {}
+    sizes = {}
+    records = {}
+    for rel_path in sorted(walk_files(static_dir)):
+        if not rel_path.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        src_path = os.path.join(static_dir, rel_path)
+        st = os.stat(src_path)
+        record = previous_records.get(rel_path)
+        if record is not None and record[:2] == [st.st_size, st.st_mtime_ns]:
+            size = record[2:] if record[2] is not None else None
+        else:
+            size = read_image_size(src_path)
+        records[rel_path] = [st.st_size, st.st_mtime_ns, *(size or (None, None))]
+        if size is not None:
+            sizes["/" + rel_path.replace(os.sep, "/")] = list(size)
+    return ImageSizes(sizes, records)
+
+
+def load_records(path):
+    """load the image sizes recorded by the previous build"""
+    try:
+        with open(path, "r") as f:
+            records = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return records if isinstance(records, dict) else {}
+
+
+def save_records(images, path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(images.records, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
@@ -29,93 +29,154 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
     return new_nodes
 
 
-def split_nodes_image(old_nodes):
-    """extract image nodes from text and split into separate nodes"""
-    new_nodes = []
-    for node in old_nodes:
-        if node.text_type != TextType.TEXT:
-            new_nodes.append(node)
-            continue
-
-        images = extract_markdown_images(node.text)
-        # if there are no images, it's all text
-        if len(images) == 0:
-            new_nodes.append(node)
-            continue
-
-        original_text = node.text
-        for image in images:
-            parts = original_text.split(f"![{image[0]}]({image[1]})", 1)
-            # the parts should be two, otherwise split failed and
-            # the image markdown was malformed
-            if len(parts) != 2:
-                raise ValueError("Invalid markdown, image section not closed")
-
-            # in the case where there's text before the image
-            if parts[0] != "":
-                new_nodes.append(TextNode(parts[0], TextType.TEXT))
-            new_nodes.append(TextNode(image[0], TextType.IMAGE, image[1]))
-            original_text = parts[1]
+# image and link markdown, compiled once instead of on every call
+IMAGE_PATTERN = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+LINK_PATTERN = re.compile(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)")
 
-        # for leftover text
-        if original_text != "":
-            new_nodes.append(TextNode(original_text, TextType.TEXT))
 
-    return new_nodes
+def split_nodes_image(old_nodes):
+    """extract image nodes from text and split into separate nodes"""
+    return _split_nodes_pattern(old_nodes, IMAGE_PATTERN, "![", TextType.IMAGE)
 
 
 def split_nodes_link(old_nodes):
     """extract link nodes from text and split into separate nodes"""
+    return _split_nodes_pattern(old_nodes, LINK_PATTERN, "](", TextType.LINK)
+
+
+def _split_nodes_pattern(old_nodes, pattern, trigger, text_type):
+    """
+    split text nodes around every match of pattern in a single regex pass.
+    nodes that don't contain trigger can't match and are passed through
+    without running the regex.
+    """
     new_nodes = []
     for node in old_nodes:
-        if node.text_type != TextType.TEXT:
+        if node.text_type != TextType.TEXT or trigger not in node.text:
             new_nodes.append(node)
             continue
 
-        links = extract_markdown_links(node.text)
-        # if there are no links, it's all text
-        if len(links) == 0:
+        # split yields [text, label, url, text, label, url, ..., text]
+        parts = pattern.split(node.text)
+        if len(parts) == 1:
+            # no matches, it's all text
             new_nodes.append(node)
             continue
 
-        original_text = node.text
-        for link in links:
-            parts = original_text.split(f"[{link[0]}]({link[1]})", 1)
-            # the parts should be two, otherwise split failed and
-            # the link markdown was malformed
-            if len(parts) != 2:
-                raise ValueError("Invalid markdown, link section not closed")
-
-            # in the case where there's text before the link
-            if parts[0] != "":
-                new_nodes.append(TextNode(parts[0], TextType.TEXT))
-            new_nodes.append(TextNode(link[0], TextType.LINK, link[1]))
-            original_text = parts[1]
+        for i in range(0, len(parts) - 1, 3):
+            # in the case where there's text before the match
+            if parts[i]:
+                new_nodes.append(TextNode(parts[i], TextType.TEXT))
+            new_nodes.append(TextNode(parts[i + 1], text_type, parts[i + 2]))
 
         # for leftover text
-        if original_text != "":
-            new_nodes.append(TextNode(original_text, TextType.TEXT))
+        if parts[-1]:
+            new_nodes.append(TextNode(parts[-1], TextType.TEXT))
 
     return new_nodes
 
 
 def extract_markdown_images(text):
     """extract all image markdown patterns from text, returning tuples of (alt, src)"""
-    return re.findall(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+    return IMAGE_PATTERN.findall(text)
 
 
 def extract_markdown_links(text):
     """extract all link markdown patterns from text, returning tuples of (text, url)"""
-    return re.findall(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+    return LINK_PATTERN.findall(text)
+
+
+# opening inline delimiters, longest first so "**" wins over "*"
+DELIMITER_PATTERN = re.compile(r"\*\*|\*|_|`")
+
+DELIMITER_TYPES = {
+    "**": TextType.BOLD,
+    "*": TextType.ITALIC,
+    "_": TextType.ITALIC,
+    "`": TextType.CODE,
+}
+
+# characters that may not appear inside a span opened by each delimiter,
+# mirroring the order the delimiters used to be split in
+FORBIDDEN_INSIDE = {
+    "**": "",
+    "*": "",
+    "_": "*",
+    "`": "*_",
+}
+
+# the "[text](url)" part shared by image and link markdown
+BRACKET_LINK_PATTERN = re.compile(r"\[([^\[\]]*)\]\(([^\(\)]*)\)")
 
 
 def text_to_textnodes(text):
-    """parse text into a list of text nodes with proper formatting types"""
-    nodes = [TextNode(text, TextType.TEXT)]
-    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
-    nodes = split_nodes_delimiter(nodes, "*", TextType.ITALIC)
-    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
-    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
-    nodes = split_nodes_image(nodes)
-    nodes = split_nodes_link(nodes)
-    return nodes
+    """
+    parse text into a list of text nodes with proper formatting types.
+    scans the text once: delimited spans are matched left to right and
+    images and links are extracted from the plain text between them.
+    """
+    nodes = []
+    if "*" not in text and "_" not in text and "`" not in text:
+        # no delimited spans, three memchr scans beat a regex search
+        _append_plain_text(nodes, text)
+        return nodes
+
+    pos = 0
+    while True:
+        match = DELIMITER_PATTERN.search(text, pos)
+        if match is None:
+            _append_plain_text(nodes, text[pos:])
+            return nodes
+
+        delimiter = match.group()
+        _append_plain_text(nodes, text[pos : match.start()])
+
+        start = match.end()
+        end = _find_closing_delimiter(text, delimiter, start)
+        if end > start:
+            nodes.append(TextNode(text[start:end], DELIMITER_TYPES[delimiter]))
+        pos = end + len(delimiter)
+
+
+def _find_closing_delimiter(text, delimiter, start):
+    """return the index of the delimiter closing a span that starts at start"""
+    end = text.find(delimiter, start)
+    if end == -1 or (delimiter == "*" and text.startswith("*", end + 1)):
+        raise ValueError(
+            f"Invalid Markdown: matching delimiter '{delimiter}' not found"
+        )
+    for char in FORBIDDEN_INSIDE[delimiter]:
+        if text.find(char, start, end) != -1:
+            raise ValueError(
+                f"Invalid Markdown: matching delimiter '{delimiter}' not found"
+            )
+    return end
+
+
+def _append_plain_text(nodes, text):
+    """append text nodes for a plain run, splitting out images and links"""
+    if not text:
+        return
+    if "](" not in text:
+        # no image or link markdown, skip the regex
+        nodes.append(TextNode(text, TextType.TEXT))
+        return
+
+    # split yields [text, label, url, text, label, url, ..., text]; a "!"
+    # ending the text before a bracket makes that match an image
+    parts = BRACKET_LINK_PATTERN.split(text)
+    append = nodes.append
+    plain, link, image = TextType.TEXT, TextType.LINK, TextType.IMAGE
+    for i in range(0, len(parts) - 1, 3):
+        before = parts[i]
+        if before.endswith("!"):
+            if len(before) > 1:
+                append(TextNode(before[:-1], plain))
+            append(TextNode(parts[i + 1], image, parts[i + 2]))
+            continue
+        if before:
+            append(TextNode(before, plain))
+        append(TextNode(parts[i + 1], link, parts[i + 2]))
+
+    if parts[-1]:
+        append(TextNode(parts[-1], plain))
@@ -0,0 +1,120 @@
+import json
+import os
+from urllib.parse import unquote, urlsplit
+
+from file_utils import walk_files
+from textnode import TextType
+
+TARGET_KINDS = {TextType.IMAGE: "image", TextType.LINK: "link"}
+
+
+def extract_targets(text_nodes):
+    """
+    return [kind, url] for every root-relative link and image among the text
+    nodes the inline parser produced for a block, kind being "link" or "image"
+    """
+    return [
+        [TARGET_KINDS[node.text_type], node.url]
+        for node in text_nodes
+        if node.text_type in TARGET_KINDS and _is_local(node.url)
+    ]
+
+
+def _is_local(url):
+    return url.startswith("/") and not url.startswith("//")
+
+
+def site_paths(dest_dir, outputs, static_dir):
+    """
+    return the set of paths (relative to the site root, "/" separated) that
+    a build serves: its generated pages and the files copied from static_dir
+    """
+    paths = {os.path.relpath(path, dest_dir).replace(os.sep, "/") for path in outputs}
+    paths.update(rel_path.replace(os.sep, "/") for rel_path in walk_files(static_dir))
+    return paths
+
+
+def resolves(url, paths):
+    """
+    check whether a root-relative url is served by one of paths. directory
+    urls are served by their index.html, and extensionless urls by the .html
+    page of that name, the way the site's host does.
+    """
+    path = unquote(urlsplit(url).path).lstrip("/")
+    if path == "" or path.endswith("/"):
+        return path + "index.html" in paths
+    return path in paths or path + ".html" in paths or path + "/index.html" in paths
+
+
+class LinkIndex:
+    """
+    the root-relative link and image targets of every page, collected while
+    pages are rendered and kept between builds, so pages skipped by an
+    incremental build are still checked against the current set of outputs.
+    """
+
+    def __init__(self, path=None, entries=None):
+        self.path = path
+        self.entries = entries if entries is not None else {}
+
+    @classmethod
+    def load(cls, path):
+        """load an index from disk, starting empty if missing or unreadable"""
+        try:
+            with open(path, "r") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            entries = {}
+        if not isinstance(entries, dict):
+            entries = {}
+        return cls(path, entries)
+
+    def record(self, dest_path, targets):
+        """remember the targets of the page written to dest_path"""
+        self.entries[dest_path] = targets
+
+    def has(self, dest_path):
+        return dest_path in self.entries
+
+    def broken(self, outputs, paths):
+        """
+        return {page: [[kind, url], ...]} for the pages in outputs with
+        targets that don't resolve to any of paths
+        """
+        report = {}
+        for dest_path in outputs:
+            missing = [
+                target
+                for target in self.entries.get(dest_path, ())
+                if not resolves(target[1], paths)
+            ]
+            if missing:
+                report[dest_path] = missing
+        return report
+
+    def save(self, outputs):
+        """write the entries of the pages in outputs back to disk"""
+        if self.path is None:
+            return
+        entries = {
+            dest_path: self.entries[dest_path]
+            for dest_path in outputs
+            if dest_path in self.entries
+        }
+
+        index_dir = os.path.dirname(self.path)
+        if index_dir:
+            os.makedirs(index_dir, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entries, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+def format_report(report):
+    """return broken targets grouped by page, as printed after a build"""
+    lines = []
+    for dest_path, targets in sorted(report.items()):
+        lines.append(f"{dest_path}:")
+        lines.extend(f"  broken {kind}: {url}" for kind, url in targets)
+    return "\n".join(lines)
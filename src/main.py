@@ -1,18 +1,536 @@
+import argparse
+import os
 import sys
 
-from block_markdown import generate_pages_recursive
-from file_utils import copy_directory
+import profiler
+from assets import (
+    load_hashes,
+    publish_assets,
+    save_hashes,
+    scan_assets,
+    write_asset_manifest,
+)
+from block_cache import BlockCache
+from block_markdown import BuildError, generate_pages_recursive
+from build_manifest import BuildManifest
+from build_stats import BuildStats
+from content_cache import ContentCache
+from compress import compress_tree, variant_paths
+from file_utils import copy_directory, prune_outputs, walk_files
+from image_size import load_records, save_records, scan_image_sizes
+from link_check import LinkIndex, format_report, site_paths
+from output_writer import OutputWriteError, OutputWriter
+from page_index import build_page_index
+from search_index import SearchStore, write_search_index
+from shard import (
+    SHARD_SEARCH_DIR,
+    MergeError,
+    merge_shards,
+    parse_shard,
+    select_shard,
+)
+from watch import SiteWatcher, serve
 
+CONTENT_DIR = "content"
+STATIC_DIR = "static"
+TEMPLATE_PATH = "template.html"
+DEST_DIR = "docs"
+MANIFEST_PATH = os.path.join(".cache", "build-manifest.json")
+LINKS_PATH = os.path.join(".cache", "links.json")
+CONTENT_CACHE_DIR = os.path.join(".cache", "content")
+SHARDS_DIR = os.path.join(".cache", "shards")
+ASSET_HASHES_PATH = os.path.join(".cache", "asset-hashes.json")
+ASSET_MANIFEST_NAME = "asset-manifest.json"
+IMAGE_SIZES_PATH = os.path.join(".cache", "image-sizes.json")
+SEARCH_STORE_DIR = os.path.join(".cache", "search")
+SEARCH_INDEX_NAME = "search"
+COMPRESS_RECORDS_PATH = os.path.join(".cache", "compress.json")
 
-def main():
-    # get basepath from CLI argument, default to /
-    basepath = sys.argv[1] if len(sys.argv) > 1 else "/"
 
-    # copy static files to docs
-    copy_directory("static", "docs")
+def shard_arg(text):
+    try:
+        return parse_shard(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="build the static site into docs/")
+    parser.add_argument(
+        "basepath", nargs="?", default="/", help="root path the site is served from"
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="regenerate every page and recopy static files from scratch",
+    )
+    parser.add_argument(
+        "--checksum",
+        action="store_true",
+        help="compare static files by content hash instead of size and mtime",
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="number of worker processes used to generate pages",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="don't reuse rendered page content from earlier builds",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=64,
+        metavar="MB",
+        help="size limit of the rendered content cache",
+    )
+    parser.add_argument(
+        "--block-cache",
+        type=int,
+        default=4096,
+        metavar="BLOCKS",
+        help="number of rendered blocks kept in memory for reuse, 0 to disable",
+    )
+    parser.add_argument(
+        "--write-threads",
+        type=int,
+        default=4,
+        help="threads writing pages in the background, 0 to write inline",
+    )
+    parser.add_argument(
+        "--fingerprint",
+        action="store_true",
+        help="publish static files under content hashed names and point pages "
+        "at them, so they can be cached forever",
+    )
+    parser.add_argument(
+        "--image-sizes",
+        action="store_true",
+        help="give images from static/ their width and height, and mark all "
+        "images for lazy loading",
+    )
+    parser.add_argument(
+        "--minify",
+        action="store_true",
+        help="collapse whitespace in the template and page content, leaving "
+        "<pre> blocks as written",
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="write .gz (and .br, with the brotli module) copies of text outputs "
+        "that are smaller than the original",
+    )
+    parser.add_argument(
+        "--search",
+        action="store_true",
+        help="write a search index of page text to docs/search/, updated "
+        "incrementally from the pages each build regenerates",
+    )
+    parser.add_argument(
+        "--check-links",
+        action="store_true",
+        help="report root-relative links and images that don't point at a page "
+        "or static file, and exit with status 1 if there are any",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="read and render markdown incrementally, so very large pages are "
+        "never held in memory whole",
+    )
+    parser.add_argument(
+        "--shard",
+        type=shard_arg,
+        metavar="I/N",
+        help="build only shard I of N of the pages (no static files), for "
+        "combining with --merge",
+    )
+    parser.add_argument(
+        "--merge",
+        nargs="+",
+        metavar="DIR",
+        help="combine shard outputs and static files into docs/ instead of building",
+    )
+    parser.add_argument(
+        "--out",
+        metavar="DIR",
+        help="output directory (default: docs/, or .cache/shards/I-of-N for --shard)",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="serve docs/ locally and rebuild affected outputs when sources change",
+    )
+    parser.add_argument(
+        "--port", type=int, default=8888, help="port used by --watch to serve docs/"
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="time each build phase and print the slowest pages and phases",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="FILE",
+        help="write per-page and per-phase timings to FILE as json (implies --profile)",
+    )
+    args = parser.parse_args(argv)
+    if args.watch and not watch_compatible(args):
+        parser.error(
+            "--watch can't be combined with --shard, --merge, --fingerprint, "
+            "--image-sizes, --minify, --search, --check-links or --compress"
+        )
+    return args
+
+
+def watch_compatible(args):
+    """check whether the watcher's per-file rebuilds can keep up with args"""
+    return not (
+        args.shard
+        or args.merge
+        or args.fingerprint
+        or args.image_sizes
+        or args.minify
+        or args.search
+        or args.check_links
+        or args.compress
+    )
+
+
+def output_dir(args):
+    """return the directory this run writes the site (or its shard) to"""
+    if args.out:
+        return args.out
+    if args.shard is not None:
+        index, count = args.shard
+        return os.path.join(SHARDS_DIR, f"{index}-of-{count}")
+    return DEST_DIR
+
+
+def build(
+    args, stats, block_cache=None, content_cache=None, manifest=None, page_index=None
+):
+    """
+    run one build and return its manifest. a long running process can pass
+    in the content cache and the manifest of its last build to reuse them
+    instead of the ones on disk, and a PageIndex of the output directory to
+    refresh instead of walking content/ again.
+    """
+    dest_dir = output_dir(args)
+    manifest_path = MANIFEST_PATH
+    links_path = LINKS_PATH
+    if page_index is not None:
+        pages = page_index.refresh()
+    else:
+        pages = build_page_index(CONTENT_DIR, dest_dir)
+
+    # links may point at pages of other shards, so check against all of them
+    link_targets = None
+    if args.check_links:
+        link_targets = site_paths(dest_dir, [page.output for page in pages], STATIC_DIR)
+
+    search = None
+    search_dir = os.path.join(dest_dir, SEARCH_INDEX_NAME)
+    search_outputs = []
+    if args.search and args.shard is not None:
+        # shipped with the shard's pages, so --merge on another machine can
+        # index them
+        search = SearchStore(os.path.join(dest_dir, SHARD_SEARCH_DIR), dest_dir)
+    elif args.search:
+        search = SearchStore(SEARCH_STORE_DIR, dest_dir)
+        # the index is rewritten after the build, keep it until then
+        search_outputs = [
+            os.path.join(search_dir, rel_path) for rel_path in walk_files(search_dir)
+        ]
+
+    assets = None
+    if args.fingerprint:
+        # shards compute the same map, so their pages agree with --merge
+        assets = scan_assets(STATIC_DIR, load_hashes(ASSET_HASHES_PATH))
+
+    images = None
+    if args.image_sizes:
+        # only headers of new or modified images are read
+        images = scan_image_sizes(STATIC_DIR, load_records(IMAGE_SIZES_PATH))
+        if args.shard is None:
+            save_records(images, IMAGE_SIZES_PATH)
+
+    if args.shard is not None:
+        # only this shard's pages. static files are copied once, by --merge
+        index, count = args.shard
+        manifest_path = os.path.join(
+            ".cache", f"build-manifest-{index}-of-{count}.json"
+        )
+        links_path = os.path.join(".cache", f"links-{index}-of-{count}.json")
+        pages = select_shard(pages, CONTENT_DIR, index, count)
+        outputs = [page.output for page in pages]
+        if search is not None:
+            outputs += [
+                os.path.join(search.directory, rel_path)
+                for rel_path in walk_files(search.directory)
+            ]
+        prune_outputs(dest_dir, outputs)
+    elif assets is not None:
+        with profiler.phase("static copy"):
+            published = publish_assets(assets, STATIC_DIR, dest_dir, stats)
+            asset_manifest = os.path.join(dest_dir, ASSET_MANIFEST_NAME)
+            write_asset_manifest(assets, asset_manifest)
+            # drops pages of deleted sources and superseded asset versions
+            outputs = [page.output for page in pages] + published + [asset_manifest]
+            outputs += search_outputs
+            if args.compress:
+                outputs += variant_paths(outputs)
+            prune_outputs(dest_dir, outputs)
+        save_hashes(assets, ASSET_HASHES_PATH)
+    else:
+        # copy static files to docs. incremental builds only copy what
+        # changed and leave generated pages in place
+        keep = [page.output for page in pages] + search_outputs
+        if args.compress:
+            # and precompressed variants, which are refreshed after the build
+            static_outputs = [
+                os.path.join(dest_dir, rel_path) for rel_path in walk_files(STATIC_DIR)
+            ]
+            keep += variant_paths(keep + static_outputs)
+        with profiler.phase("static copy"):
+            copy_directory(
+                STATIC_DIR,
+                dest_dir,
+                sync=not args.full,
+                checksum=args.checksum,
+                keep=keep,
+                stats=stats,
+            )
+
+    # load the manifest of the previous build, or start fresh for --full
+    if args.full:
+        manifest = BuildManifest(manifest_path)
+    elif manifest is None:
+        manifest = BuildManifest.load(manifest_path)
+    if search is not None:
+        # pages built before --search was turned on have no stored terms
+        for page in pages:
+            if not search.has(page.output):
+                manifest.discard(page.output)
+
+    links = None
+    if args.check_links:
+        links = LinkIndex.load(links_path)
+        # and pages built before --check-links have no recorded targets
+        for page in pages:
+            if not links.has(page.output):
+                manifest.discard(page.output)
+
+    if args.no_cache:
+        content_cache = None
+    elif content_cache is None:
+        content_cache = ContentCache(CONTENT_CACHE_DIR, args.cache_size * 1024 * 1024)
+    if content_cache is not None and args.full:
+        # regenerate from scratch, but leave fresh fragments for later builds
+        content_cache = content_cache.without_reads()
+
+    # serial builds hand finished pages to background writer threads,
+    # parallel builds already overlap rendering and writing across workers
+    writer = None
+    if args.jobs <= 1 and args.write_threads > 0:
+        writer = OutputWriter(args.write_threads, stats=stats)
 
     # generate all pages from markdown files in content directory
-    generate_pages_recursive("content", "template.html", "docs", basepath)
+    generate_pages_recursive(
+        CONTENT_DIR,
+        TEMPLATE_PATH,
+        dest_dir,
+        args.basepath,
+        manifest,
+        stats,
+        jobs=args.jobs,
+        content_cache=content_cache,
+        block_cache=block_cache,
+        pages=pages,
+        writer=writer,
+        stream=args.stream,
+        assets=assets,
+        search=search,
+        links=links,
+        images=images,
+        minify=args.minify,
+    )
+    if writer is not None:
+        # every page must be on disk before the manifest says it is
+        writer.close()
+
+    if links is not None:
+        # pages skipped this build are checked too, a page they link to
+        # may have been removed
+        outputs = [page.output for page in pages]
+        broken = links.broken(outputs, link_targets)
+        links.save(outputs)
+        stats.broken_links = sum(len(targets) for targets in broken.values())
+        if broken:
+            print(format_report(broken))
+
+    # shards only record terms, --merge writes the index for the whole site
+    if search is not None and args.shard is not None:
+        search.prune([page.output for page in pages])
+        search.clear_changes()
+    elif search is not None:
+        outputs = [page.output for page in pages]
+        dropped = search.prune(outputs)
+        meta_path = os.path.join(search_dir, "meta.json")
+        if stats.pages_rebuilt or dropped or not os.path.exists(meta_path):
+            with profiler.phase("search index"):
+                write_search_index(search, outputs, search_dir, args.basepath)
+
+    # shards leave compression to --merge, which sees the whole site
+    if args.compress and args.shard is None:
+        with profiler.phase("compress"):
+            compress_tree(dest_dir, stats=stats, records_path=COMPRESS_RECORDS_PATH)
+
+    manifest.save()
+    if content_cache is not None:
+        content_cache.evict()
+    return manifest
+
+
+def run_build(
+    args, block_cache=None, content_cache=None, manifest=None, page_index=None
+):
+    """build once, printing the report (and profile), and return (stats, manifest)"""
+    build_profiler = None
+    if args.profile or args.trace:
+        build_profiler = profiler.BuildProfiler()
+        profiler.enable(build_profiler)
+
+    stats = BuildStats()
+    try:
+        manifest = build(
+            args, stats, block_cache, content_cache, manifest, page_index
+        )
+    finally:
+        if build_profiler is not None:
+            profiler.disable()
+    print(stats.report())
+
+    if build_profiler is not None:
+        print(build_profiler.summary())
+        if args.trace:
+            build_profiler.dump(args.trace)
+            print(f"Wrote build trace to {args.trace}")
+    return stats, manifest
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.merge:
+        stats = BuildStats()
+        dest_dir = args.out or DEST_DIR
+        assets = None
+        if args.fingerprint:
+            assets = scan_assets(STATIC_DIR, load_hashes(ASSET_HASHES_PATH))
+        # every page of the site has to come from one of the shards
+        outputs = [page.output for page in build_page_index(CONTENT_DIR, dest_dir)]
+        pages = [os.path.relpath(output, dest_dir) for output in outputs]
+        search_dir = os.path.join(dest_dir, SEARCH_INDEX_NAME)
+        keep = []
+        if assets is not None:
+            keep.append(ASSET_MANIFEST_NAME)
+        if args.search:
+            # rewritten below, incrementally
+            keep += [
+                os.path.relpath(os.path.join(search_dir, rel_path), dest_dir)
+                for rel_path in walk_files(search_dir)
+            ]
+        try:
+            merge_shards(
+                args.merge,
+                STATIC_DIR,
+                dest_dir,
+                stats,
+                assets,
+                pages,
+                keep=keep,
+                keep_variants=args.compress,
+            )
+        except MergeError as e:
+            print(e, file=sys.stderr)
+            sys.exit(1)
+        search = None
+        if args.search:
+            search = SearchStore(SEARCH_STORE_DIR, dest_dir)
+            for shard_dir in args.merge:
+                search.import_records(
+                    SearchStore(os.path.join(shard_dir, SHARD_SEARCH_DIR), shard_dir)
+                )
+            search.prune(outputs)
+            # e.g. a shard built without --search
+            error = FileNotFoundError("no search record")
+            missing = [(output, error) for output in outputs if not search.has(output)]
+            if missing:
+                print(BuildError(missing), file=sys.stderr)
+                sys.exit(1)
+        if assets is not None:
+            write_asset_manifest(assets, os.path.join(dest_dir, ASSET_MANIFEST_NAME))
+        if search is not None:
+            write_search_index(search, outputs, search_dir, args.basepath)
+        if args.compress:
+            compress_tree(dest_dir, stats=stats, records_path=COMPRESS_RECORDS_PATH)
+        print(
+            f"Merged {len(args.merge)} shard(s) into {dest_dir}: "
+            f"{stats.assets_copied} copied, {stats.assets_unchanged} unchanged, "
+            f"{stats.assets_deleted} deleted"
+        )
+        if args.compress:
+            print(
+                f"Compressed variants written: {stats.compressed_written}, "
+                f"not smaller: {stats.compressed_dropped}"
+            )
+        return
+
+    block_cache = None
+    if args.block_cache > 0:
+        block_cache = BlockCache(args.block_cache)
+    # created here rather than by the build, so --watch rebuilds share it
+    content_cache = None
+    if not args.no_cache:
+        content_cache = ContentCache(CONTENT_CACHE_DIR, args.cache_size * 1024 * 1024)
+
+    try:
+        stats, manifest = run_build(args, block_cache, content_cache)
+    except (BuildError, OutputWriteError) as e:
+        # every page that failed in a worker or writer, not just the first
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    if stats.broken_links:
+        sys.exit(1)
+
+    if args.watch:
+        watcher = SiteWatcher(
+            CONTENT_DIR,
+            STATIC_DIR,
+            TEMPLATE_PATH,
+            output_dir(args),
+            args.basepath,
+            manifest,
+            BuildStats(),
+            block_cache,
+            content_cache=content_cache,
+            stream=args.stream,
+            jobs=args.jobs,
+        )
+        server = serve(output_dir(args), args.port)
+        print(f"Watching {CONTENT_DIR}/, {STATIC_DIR}/ and {TEMPLATE_PATH}")
+        try:
+            watcher.run()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.shutdown()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,98 @@
+import re
+
+# tags and the text between them
+TAG_PATTERN = re.compile(r"(<[^>]*>)")
+TAG_NAME_PATTERN = re.compile(r"</?([!\w]+)")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+# elements whose content is kept exactly as written
+PRESERVE_TAGS = frozenset({"pre", "textarea", "script", "style"})
+
+# whitespace next to these tags never renders, so it can go entirely.
+# anything else (e.g. between two inline tags) is collapsed to one space
+BLOCK_TAGS = frozenset(
+    {
+        "!doctype",
+        "html",
+        "head",
+        "body",
+        "title",
+        "meta",
+        "link",
+        "script",
+        "style",
+        "article",
+        "aside",
+        "blockquote",
+        "div",
+        "footer",
+        "header",
+        "main",
+        "nav",
+        "section",
+        "h1",
+        "h2",
+        "h3",
+        "h4",
+        "h5",
+        "h6",
+        "p",
+        "pre",
+        "ul",
+        "ol",
+        "li",
+        "table",
+        "thead",
+        "tbody",
+        "tr",
+        "th",
+        "td",
+        "br",
+        "hr",
+    }
+)
+
+
+def _tag_name(tag):
+    match = TAG_NAME_PATTERN.match(tag)
+    return match.group(1).lower() if match else ""
+
+
+def minify_html(html, strip=True):
+    """
+    collapse the whitespace of an html fragment: runs of whitespace become
+    one space, and whitespace between tags is dropped where one of them is
+    a block level tag. the contents of <pre>, <textarea>, <script> and
+    <style> are left untouched. strip trims the ends too, which is only safe
+    when nothing is placed right before or after the fragment.
+    """
+    parts = TAG_PATTERN.split(html)
+    # parts alternates text and tags: text, tag, text, ..., tag, text
+    out = []
+    preserving = None
+    for i, part in enumerate(parts):
+        if i % 2:
+            out.append(part)
+            name = _tag_name(part)
+            if preserving is None and name in PRESERVE_TAGS:
+                preserving = name
+            elif name == preserving and part.startswith("</"):
+                preserving = None
+            continue
+
+        if preserving is not None or not part:
+            out.append(part)
+            continue
+        if part.isspace():
+            before = _tag_name(parts[i - 1]) if i > 0 else None
+            after = _tag_name(parts[i + 1]) if i + 1 < len(parts) else None
+            if before in BLOCK_TAGS or after in BLOCK_TAGS:
+                continue
+            if strip and (before is None or after is None):
+                continue
+            out.append(" ")
+            continue
+        out.append(WHITESPACE_PATTERN.sub(" ", part))
+
+    html = "".join(out)
+    return html.strip() if strip else html
@@ -0,0 +1,99 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import profiler
+from file_utils import write_if_changed
+
+
+class OutputWriteError(Exception):
+    """raised when the writer is closed after one or more writes failed"""
+
+    def __init__(self, failures):
+        self.failures = failures
+        lines = [f"{len(failures)} file(s) failed to write:"]
+        lines.extend(f"  {path}: {error!r}" for path, error in failures)
+        super().__init__("\n".join(lines))
+
+
+class OutputWriter:
+    """
+    write-behind stage for generated pages. write() queues a page and returns
+    right away, and a small thread pool does the filesystem work, so
+    rendering doesn't wait on slow (e.g. network mounted) output volumes.
+    with workers=0, write() writes the page before returning instead, and
+    raises if that fails. pages whose bytes already match the file on disk
+    aren't rewritten, and each output directory is only created once.
+    """
+
+    def __init__(self, workers=4, max_pending=64, stats=None):
+        self.stats = stats
+        self.failures = []
+        self._executor = None
+        if workers > 0:
+            self._executor = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="output-writer"
+            )
+        # bounds how many rendered pages wait in memory for a writer
+        self._pending = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._dirs = set()
+
+    def write(self, path, text):
+        """queue text to be written to path"""
+        if self._executor is None:
+            self._write_now(path, text)
+            return
+        self._pending.acquire()
+        try:
+            self._executor.submit(self._write, path, text)
+        except BaseException:
+            self._pending.release()
+            raise
+
+    def _write(self, path, text):
+        try:
+            self._write_now(path, text)
+        except Exception as e:
+            with self._lock:
+                self.failures.append((path, e))
+        finally:
+            self._pending.release()
+
+    def _write_now(self, path, text):
+        self._ensure_dir(os.path.dirname(path))
+        written = write_if_changed(path, text.encode("utf-8"))
+        if self.stats is not None:
+            with self._lock:
+                if written:
+                    self.stats.outputs_written += 1
+                else:
+                    self.stats.outputs_unchanged += 1
+
+    def _ensure_dir(self, directory):
+        if not directory or directory in self._dirs:
+            return
+        os.makedirs(directory, exist_ok=True)
+        self._dirs.add(directory)
+
+    def close(self):
+        """wait for every queued write, raising if any of them failed"""
+        # write() only queues, the time writes take shows up here. the
+        # profiler isn't thread safe, so it's charged to the build, not to
+        # the pages written
+        if self._executor is not None:
+            with profiler.phase("write"):
+                self._executor.shutdown(wait=True)
+        if self.failures:
+            raise OutputWriteError(self.failures)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # don't hide the error that's already on its way out
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
@@ -0,0 +1,117 @@
+import os
+
+
+class PageEntry:
+    """a markdown source, the html page it builds and the source's stat"""
+
+    __slots__ = ("source", "output", "size", "mtime_ns")
+
+    def __init__(self, source, output, size, mtime_ns):
+        self.source = source
+        self.output = output
+        self.size = size
+        self.mtime_ns = mtime_ns
+
+    @property
+    def stat(self):
+        """the (size, mtime_ns) pair the build manifest records"""
+        return (self.size, self.mtime_ns)
+
+    def __eq__(self, other):
+        return (
+            self.source == other.source
+            and self.output == other.output
+            and self.size == other.size
+            and self.mtime_ns == other.mtime_ns
+        )
+
+    def __repr__(self):
+        return (
+            f"PageEntry({self.source!r}, {self.output!r}, "
+            f"size={self.size}, mtime_ns={self.mtime_ns})"
+        )
+
+
+def build_page_index(content_dir, dest_dir):
+    """
+    walk content_dir once and return a PageEntry for every markdown file,
+    sorted by source path. directory entries come from os.scandir, so only
+    the markdown files themselves are stat'ed.
+    """
+    pages = []
+    stack = [(content_dir, dest_dir)]
+    while stack:
+        src_dir, out_dir = stack.pop()
+        with os.scandir(src_dir) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    stack.append((entry.path, os.path.join(out_dir, entry.name)))
+                elif entry.name.endswith(".md") and entry.is_file():
+                    st = entry.stat()
+                    output = os.path.join(out_dir, entry.name[:-3] + ".html")
+                    pages.append(
+                        PageEntry(entry.path, output, st.st_size, st.st_mtime_ns)
+                    )
+    pages.sort(key=lambda page: page.source)
+    return pages
+
+
+class PageIndex:
+    """
+    a page index kept between builds by a long running process. refresh()
+    lists only the directories whose mtime changed since the last refresh
+    (adding or removing an entry changes it) and stats the known pages, so
+    an unchanged tree is never walked with scandir again.
+    """
+
+    def __init__(self, content_dir, dest_dir):
+        self.content_dir = content_dir
+        self.dest_dir = dest_dir
+        # directory -> (mtime_ns, subdirectory names, markdown file names)
+        self.dirs = {}
+
+    def refresh(self):
+        """return the current pages, like build_page_index"""
+        pages = []
+        dirs = {}
+        stack = [(self.content_dir, self.dest_dir)]
+        while stack:
+            src_dir, out_dir = stack.pop()
+            try:
+                mtime_ns = os.stat(src_dir).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            cached = self.dirs.get(src_dir)
+            if cached is not None and cached[0] == mtime_ns:
+                subdirs, names = cached[1], cached[2]
+            else:
+                subdirs, names = _list_dir(src_dir)
+            dirs[src_dir] = (mtime_ns, subdirs, names)
+            for name in subdirs:
+                stack.append(
+                    (os.path.join(src_dir, name), os.path.join(out_dir, name))
+                )
+            for name in names:
+                source = os.path.join(src_dir, name)
+                try:
+                    st = os.stat(source)
+                except FileNotFoundError:
+                    continue
+                output = os.path.join(out_dir, name[:-3] + ".html")
+                pages.append(PageEntry(source, output, st.st_size, st.st_mtime_ns))
+        self.dirs = dirs
+        pages.sort(key=lambda page: page.source)
+        return pages
+
+
+def _list_dir(directory):
+    """return the subdirectory and markdown file names in directory"""
+    subdirs = []
+    names = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                subdirs.append(entry.name)
+            elif entry.name.endswith(".md") and entry.is_file():
+                names.append(entry.name)
+    return subdirs, names
@@ -0,0 +1,169 @@
+import json
+import time
+from contextlib import nullcontext
+
+# phases in pipeline order, used to order the summary table
+PHASES = (
+    "read",
+    "block parse",
+    "inline parse",
+    "render",
+    "template fill",
+    "write",
+    "static copy",
+    "search index",
+    "compress",
+)
+
+# the profiler phases are recorded into, None when profiling is off
+_active = None
+_NULL = nullcontext()
+
+
+class BuildProfiler:
+    """
+    records time spent in each build phase, per page. phases can nest
+    (inline parsing happens inside block parsing); each phase is charged
+    only its own time, not the time of phases nested inside it.
+    """
+
+    def __init__(self):
+        self.pages = {}
+        self.totals = {}
+        self._page = None
+        self._stack = []
+
+    def page(self, name):
+        """attribute phases recorded inside the with block to page name"""
+        return _PageScope(self, name)
+
+    def phase(self, name):
+        """time the with block as phase name"""
+        return _PhaseScope(self, name)
+
+    def add(self, page, phase, seconds):
+        self.totals[phase] = self.totals.get(phase, 0.0) + seconds
+        if page is not None:
+            phases = self.pages.setdefault(page, {})
+            phases[phase] = phases.get(phase, 0.0) + seconds
+
+    def records(self):
+        """return the recorded timings as plain data"""
+        return {"phases": self.totals, "pages": self.pages}
+
+    def merge(self, records):
+        """add timings recorded elsewhere, e.g. by a worker process"""
+        for phase, seconds in records["phases"].items():
+            self.totals[phase] = self.totals.get(phase, 0.0) + seconds
+        for page, phases in records["pages"].items():
+            merged = self.pages.setdefault(page, {})
+            for phase, seconds in phases.items():
+                merged[phase] = merged.get(phase, 0.0) + seconds
+
+    def summary(self, top=10):
+        """return a table of time per phase and the slowest pages"""
+        total = sum(self.totals.values()) or 1.0
+        lines = [f"{'phase':<15} {'ms':>10} {'share':>7}"]
+        ordered = sorted(self.totals, key=_phase_order)
+        for phase in ordered:
+            seconds = self.totals[phase]
+            share = seconds / total
+            lines.append(f"{phase:<15} {seconds * 1000:>10.1f} {share:>6.1%}")
+
+        slowest = sorted(
+            self.pages.items(), key=lambda item: sum(item[1].values()), reverse=True
+        )
+        if slowest:
+            lines.append("")
+            lines.append(f"slowest pages (top {min(top, len(slowest))}):")
+            for page, phases in slowest[:top]:
+                worst = max(phases, key=phases.get)
+                lines.append(
+                    f"{sum(phases.values()) * 1000:>10.1f} ms  {page}  "
+                    f"(mostly {worst})"
+                )
+        return "\n".join(lines)
+
+    def dump(self, path):
+        """write the timings as a json trace"""
+        trace = {
+            "total_seconds": sum(self.totals.values()),
+            "phases": self.totals,
+            "pages": self.pages,
+        }
+        with open(path, "w") as f:
+            json.dump(trace, f, indent=1, sort_keys=True)
+
+
+class _PageScope:
+    __slots__ = ("profiler", "name", "previous")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.previous = self.profiler._page
+        self.profiler._page = self.name
+
+    def __exit__(self, *exc):
+        self.profiler._page = self.previous
+
+
+class _PhaseScope:
+    __slots__ = ("profiler", "name", "start", "nested")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.nested = 0.0
+        self.profiler._stack.append(self)
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        stack = self.profiler._stack
+        stack.pop()
+        if stack:
+            stack[-1].nested += elapsed
+        self.profiler.add(self.profiler._page, self.name, elapsed - self.nested)
+
+
+def _phase_order(phase):
+    return PHASES.index(phase) if phase in PHASES else len(PHASES)
+
+
+def enable(profiler):
+    """record phases into profiler until disable() is called"""
+    global _active
+    _active = profiler
+
+
+def disable():
+    global _active
+    _active = None
+
+
+def is_enabled():
+    return _active is not None
+
+
+def current():
+    """return the active profiler, or None"""
+    return _active
+
+
+def phase(name):
+    """time a phase on the active profiler, or do nothing if profiling is off"""
+    if _active is None:
+        return _NULL
+    return _active.phase(name)
+
+
+def page(name):
+    """attribute phases to a page on the active profiler, if any"""
+    if _active is None:
+        return _NULL
+    return _active.page(name)
@@ -0,0 +1,463 @@
+import json
+import os
+import re
+import shutil
+import tempfile
+
+from build_manifest import hash_text
+from file_utils import (
+    copy_file,
+    files_match,
+    remove_empty_dirs,
+    walk_files,
+    write_if_changed,
+)
+from inline_markdown import BRACKET_LINK_PATTERN
+
+# runs of letters and digits. one letter runs like the "t" of "don't" are
+# dropped when tokenizing
+TOKEN_PATTERN = re.compile(r"[^\W_]+")
+
+# shards are keyed on this many leading characters of a term
+PREFIX_LENGTH = 2
+
+# page ids per chunk of the page list, so results only fetch their chunks
+PAGES_PER_CHUNK = 1000
+
+# postings are spread over this many temp files while the index is built,
+# so only one bucket's postings are in memory at a time
+BUCKETS = 64
+
+
+def tokenize(text):
+    """return the search terms in a block of markdown"""
+    # keep link and image labels but drop their urls
+    text = BRACKET_LINK_PATTERN.sub(r" \1 ", text)
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if len(token) > 1]
+
+
+def term_prefix(term):
+    """return the shard a term belongs to, safe to use as a file name"""
+    prefix = term[:PREFIX_LENGTH]
+    if prefix.isascii() and prefix.isalnum():
+        return prefix
+    return "_"
+
+
+class SearchStore:
+    """
+    the search terms of every page, one small file per page under directory,
+    so a build only rewrites the terms of pages it regenerated. pages are
+    keyed by their output path relative to root, so shards building into
+    different directories share entries. the first change to a page since
+    the index was last written keeps the record the index was built from,
+    so the next index update only reads the pages that changed. also keeps
+    the id each page has in the published index; ids are never reused, so
+    adding or removing a page leaves every other posting list unchanged.
+    """
+
+    def __init__(self, directory, root):
+        self.directory = directory
+        self.root = root
+
+    def key(self, dest_path):
+        return os.path.relpath(dest_path, self.root).replace(os.sep, "/")
+
+    def _path(self, key):
+        return self._record_path(hash_text(key))
+
+    def _record_path(self, digest):
+        return os.path.join(self.directory, "pages", digest[:2], digest)
+
+    def _changed_path(self, digest):
+        return os.path.join(self.directory, "changed", digest)
+
+    def put(self, dest_path, title, terms):
+        """record the title and term counts of the page written to dest_path"""
+        key = self.key(dest_path)
+        path = self._path(key)
+        record = {"key": key, "title": title, "terms": dict(terms)}
+        data = json.dumps(record, separators=(",", ":"), sort_keys=True)
+        previous = _read_text(path)
+        if previous == data:
+            # e.g. only the template changed, the index doesn't need to know
+            return
+        self._mark_changed(path, previous)
+        _write_text(path, data)
+
+    def _mark_changed(self, path, previous):
+        """remember the record path had before its first change, if any"""
+        changed_path = self._changed_path(os.path.basename(path))
+        if not os.path.exists(changed_path):
+            _write_text(changed_path, previous or "")
+
+    def get(self, dest_path):
+        """return the record stored for the page at dest_path, or None"""
+        return _read_record(self._path(self.key(dest_path)))
+
+    def has(self, dest_path):
+        return os.path.exists(self._path(self.key(dest_path)))
+
+    def prune(self, outputs):
+        """forget pages not in outputs, returning how many were dropped"""
+        live = {self._path(self.key(path)) for path in outputs}
+        pages_dir = os.path.join(self.directory, "pages")
+        removed = 0
+        for rel_path in list(walk_files(pages_dir)):
+            path = os.path.join(pages_dir, rel_path)
+            if path not in live:
+                changed_path = self._changed_path(os.path.basename(path))
+                if os.path.exists(changed_path):
+                    os.remove(path)
+                else:
+                    # the record is what the index has to take out again
+                    os.makedirs(os.path.dirname(changed_path), exist_ok=True)
+                    os.replace(path, changed_path)
+                removed += 1
+        remove_empty_dirs(pages_dir)
+        return removed
+
+    def import_records(self, other):
+        """
+        copy in the records of another store, e.g. one a shard built on
+        another machine shipped with its pages. records whose size and mtime
+        match ours aren't read, the rest are marked changed. returns the
+        number copied
+        """
+        src_dir = os.path.join(other.directory, "pages")
+        dst_dir = os.path.join(self.directory, "pages")
+        copied = 0
+        for rel_path in walk_files(src_dir):
+            if rel_path.endswith(".tmp"):
+                continue
+            src_path = os.path.join(src_dir, rel_path)
+            dst_path = os.path.join(dst_dir, rel_path)
+            if files_match(src_path, dst_path):
+                continue
+            self._mark_changed(dst_path, _read_text(dst_path))
+            os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+            copy_file(src_path, dst_path)
+            copied += 1
+        return copied
+
+    def changes(self):
+        """
+        yield (key, old record, new record) for every page put or pruned
+        since clear_changes(). the old record is None for new pages, the new
+        one None for pruned pages
+        """
+        changed_dir = os.path.join(self.directory, "changed")
+        if not os.path.isdir(changed_dir):
+            return
+        for name in sorted(os.listdir(changed_dir)):
+            if name.endswith(".tmp"):
+                continue
+            old = _read_record(os.path.join(changed_dir, name))
+            new = _read_record(self._record_path(name))
+            if old is not None or new is not None:
+                yield (new or old)["key"], old, new
+
+    def clear_changes(self):
+        shutil.rmtree(os.path.join(self.directory, "changed"), ignore_errors=True)
+
+    def _state_path(self):
+        return os.path.join(self.directory, "ids.json")
+
+    def load_state(self):
+        """
+        return what the last index was written with: the page ids ("ids",
+        {key: page id}), the next unused id ("next"), and the basepath and
+        output directory, which are None if unknown
+        """
+        state = {"ids": {}, "next": 0, "basepath": None, "out_dir": None}
+        try:
+            with open(self._state_path(), "r") as f:
+                data = json.load(f)
+            state.update(ids=data["ids"], next=data["next"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return state
+        state.update(basepath=data.get("basepath"), out_dir=data.get("out_dir"))
+        return state
+
+    def save_state(self, ids, next_id, basepath, out_dir):
+        os.makedirs(self.directory, exist_ok=True)
+        state = {"next": next_id, "ids": ids, "basepath": basepath, "out_dir": out_dir}
+        tmp_path = self._state_path() + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self._state_path())
+
+
+def page_url(key, basepath="/"):
+    """return the url of the page stored under key"""
+    if key == "index.html":
+        key = ""
+    elif key.endswith("/index.html"):
+        key = key[: -len("index.html")]
+    return basepath + key
+
+
+def write_search_index(store, outputs, out_dir, basepath="/"):
+    """
+    build the published index under out_dir from the stored terms of the
+    pages written to outputs:
+
+    - pages/<n>.json maps page ids to [url, title], PAGES_PER_CHUNK at a time
+    - terms/<prefix>.json maps each term with that prefix to a flat list of
+      [id delta, count, id delta, count, ...], ids ascending
+    - meta.json lists the term prefixes and the chunk size
+
+    when the index in out_dir was written from this store with the same
+    basepath, only the records of pages changed since are read, and only
+    the shards and chunks they appear in are rewritten. otherwise every
+    page record is streamed from the store into bucket files, so memory
+    holds one page and then one bucket of postings at a time. files whose
+    content didn't change are left alone. returns the number of files the
+    index is made of.
+    """
+    state = store.load_state()
+    old_ids, next_id = state["ids"], state["next"]
+    keys = sorted(store.key(path) for path in outputs)
+    ids = {}
+    for key in keys:
+        if key in old_ids:
+            ids[key] = old_ids[key]
+        else:
+            ids[key] = next_id
+            next_id += 1
+
+    count = None
+    meta_path = os.path.join(out_dir, "meta.json")
+    if (
+        state["basepath"] == basepath
+        and state["out_dir"] == out_dir
+        and os.path.exists(meta_path)
+    ):
+        count = _update_index(store, old_ids, ids, out_dir, basepath)
+    if count is None:
+        count = _rebuild_index(store, keys, ids, out_dir, basepath)
+
+    store.save_state(ids, next_id, basepath, out_dir)
+    store.clear_changes()
+    return count
+
+
+def _rebuild_index(store, keys, ids, out_dir, basepath):
+    """write the whole index from every page record"""
+    written = set()
+    chunks = {}
+    os.makedirs(store.directory, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix="search-", dir=store.directory)
+    try:
+        buckets = [
+            open(os.path.join(tmp_dir, str(i)), "w", encoding="utf-8")
+            for i in range(BUCKETS)
+        ]
+        try:
+            for key in keys:
+                record = store.get(os.path.join(store.root, key))
+                if record is None:
+                    continue
+                page_id = ids[key]
+                chunk = chunks.setdefault(page_id // PAGES_PER_CHUNK, {})
+                chunk[page_id] = [page_url(key, basepath), record["title"]]
+                for term, count in record["terms"].items():
+                    bucket = buckets[_bucket_of(term_prefix(term))]
+                    bucket.write(f"{term}\t{page_id}\t{count}\n")
+        finally:
+            for bucket in buckets:
+                bucket.close()
+
+        for number, chunk in chunks.items():
+            path = os.path.join(out_dir, "pages", f"{number}.json")
+            _write_json(path, {str(k): v for k, v in sorted(chunk.items())})
+            written.add(path)
+
+        prefixes = []
+        for i in range(BUCKETS):
+            for prefix, postings in _read_bucket(os.path.join(tmp_dir, str(i))):
+                path = os.path.join(out_dir, "terms", f"{prefix}.json")
+                _write_json(path, postings)
+                written.add(path)
+                prefixes.append(prefix)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+    meta_path = os.path.join(out_dir, "meta.json")
+    _write_meta(meta_path, prefixes)
+    written.add(meta_path)
+
+    # drop shards and chunks that no longer have any entries
+    for rel_path in list(walk_files(out_dir)):
+        path = os.path.join(out_dir, rel_path)
+        if path not in written:
+            os.remove(path)
+    remove_empty_dirs(out_dir)
+    return len(written)
+
+
+def _update_index(store, old_ids, ids, out_dir, basepath):
+    """
+    patch the index in out_dir with the pages changed since it was written.
+    returns None when that isn't possible: a page left the index without
+    the store knowing which terms it had
+    """
+    changes = {key: (old, new) for key, old, new in store.changes()}
+    for key in old_ids:
+        if key not in ids and key not in changes:
+            return None
+    for key in ids:
+        if key not in old_ids and key not in changes:
+            # a record the last index didn't include, e.g. from a shard
+            record = store.get(os.path.join(store.root, key))
+            if record is not None:
+                changes[key] = (None, record)
+
+    changed_ids = set()
+    prefixes = set()
+    postings = {}
+    chunks = {}
+    for key, (old, new) in changes.items():
+        page_id = ids.get(key, old_ids.get(key))
+        if page_id is None:
+            # neither in this index nor the last one
+            continue
+        if key not in ids:
+            new = None
+        changed_ids.add(page_id)
+        chunk = chunks.setdefault(page_id // PAGES_PER_CHUNK, {})
+        chunk[page_id] = None
+        if old is not None:
+            prefixes.update(term_prefix(term) for term in old["terms"])
+        if new is not None:
+            chunk[page_id] = [page_url(key, basepath), new["title"]]
+            for term, count in new["terms"].items():
+                prefix = term_prefix(term)
+                prefixes.add(prefix)
+                terms = postings.setdefault(prefix, {})
+                terms.setdefault(term, []).append((page_id, count))
+
+    for number, changed in chunks.items():
+        path = os.path.join(out_dir, "pages", f"{number}.json")
+        chunk = _read_json(path) or {}
+        for page_id, entry in changed.items():
+            if entry is None:
+                chunk.pop(str(page_id), None)
+            else:
+                chunk[str(page_id)] = entry
+        if chunk:
+            chunk = sorted(chunk.items(), key=lambda item: int(item[0]))
+            _write_json(path, dict(chunk))
+        elif os.path.exists(path):
+            os.remove(path)
+
+    meta_path = os.path.join(out_dir, "meta.json")
+    live_prefixes = set((_read_json(meta_path) or {}).get("prefixes", []))
+    for prefix in prefixes:
+        path = os.path.join(out_dir, "terms", f"{prefix}.json")
+        merged = {}
+        for term, flat in (_read_json(path) or {}).items():
+            entries = [
+                entry for entry in _decode_postings(flat) if entry[0] not in changed_ids
+            ]
+            if entries:
+                merged[term] = entries
+        for term, entries in postings.get(prefix, {}).items():
+            merged.setdefault(term, []).extend(entries)
+        if merged:
+            terms = {term: _encode_postings(merged[term]) for term in sorted(merged)}
+            _write_json(path, terms)
+            live_prefixes.add(prefix)
+        else:
+            if os.path.exists(path):
+                os.remove(path)
+            live_prefixes.discard(prefix)
+    _write_meta(meta_path, live_prefixes)
+    remove_empty_dirs(out_dir)
+    return sum(1 for _ in walk_files(out_dir))
+
+
+def _write_meta(path, prefixes):
+    meta = {
+        "prefix_length": PREFIX_LENGTH,
+        "pages_per_chunk": PAGES_PER_CHUNK,
+        "prefixes": sorted(prefixes),
+    }
+    _write_json(path, meta)
+
+
+def _bucket_of(prefix):
+    # every term of a prefix lands in the same bucket
+    return int(hash_text(prefix)[:8], 16) % BUCKETS
+
+
+def _read_bucket(path):
+    """yield (prefix, {term: delta encoded postings}) for a bucket file"""
+    postings = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            term, page_id, count = line.rstrip("\n").split("\t")
+            postings.setdefault(term, []).append((int(page_id), int(count)))
+
+    by_prefix = {}
+    for term, entries in postings.items():
+        by_prefix.setdefault(term_prefix(term), {})[term] = _encode_postings(entries)
+    for prefix, terms in by_prefix.items():
+        yield prefix, dict(sorted(terms.items()))
+
+
+def _encode_postings(entries):
+    """turn (page id, count) pairs into a flat, delta encoded posting list"""
+    flat = []
+    previous = 0
+    for page_id, count in sorted(entries):
+        flat.append(page_id - previous)
+        flat.append(count)
+        previous = page_id
+    return flat
+
+
+def _decode_postings(flat):
+    """turn a delta encoded posting list back into (page id, count) pairs"""
+    entries = []
+    page_id = 0
+    for i in range(0, len(flat), 2):
+        page_id += flat[i]
+        entries.append((page_id, flat[i + 1]))
+    return entries
+
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    write_if_changed(path, data.encode("utf-8"))
+
+
+def _read_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _read_text(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _read_record(path):
+    """return the page record stored at path, or None"""
+    record = _read_json(path)
+    return record if isinstance(record, dict) else None
+
+
+def _write_text(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
@@ -0,0 +1,157 @@
+import os
+
+from build_manifest import hash_text
+from compress import variant_is_current, variant_source
+from file_utils import copy_file, files_match, remove_empty_dirs, walk_files
+
+# a shard's search records ship in its output under this directory, so
+# --merge can index pages built on other machines. it isn't published
+SHARD_SEARCH_DIR = ".search"
+
+
+def parse_shard(text):
+    """parse "i/N" (1-based) into (i, N), for use as an argparse type"""
+    index, sep, count = text.partition("/")
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        index = count = 0
+    if not sep or count < 1 or not 1 <= index <= count:
+        raise ValueError(f"invalid shard {text!r}, expected i/N with 1 <= i <= N")
+    return index, count
+
+
+def shard_of(rel_path, count):
+    """
+    return the 1-based shard a page belongs to. hashes the source path
+    relative to the content directory, so every machine agrees no matter
+    where the checkout lives.
+    """
+    rel_path = rel_path.replace(os.sep, "/")
+    return int(hash_text(rel_path)[:16], 16) % count + 1
+
+
+def select_shard(pages, content_dir, index, count):
+    """return the pages of a page index that belong to shard index of count"""
+    return [
+        page
+        for page in pages
+        if shard_of(os.path.relpath(page.source, content_dir), count) == index
+    ]
+
+
+class MergeError(Exception):
+    """raised when shard outputs can't be merged, before dest_dir is touched"""
+
+
+class ShardConflictError(MergeError):
+    """raised when two merge sources produce the same output path"""
+
+    def __init__(self, conflicts):
+        self.conflicts = conflicts
+        lines = [f"{len(conflicts)} output path(s) produced more than once:"]
+        lines.extend(f"  {path}: {', '.join(srcs)}" for path, srcs in conflicts)
+        super().__init__("\n".join(lines))
+
+
+class IncompleteMergeError(MergeError):
+    """raised when a shard directory or the output of a page is missing"""
+
+    def __init__(self, missing_dirs, missing_pages):
+        self.missing_dirs = missing_dirs
+        self.missing_pages = missing_pages
+        lines = []
+        if missing_dirs:
+            lines.append(f"{len(missing_dirs)} shard directory(s) not found:")
+            lines.extend(f"  {path}" for path in missing_dirs)
+        if missing_pages:
+            lines.append(f"{len(missing_pages)} page(s) not built by any shard:")
+            lines.extend(f"  {path}" for path in missing_pages)
+        super().__init__("\n".join(lines))
+
+
+def merge_shards(
+    shard_dirs,
+    static_dir,
+    dest_dir,
+    stats=None,
+    assets=None,
+    pages=None,
+    keep=(),
+    keep_variants=False,
+):
+    """
+    combine shard outputs and static assets into dest_dir. every output path
+    must come from exactly one source; otherwise nothing is copied and
+    ShardConflictError is raised. every shard directory must exist and, when
+    pages (output paths relative to dest_dir) are given, every page must come
+    from some shard; otherwise nothing is copied and IncompleteMergeError is
+    raised. dest_dir ends up holding exactly the merged files and the paths
+    in keep (relative to dest_dir), unchanged files are left alone. with
+    keep_variants set, precompressed variants of those files whose source
+    hasn't changed since they were written are kept too. static files are
+    published under their fingerprinted names when an asset map is given.
+    shards' search records (see SHARD_SEARCH_DIR) are left out.
+    """
+    # a mistyped directory would otherwise look like an empty shard, and
+    # the cleanup below would delete the pages it should have provided
+    missing_dirs = [path for path in shard_dirs if not os.path.isdir(path)]
+    if missing_dirs:
+        raise IncompleteMergeError(missing_dirs, [])
+
+    plan = {}
+    claims = {}
+    for source_dir in [static_dir, *shard_dirs]:
+        for rel_path in walk_files(source_dir):
+            if source_dir != static_dir and _is_search_record(rel_path):
+                continue
+            src_path = os.path.join(source_dir, rel_path)
+            if assets is not None and source_dir == static_dir:
+                rel_path = assets.files.get(rel_path, rel_path)
+            claims.setdefault(rel_path, []).append(source_dir)
+            plan[rel_path] = src_path
+
+    conflicts = sorted(
+        (rel_path, srcs) for rel_path, srcs in claims.items() if len(srcs) > 1
+    )
+    if conflicts:
+        raise ShardConflictError(conflicts)
+    if pages is not None:
+        missing_pages = sorted(rel_path for rel_path in pages if rel_path not in plan)
+        if missing_pages:
+            raise IncompleteMergeError([], missing_pages)
+
+    for rel_path, src_path in sorted(plan.items()):
+        dst_path = os.path.join(dest_dir, rel_path)
+        if files_match(src_path, dst_path):
+            if stats is not None:
+                stats.assets_unchanged += 1
+            continue
+        os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+        copy_file(src_path, dst_path)
+        if stats is not None:
+            stats.assets_copied += 1
+
+    # drop anything left over from an earlier build
+    keep = set(keep)
+    for rel_path in list(walk_files(dest_dir)):
+        if rel_path in plan or rel_path in keep:
+            continue
+        path = os.path.join(dest_dir, rel_path)
+        if keep_variants:
+            # the same rule compress_tree uses to skip up to date variants
+            source = variant_source(rel_path)
+            if (
+                source is not None
+                and (source in plan or source in keep)
+                and variant_is_current(path, os.path.join(dest_dir, source))
+            ):
+                continue
+        os.remove(path)
+        if stats is not None:
+            stats.assets_deleted += 1
+    remove_empty_dirs(dest_dir)
+
+
+def _is_search_record(rel_path):
+    return rel_path.split(os.sep, 1)[0] == SHARD_SEARCH_DIR
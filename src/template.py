@@ -0,0 +1,112 @@
+import json
+import os
+import re
+from functools import lru_cache
+
+from build_manifest import UrlLookups, hash_text
+from minify import minify_html
+
+# placeholders look like {{ Title }} or {{ Content }}
+SLOT_PATTERN = re.compile(r"\{\{ (\w+) \}\}")
+
+# root-relative href and src attributes
+ROOT_URL_PATTERN = re.compile(r'(href|src)="(/[^"]*)"')
+
+
+class Template:
+    """
+    html template compiled once into static segments and named slots.
+    root-relative href/src attributes in the static segments are rewritten
+    to the basepath (and to fingerprinted asset urls, given an asset map) at
+    compile time, so rendering is a single join. with minify set, their
+    whitespace is collapsed at compile time too. the digest covers the
+    published urls of the assets the template refers to, but not the rest
+    of the asset map.
+    """
+
+    def __init__(self, source, basepath="/", assets=None, minify=False):
+        self.source = source
+        self.basepath = basepath
+        self.assets = assets
+        self.minify = minify
+        self.parts = []
+        self.slots = []
+        lookups = None
+        if assets is not None:
+            lookups = assets = UrlLookups(assets)
+
+        # parts alternates static text and slot placeholders; slots holds
+        # (index into parts, slot name) for every placeholder
+        pos = 0
+        for match in SLOT_PATTERN.finditer(source):
+            static = source[pos : match.start()]
+            self.parts.append(rewrite_basepath(static, basepath, assets))
+            self.slots.append((len(self.parts), match.group(1)))
+            self.parts.append(match.group(0))
+            pos = match.end()
+        self.parts.append(rewrite_basepath(source[pos:], basepath, assets))
+
+        if minify:
+            for index, part in enumerate(self.parts):
+                if index % 2 == 0:
+                    self.parts[index] = minify_html(part, strip=False)
+            self.parts[0] = self.parts[0].lstrip()
+            self.parts[-1] = self.parts[-1].rstrip()
+
+        # pages filled from a minified template differ, so its digest does
+        digest_source = ("minify\0" if minify else "") + source
+        if lookups is not None:
+            digest_source += "\0" + json.dumps(lookups.used, sort_keys=True)
+        self.digest = hash_text(digest_source)
+
+    def render(self, **values):
+        """fill slots with values, leaving unknown placeholders untouched"""
+        parts = self.parts.copy()
+        for index, name in self.slots:
+            if name in values:
+                parts[index] = values[name]
+        return "".join(parts)
+
+    def iter_render(self, **values):
+        """
+        yield the rendered page piece by piece. slot values may be strings or
+        html nodes, which are streamed instead of rendered to one string.
+        """
+        slot_names = dict(self.slots)
+        for index, part in enumerate(self.parts):
+            name = slot_names.get(index)
+            if name is None or name not in values:
+                yield part
+                continue
+            value = values[name]
+            if isinstance(value, str):
+                yield value
+            else:
+                yield from value.iter_html()
+
+
+def rewrite_basepath(html, basepath, assets=None):
+    """
+    point root-relative href and src attributes at basepath, and at the
+    fingerprinted copy of any static file in assets
+    """
+    if assets is not None:
+        return ROOT_URL_PATTERN.sub(
+            lambda m: f'{m[1]}="{basepath}{assets.get(m[2], m[2])[1:]}"', html
+        )
+    if basepath == "/":
+        return html
+    html = html.replace('href="/', f'href="{basepath}')
+    return html.replace('src="/', f'src="{basepath}')
+
+
+def load_template(path, basepath="/", assets=None, minify=False):
+    """return the compiled template at path, reused while the file is unchanged"""
+    st = os.stat(path)
+    return _load_template(path, st.st_mtime_ns, st.st_size, basepath, assets, minify)
+
+
+@lru_cache(maxsize=16)
+def _load_template(path, mtime_ns, size, basepath, assets, minify):
+    with open(path, "r") as f:
+        return Template(f.read(), basepath, assets, minify)
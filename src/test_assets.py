@@ -0,0 +1,145 @@
+import os
+import tempfile
+import unittest
+
+from assets import AssetMap, fingerprint_path, publish_assets, scan_assets
+from block_cache import BlockCache
+from block_markdown import generate_page, markdown_to_html_node
+from build_manifest import BuildManifest
+from build_stats import BuildStats
+from content_cache import MemoryContentCache
+from file_utils import hash_file
+from test_helpers import write_file
+from template import Template
+
+
+class TestAssets(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.static = os.path.join(self.root, "static")
+        write_file(os.path.join(self.static, "index.css"), "body {}")
+        write_file(os.path.join(self.static, "images", "a.png"), "png")
+        write_file(os.path.join(self.static, "robots.txt"), "User-agent: *")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_fingerprint_path(self):
+        self.assertEqual(
+            fingerprint_path(os.path.join("images", "a.png"), "0123456789abcdef"),
+            os.path.join("images", "a.0123456789.png"),
+        )
+
+    def test_scan_assets(self):
+        assets = scan_assets(self.static)
+        digest = hash_file(os.path.join(self.static, "index.css"))
+        self.assertEqual(assets.get("/index.css"), f"/index.{digest[:10]}.css")
+        self.assertEqual(assets.get("/robots.txt"), "/robots.txt")
+        self.assertEqual(assets, scan_assets(self.static))
+
+    def test_scan_reuses_recorded_hashes(self):
+        assets = scan_assets(self.static)
+        hashes = {
+            path: record[:2] + ["recorded"] for path, record in assets.hashes.items()
+        }
+        again = scan_assets(self.static, hashes)
+        self.assertEqual(again.get("/index.css"), "/index.recorded.css")
+
+    def test_publish_assets(self):
+        assets = scan_assets(self.static)
+        dest = os.path.join(self.root, "docs")
+        stats = BuildStats()
+        published = publish_assets(assets, self.static, dest, stats)
+        self.assertEqual(len(published), 3)
+        css_path = os.path.join(dest, assets.files["index.css"])
+        self.assertTrue(os.path.exists(css_path))
+        publish_assets(assets, self.static, dest, stats)
+        self.assertEqual((stats.assets_copied, stats.assets_unchanged), (3, 3))
+
+
+class TestAssetUrls(unittest.TestCase):
+    assets = AssetMap({"index.css": "index.abc.css", "a.png": "a.def.png"})
+
+    def test_template_urls(self):
+        source = '<link href="/index.css"><a href="/about">{{ Content }}'
+        template = Template(source, "/site/", self.assets)
+        self.assertEqual(
+            template.render(Content=""),
+            '<link href="/site/index.abc.css"><a href="/site/about">',
+        )
+
+    def test_content_urls(self):
+        node = markdown_to_html_node("![a](/a.png) [b](/b)", assets=self.assets)
+        self.assertEqual(
+            node.to_html(),
+            '<div><p><img src="/a.def.png" alt="a"></img> '
+            '<a href="/b">b</a></p></div>',
+        )
+
+    def test_changed_assets_rebuild_pages(self):
+        with tempfile.TemporaryDirectory() as root:
+            md_path = os.path.join(root, "index.md")
+            template_path = os.path.join(root, "template.html")
+            dest_path = os.path.join(root, "index.html")
+            write_file(md_path, "# Title")
+            write_file(template_path, '<link href="/index.css">{{ Content }}')
+            manifest = BuildManifest()
+
+            def build(assets):
+                return generate_page(
+                    md_path, template_path, dest_path, "/", manifest, assets=assets
+                )
+
+            self.assertTrue(build(self.assets))
+            self.assertFalse(build(self.assets))
+            self.assertTrue(build(AssetMap({"index.css": "index.xyz.css"})))
+            with open(dest_path) as f:
+                self.assertIn("index.xyz.css", f.read())
+
+    def test_only_referenced_assets_rebuild_pages(self):
+        with tempfile.TemporaryDirectory() as root:
+            md_path = os.path.join(root, "index.md")
+            template_path = os.path.join(root, "template.html")
+            dest_path = os.path.join(root, "index.html")
+            write_file(md_path, "# Title\n\n![a](/a.png)")
+            write_file(template_path, "{{ Content }}")
+            manifest = BuildManifest()
+            content_cache = MemoryContentCache(os.path.join(root, "cache"))
+            block_cache = BlockCache(10)
+            stats = BuildStats()
+
+            def build(files):
+                return generate_page(
+                    md_path,
+                    template_path,
+                    dest_path,
+                    "/",
+                    manifest,
+                    assets=AssetMap(files),
+                    stats=stats,
+                    content_cache=content_cache,
+                    block_cache=block_cache,
+                )
+
+            files = dict(self.assets.files)
+            self.assertTrue(build(files))
+            files["index.css"] = "index.xyz.css"
+            self.assertFalse(build(files))
+
+            # without the manifest the rendered content is reused
+            manifest.entries.clear()
+            self.assertTrue(build(files))
+            self.assertEqual(stats.content_cache_hits, 1)
+
+            files["a.png"] = "a.xyz.png"
+            self.assertTrue(build(files))
+            self.assertEqual(stats.content_cache_misses, 2)
+            # only the block with the image is rendered again
+            self.assertEqual((block_cache.hits, block_cache.misses), (1, 3))
+            with open(dest_path) as f:
+                self.assertIn("/a.xyz.png", f.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+
+from block_cache import BlockCache
+from block_markdown import markdown_to_html_node
+
+
+class TestBlockCache(unittest.TestCase):
+    def test_get_and_put(self):
+        cache = BlockCache(2)
+        self.assertIsNone(cache.get("a"))
+        cache.put("a", "<p>a</p>")
+        self.assertEqual(cache.get("a"), "<p>a</p>")
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_evicts_least_recently_used(self):
+        cache = BlockCache(2)
+        cache.put("a", "1")
+        cache.put("b", "2")
+        cache.get("a")
+        cache.put("c", "3")
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "1")
+        self.assertEqual(cache.get("c"), "3")
+
+    def test_zero_capacity_stores_nothing(self):
+        cache = BlockCache(0)
+        cache.put("a", "1")
+        self.assertEqual(len(cache), 0)
+
+
+class TestMarkdownToHtmlNodeWithBlockCache(unittest.TestCase):
+    markdown = """
+# Title
+
+Shared **disclaimer** with a [link](/terms).
+
+```
+print("sample")
+```
+
+- one
+- two
+"""
+
+    def test_matches_uncached_render(self):
+        cache = BlockCache()
+        for basepath in ("/", "/site/"):
+            expected = markdown_to_html_node(self.markdown, basepath).to_html()
+            for _ in range(2):
+                node = markdown_to_html_node(self.markdown, basepath, cache)
+                self.assertEqual(node.to_html(), expected)
+        self.assertEqual(cache.misses, 8)
+        self.assertEqual(cache.hits, 8)
+
+    def test_basepath_is_part_of_the_key(self):
+        cache = BlockCache()
+        markdown_to_html_node("[a](/a)", "/", cache)
+        node = markdown_to_html_node("[a](/a)", "/site/", cache)
+        self.assertEqual(node.to_html(), '<div><p><a href="/site/a">a</a></p></div>')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,11 @@
 import unittest
 
 from block_markdown import (
+    Block,
     BlockType,
     block_to_block_type,
     extract_title,
+    iter_blocks,
     markdown_to_blocks,
     markdown_to_html_node,
 )
@@ -61,6 +63,49 @@ This is a paragraph of text.
             ],
         )
 
+    def test_fenced_code_keeps_blank_lines(self):
+        md = "intro\n\n```\ndef a():\n\n    return 1\n```\n\noutro"
+        blocks = markdown_to_blocks(md)
+        self.assertEqual(
+            blocks,
+            ["intro", "```\ndef a():\n\n    return 1\n```", "outro"],
+        )
+
+    def test_unclosed_fence_splits_on_blank_lines(self):
+        md = "```\nnot closed\n\nparagraph"
+        blocks = markdown_to_blocks(md)
+        self.assertEqual(blocks, ["```\nnot closed", "paragraph"])
+
+
+class TestIterBlocks(unittest.TestCase):
+    def test_types_and_spans(self):
+        lines = ["# Title", "", "", "- a", "- b", "", "  text  ", "more"]
+        blocks = list(iter_blocks(lines))
+        self.assertEqual(
+            blocks,
+            [
+                Block(BlockType.HEADING, ["# Title"], 0, 1),
+                Block(BlockType.UNORDERED_LIST, ["- a", "- b"], 3, 5),
+                Block(BlockType.PARAGRAPH, ["text  ", "more"], 6, 8),
+            ],
+        )
+
+    def test_whitespace_only_lines_trimmed_from_span(self):
+        blocks = list(iter_blocks(["   ", "> quote", "  "]))
+        self.assertEqual(blocks, [Block(BlockType.QUOTE, ["> quote"], 1, 2)])
+
+    def test_fenced_code_span(self):
+        lines = ["```", "a", "", "b", "```"]
+        blocks = list(iter_blocks(lines))
+        self.assertEqual(blocks, [Block(BlockType.CODE, lines, 0, 5)])
+
+    def test_accepts_any_iterable(self):
+        blocks = list(iter_blocks(iter(["para", "", "1. one"])))
+        self.assertEqual(
+            [block.block_type for block in blocks],
+            [BlockType.PARAGRAPH, BlockType.ORDERED_LIST],
+        )
+
 
 class TestBlockToBlockType(unittest.TestCase):
     def test_heading_h1(self):
@@ -245,6 +290,13 @@ class TestMarkdownToHtmlNode(unittest.TestCase):
             '<div><ol><li>Item with <code>code</code></li><li>Item with <a href="https://example.com">link</a></li></ol></div>',
         )
 
+    def test_code_block_with_blank_line(self):
+        md = "```\nfirst\n\nsecond\n```"
+        node = markdown_to_html_node(md)
+        self.assertEqual(
+            node.to_html(), "<div><pre><code>first\n\nsecond</code></pre></div>"
+        )
+
     def test_full_document(self):
         md = """# Welcome
 
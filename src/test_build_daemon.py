@@ -0,0 +1,155 @@
+import contextlib
+import gzip
+import io
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+import build_client
+from build_daemon import BuildDaemon, serve
+from main import parse_args, run_build
+from test_helpers import write_file
+
+
+def read_file(path):
+    with open(path) as f:
+        return f.read()
+
+
+class TestBuildDaemon(unittest.TestCase):
+    def setUp(self):
+        # the build works on content/, static/ and docs/ of the current
+        # directory, like main.py
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        write_file("template.html", "<main>{{ Content }}</main>")
+        write_file(os.path.join("content", "index.md"), "# Home")
+        write_file(os.path.join("content", "a", "index.md"), "# A")
+        write_file(os.path.join("static", "index.css"), "body {}")
+        self.daemon = BuildDaemon(parse_args(["--write-threads", "0"]))
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.daemon.build()
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_rebuild_changed_path(self):
+        path = os.path.join("content", "a", "index.md")
+        write_file(path, "# A2")
+        reply = self.daemon.handle({"paths": [os.path.abspath(path)]})
+        self.assertEqual(reply["status"], 0)
+        self.assertIn("Pages rebuilt: 1", reply["stdout"])
+        self.assertEqual(
+            read_file(os.path.join("docs", "a", "index.html")),
+            "<main><div><h1>A2</h1></div></main>",
+        )
+
+        # the next build starts from the manifest the rebuild updated
+        reply = self.daemon.handle({"argv": None})
+        self.assertIn("Pages rebuilt: 0, skipped (unchanged): 2", reply["stdout"])
+
+    def test_build_with_other_options(self):
+        reply = self.daemon.handle({"argv": ["/blog/", "--write-threads", "0"]})
+        self.assertEqual(reply["status"], 0)
+        self.assertIn("Pages rebuilt: 2", reply["stdout"])
+
+    def test_compress_rebuilds_whole_site(self):
+        # the watcher doesn't refresh precompressed variants
+        self.daemon.args = parse_args(["--write-threads", "0", "--compress"])
+        path = os.path.join("content", "a", "index.md")
+        write_file(path, "# A2 " + "a" * 200)
+        reply = self.daemon.handle({"paths": [os.path.abspath(path)]})
+        self.assertIn("Compressed variants written", reply["stdout"])
+        with gzip.open(os.path.join("docs", "a", "index.html.gz"), "rt") as f:
+            self.assertIn("A2", f.read())
+
+    def test_rejected_options(self):
+        reply = self.daemon.handle({"argv": ["--shard", "1/2"]})
+        self.assertEqual(reply["status"], 2)
+        reply = self.daemon.handle({"argv": ["--bogus"]})
+        self.assertEqual(reply["status"], 2)
+        self.assertIn("unrecognized arguments", reply["stderr"])
+
+    def test_manifest_written_by_another_build_is_reloaded(self):
+        write_file(os.path.join(".cache", "build-manifest.json"), "{}")
+        reply = self.daemon.handle({"argv": None})
+        self.assertIn("Pages rebuilt: 2", reply["stdout"])
+
+    def test_rebuild_after_another_build_reloads_manifest(self):
+        write_file("template.html", '<a href="/">{{ Content }}</a>')
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.daemon.build()
+            run_build(parse_args(["/blog/", "--write-threads", "0"]))
+        path = os.path.join("content", "a", "index.md")
+        write_file(path, "# A2")
+        reply = self.daemon.handle({"paths": [os.path.abspath(path)]})
+        self.assertIn("Pages rebuilt: 2", reply["stdout"])
+        self.assertIn('href="/"', read_file(os.path.join("docs", "index.html")))
+
+        # and the manifest on disk matches what's in docs/
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            run_build(parse_args(["--write-threads", "0"]))
+        self.assertIn("Pages rebuilt: 0, skipped (unchanged): 2", out.getvalue())
+
+    def test_client_round_trip(self):
+        thread = threading.Thread(target=serve, args=(self.daemon,))
+        with contextlib.redirect_stdout(io.StringIO()):
+            thread.start()
+            reply = None
+            while reply is None:
+                # until the daemon is listening
+                try:
+                    reply = build_client.request({"argv": None})
+                except (FileNotFoundError, ConnectionRefusedError):
+                    time.sleep(0.01)
+            build_client.request({"stop": True})
+            thread.join()
+        self.assertEqual(reply["status"], 0)
+        self.assertIn("Pages rebuilt: 0", reply["stdout"])
+        self.assertFalse(os.path.exists(build_client.SOCKET_PATH))
+
+    def test_fallback_builds_with_the_daemon_options(self):
+        argv = ["/blog/", "--write-threads", "0"]
+        write_file("template.html", '<a href="/">{{ Content }}</a>')
+        build_client.save_daemon_argv(argv)
+        daemon = BuildDaemon(parse_args(argv))
+        with contextlib.redirect_stdout(io.StringIO()):
+            daemon.build()
+
+        # the daemon stopped, a build without arguments builds the same site
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            build_client.main([])
+        self.assertIn("Pages rebuilt: 0, skipped (unchanged): 2", out.getvalue())
+        self.assertIn('href="/blog/"', read_file(os.path.join("docs", "index.html")))
+
+    def test_cache_sizes_are_fixed_at_startup(self):
+        reply = self.daemon.handle({"argv": ["--cache-size", "1"]})
+        self.assertEqual(reply["status"], 2)
+        self.assertIn("--cache-size", reply["stderr"])
+
+    def test_page_index_sees_added_and_removed_pages(self):
+        write_file(os.path.join("content", "b", "index.md"), "# B")
+        reply = self.daemon.handle({"argv": None})
+        self.assertIn("Pages rebuilt: 1, skipped (unchanged): 2", reply["stdout"])
+        os.remove(os.path.join("content", "a", "index.md"))
+        reply = self.daemon.handle({"argv": None})
+        self.assertIn("skipped (unchanged): 2", reply["stdout"])
+        self.assertFalse(os.path.exists(os.path.join("docs", "a", "index.html")))
+
+    def test_client_falls_back_without_daemon(self):
+        os.remove(os.path.join("docs", "index.html"))
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            build_client.main(["--write-threads", "0"])
+        self.assertIn("Pages rebuilt: 1", out.getvalue())
+        self.assertTrue(os.path.exists(os.path.join("docs", "index.html")))
+
+
+if __name__ == "__main__":
+    unittest.main()
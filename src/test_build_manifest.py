@@ -0,0 +1,99 @@
+import os
+import tempfile
+import unittest
+
+from block_markdown import generate_page, generate_pages_recursive
+from build_manifest import BuildManifest, page_inputs
+from build_stats import BuildStats
+
+
+class TestBuildManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.md_path = os.path.join(self.root, "index.md")
+        self.template_path = os.path.join(self.root, "template.html")
+        self.dest_path = os.path.join(self.root, "out", "index.html")
+        self.manifest_path = os.path.join(self.root, "manifest.json")
+        with open(self.md_path, "w") as f:
+            f.write("# Title\n\nSome text")
+        with open(self.template_path, "w") as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, basepath="/"):
+        manifest = BuildManifest.load(self.manifest_path)
+        stats = BuildStats()
+        generate_page(
+            self.md_path, self.template_path, self.dest_path, basepath, manifest, stats
+        )
+        manifest.save()
+        return stats
+
+    def test_page_inputs_changes_with_basepath(self):
+        self.assertNotEqual(
+            page_inputs("# a", "t", "/"), page_inputs("# a", "t", "/blog/")
+        )
+
+    def test_unchanged_page_is_skipped(self):
+        stats = self.build()
+        self.assertEqual(stats.pages_rebuilt, 1)
+        stats = self.build()
+        self.assertEqual(stats.pages_rebuilt, 0)
+        self.assertEqual(stats.pages_skipped, 1)
+
+    def test_changed_source_is_rebuilt(self):
+        self.build()
+        with open(self.md_path, "w") as f:
+            f.write("# Title\n\nOther text")
+        stats = self.build()
+        self.assertEqual(stats.pages_rebuilt, 1)
+        with open(self.dest_path) as f:
+            self.assertIn("Other text", f.read())
+
+    def test_changed_basepath_is_rebuilt(self):
+        self.build()
+        stats = self.build("/blog/")
+        self.assertEqual(stats.pages_rebuilt, 1)
+
+    def test_missing_output_is_rebuilt(self):
+        self.build()
+        os.remove(self.dest_path)
+        stats = self.build()
+        self.assertEqual(stats.pages_rebuilt, 1)
+
+    def test_touched_source_records_new_stat(self):
+        self.build()
+        os.utime(self.md_path, ns=(0, 0))
+        stats = self.build()
+        self.assertEqual(stats.pages_skipped, 1)
+        entry = BuildManifest.load(self.manifest_path).entries[self.dest_path]
+        self.assertEqual(entry["stat"][1], 0)
+
+    def test_unchanged_stat_skips_without_reading(self):
+        self.build()
+        manifest = BuildManifest.load(self.manifest_path)
+        # the recorded stat matches, so the quick check alone decides
+        manifest.entries[self.dest_path]["source"] = "stale hash"
+        stats = BuildStats()
+        out = os.path.join(self.root, "out")
+        generate_pages_recursive(
+            self.root, self.template_path, out, "/", manifest, stats
+        )
+        self.assertEqual(stats.pages_skipped, 1)
+        self.assertEqual(stats.pages_rebuilt, 0)
+
+    def test_unseen_entries_are_dropped(self):
+        manifest = BuildManifest(self.manifest_path, {"gone.html": {}})
+        manifest.save()
+        self.assertEqual(BuildManifest.load(self.manifest_path).entries, {})
+
+    def test_load_missing_file(self):
+        manifest = BuildManifest.load(os.path.join(self.root, "missing.json"))
+        self.assertEqual(manifest.entries, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
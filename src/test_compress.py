@@ -0,0 +1,89 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+from build_stats import BuildStats
+from compress import compress_file, compress_tree, variant_paths
+from test_helpers import write_file
+
+
+class TestCompress(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "docs")
+        self.page = os.path.join(self.root, "blog", "index.html")
+        write_file(self.page, "<p>hello</p>" * 200)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_gzip_variant_matches_source(self):
+        self.assertEqual(compress_file(self.page)[0], len(variant_paths([self.page])))
+        with gzip.open(self.page + ".gz", "rb") as f:
+            self.assertEqual(f.read(), b"<p>hello</p>" * 200)
+
+    def test_output_is_deterministic(self):
+        compress_file(self.page)
+        with open(self.page + ".gz", "rb") as f:
+            first = f.read()
+        os.remove(self.page + ".gz")
+        compress_file(self.page)
+        with open(self.page + ".gz", "rb") as f:
+            self.assertEqual(f.read(), first)
+
+    def test_unchanged_source_is_skipped(self):
+        compress_file(self.page)
+        written, unchanged, _ = compress_file(self.page)
+        self.assertEqual(written, 0)
+        self.assertGreater(unchanged, 0)
+
+        write_file(self.page, "<p>changed</p>" * 200)
+        os.utime(self.page, ns=(1, 1))
+        self.assertGreater(compress_file(self.page)[0], 0)
+
+    def test_variants_that_are_not_smaller_are_dropped(self):
+        tiny = os.path.join(self.root, "tiny.css")
+        write_file(tiny, "a{}")
+        self.assertEqual(compress_file(tiny)[0], 0)
+        self.assertFalse(os.path.exists(tiny + ".gz"))
+
+    def test_compress_tree(self):
+        write_file(os.path.join(self.root, "image.png"), "png" * 100)
+        write_file(os.path.join(self.root, "gone.html.gz"), "stale")
+        stats = BuildStats()
+        compress_tree(self.root, workers=2, stats=stats)
+        self.assertTrue(os.path.exists(self.page + ".gz"))
+        self.assertFalse(os.path.exists(os.path.join(self.root, "image.png.gz")))
+        self.assertFalse(os.path.exists(os.path.join(self.root, "gone.html.gz")))
+        self.assertEqual(stats.compressed_written, len(variant_paths([self.page])))
+
+    def test_compress_tree_keeps_static_archives(self):
+        archive = os.path.join(self.root, "dl", "data.tar.gz")
+        write_file(archive, "archive")
+        compress_tree(self.root, workers=2)
+        self.assertTrue(os.path.exists(archive))
+
+    def test_not_smaller_sources_are_recorded(self):
+        tiny = os.path.join(self.root, "tiny.json")
+        write_file(tiny, "{}")
+        records_path = os.path.join(self.tmp.name, "compress.json")
+        stats = BuildStats()
+        compress_tree(self.root, stats=stats, records_path=records_path)
+        self.assertEqual(stats.compressed_dropped, len(variant_paths([tiny])))
+
+        stats = BuildStats()
+        compress_tree(self.root, stats=stats, records_path=records_path)
+        self.assertEqual(stats.compressed_dropped, 0)
+        self.assertEqual(stats.compressed_written, 0)
+
+        # until the source changes
+        write_file(tiny, "{}" * 200)
+        os.utime(tiny, ns=(1, 1))
+        compress_tree(self.root, stats=stats, records_path=records_path)
+        self.assertEqual(stats.compressed_written, len(variant_paths([tiny])))
+        self.assertTrue(os.path.exists(tiny + ".gz"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+import os
+import pickle
+import shutil
+import tempfile
+import time
+import unittest
+
+from block_markdown import generate_page
+from build_stats import BuildStats
+import content_cache
+from content_cache import ContentCache, MemoryContentCache
+
+
+class TestContentCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.cache = ContentCache(os.path.join(self.root, "cache"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        key = self.cache.key("# Title", "/")
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(
+            key,
+            "<div><h1>Title</h1></div>",
+            {"assets": {"/a.css": None}},
+            [["link", "/a"]],
+        )
+        self.assertEqual(
+            self.cache.get(key),
+            (
+                "<div><h1>Title</h1></div>",
+                {"assets": {"/a.css": None}},
+                [["link", "/a"]],
+            ),
+        )
+
+    def test_key_depends_on_basepath(self):
+        self.assertNotEqual(self.cache.key("# a", "/"), self.cache.key("# a", "/x/"))
+
+    def test_key_depends_on_renderer_source(self):
+        key = self.cache.key("# a")
+        content_cache.renderer_version.cache_clear()
+        original = content_cache.RENDERER_MODULES
+        content_cache.RENDERER_MODULES = original[:-1]
+        try:
+            self.assertNotEqual(self.cache.key("# a"), key)
+        finally:
+            content_cache.RENDERER_MODULES = original
+            content_cache.renderer_version.cache_clear()
+
+    def test_without_reads_only_stores(self):
+        key = self.cache.key("# Title")
+        self.cache.put(key, "<h1>old</h1>")
+        fresh = self.cache.without_reads()
+        self.assertIsNone(fresh.get(key))
+        fresh.put(key, "<h1>new</h1>")
+        self.assertEqual(self.cache.get(key), ("<h1>new</h1>", {}, []))
+
+    def test_evict_least_recently_used(self):
+        self.cache.max_bytes = 0
+        keys = [self.cache.key(str(i)) for i in range(3)]
+        for i, key in enumerate(keys):
+            self.cache.put(key, "x" * 100)
+            # give each entry a distinct, increasing mtime
+            path = self.cache._path(key)
+            os.utime(path, ns=(i * 10**9, i * 10**9))
+        entry_size = os.path.getsize(self.cache._path(keys[0]))
+        self.cache.max_bytes = entry_size * 2
+
+        self.assertEqual(self.cache.evict(), 1)
+        self.assertIsNone(self.cache.get(keys[0]))
+        self.assertIsNotNone(self.cache.get(keys[2]))
+
+    def test_generate_page_reuses_content_after_template_change(self):
+        md_path = os.path.join(self.root, "index.md")
+        template_path = os.path.join(self.root, "template.html")
+        dest_path = os.path.join(self.root, "out", "index.html")
+        with open(md_path, "w") as f:
+            f.write("# Title\n\ntext")
+        with open(template_path, "w") as f:
+            f.write("<main>{{ Content }}</main>")
+
+        stats = BuildStats()
+        generate_page(
+            md_path, template_path, dest_path, stats=stats, content_cache=self.cache
+        )
+        time.sleep(0.01)
+        with open(template_path, "w") as f:
+            f.write("<article>{{ Content }}</article>")
+        generate_page(
+            md_path, template_path, dest_path, stats=stats, content_cache=self.cache
+        )
+
+        self.assertEqual(stats.content_cache_misses, 1)
+        self.assertEqual(stats.content_cache_hits, 1)
+        with open(dest_path) as f:
+            self.assertEqual(
+                f.read(), "<article><div><h1>Title</h1><p>text</p></div></article>"
+            )
+
+
+class TestMemoryContentCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.tmp.name, "cache")
+        self.cache = MemoryContentCache(self.directory)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_served_from_memory_and_written_through(self):
+        key = self.cache.key("# Title")
+        self.cache.put(key, "<h1>Title</h1>")
+        self.assertEqual(ContentCache(self.directory).get(key), ("<h1>Title</h1>", {}, []))
+        shutil.rmtree(self.directory)
+        self.assertEqual(self.cache.get(key), ("<h1>Title</h1>", {}, []))
+
+    def test_memory_keeps_most_recently_used(self):
+        self.cache.max_bytes = 10
+        keys = [self.cache.key(str(i)) for i in range(3)]
+        for key in keys[:2]:
+            self.cache.put(key, "x" * 5)
+        self.cache.get(keys[0])
+        self.cache.put(keys[2], "x" * 5)
+        self.assertEqual(list(self.cache.fragments), [keys[0], keys[2]])
+        self.assertEqual(self.cache.memory_bytes, 10)
+
+    def test_without_reads_drops_fragments_in_memory(self):
+        key = self.cache.key("# Title")
+        self.cache.put(key, "<h1>Title</h1>")
+        self.assertIsNone(self.cache.without_reads().get(key))
+        self.assertEqual(self.cache.fragments, {})
+
+    def test_pickles_without_fragments(self):
+        key = self.cache.key("# Title")
+        self.cache.put(key, "<h1>Title</h1>")
+        copy = pickle.loads(pickle.dumps(self.cache))
+        self.assertEqual(copy.fragments, {})
+        self.assertEqual(copy.get(key), ("<h1>Title</h1>", {}, []))
+
+
+if __name__ == "__main__":
+    unittest.main()
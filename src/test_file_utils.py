@@ -0,0 +1,108 @@
+import os
+import tempfile
+import unittest
+
+from build_stats import BuildStats
+from file_utils import copy_directory, files_match, prune_outputs, write_if_changed
+from test_helpers import write_file
+
+
+class TestCopyDirectorySync(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.tmp.name, "static")
+        self.dst = os.path.join(self.tmp.name, "docs")
+        write_file(os.path.join(self.src, "index.css"), "body {}")
+        write_file(os.path.join(self.src, "images", "a.png"), "png")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def sync(self, **kwargs):
+        stats = BuildStats()
+        copy_directory(self.src, self.dst, sync=True, stats=stats, **kwargs)
+        return stats
+
+    def test_initial_sync_copies_everything(self):
+        stats = self.sync()
+        self.assertEqual(stats.assets_copied, 2)
+        self.assertTrue(
+            files_match(
+                os.path.join(self.src, "images", "a.png"),
+                os.path.join(self.dst, "images", "a.png"),
+            )
+        )
+
+    def test_unchanged_files_are_not_copied(self):
+        self.sync()
+        stats = self.sync()
+        self.assertEqual(stats.assets_copied, 0)
+        self.assertEqual(stats.assets_unchanged, 2)
+
+    def test_changed_file_is_copied(self):
+        self.sync()
+        write_file(os.path.join(self.src, "index.css"), "body { margin: 0 }")
+        stats = self.sync()
+        self.assertEqual(stats.assets_copied, 1)
+        with open(os.path.join(self.dst, "index.css")) as f:
+            self.assertEqual(f.read(), "body { margin: 0 }")
+
+    def test_orphans_deleted_and_kept_paths_preserved(self):
+        self.sync()
+        kept = os.path.join(self.dst, "blog", "index.html")
+        write_file(kept, "<p>page</p>")
+        write_file(os.path.join(self.dst, "blog", "old.html"), "old")
+        write_file(os.path.join(self.dst, "old.css"), "old")
+        stats = self.sync(keep=[kept])
+        self.assertEqual(stats.assets_deleted, 2)
+        self.assertTrue(os.path.exists(kept))
+        self.assertFalse(os.path.exists(os.path.join(self.dst, "old.css")))
+        self.assertFalse(os.path.exists(os.path.join(self.dst, "blog", "old.html")))
+
+    def test_sync_after_full_copy_copies_nothing(self):
+        copy_directory(self.src, self.dst)
+        stats = self.sync()
+        self.assertEqual(stats.assets_copied, 0)
+        self.assertEqual(stats.assets_unchanged, 2)
+
+    def test_checksum_detects_same_size_change(self):
+        self.sync()
+        path = os.path.join(self.src, "index.css")
+        st = os.stat(path)
+        write_file(path, "body {!")
+        # same size and mtime, only the content differs
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+        self.assertEqual(self.sync().assets_copied, 0)
+        self.assertEqual(self.sync(checksum=True).assets_copied, 1)
+
+
+class TestWriteIfChanged(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "index.html")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_writes_new_and_changed_files(self):
+        self.assertTrue(write_if_changed(self.path, b"one"))
+        self.assertTrue(write_if_changed(self.path, b"two"))
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), b"two")
+
+    def test_skips_identical_bytes(self):
+        write_if_changed(self.path, b"same")
+        self.assertFalse(write_if_changed(self.path, b"same"))
+
+
+class TestPruneOutputs(unittest.TestCase):
+    def test_prune_outputs(self):
+        with tempfile.TemporaryDirectory() as out:
+            write_file(os.path.join(out, "keep.html"), "")
+            write_file(os.path.join(out, "old", "drop.html"), "")
+            prune_outputs(out, [os.path.join(out, "keep.html")])
+            self.assertEqual(os.listdir(out), ["keep.html"])
+
+
+if __name__ == "__main__":
+    unittest.main()
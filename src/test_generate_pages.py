@@ -0,0 +1,308 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from block_cache import BlockCache
+from block_markdown import (
+    WRITER_MAX_MARKDOWN,
+    BuildError,
+    discover_pages,
+    generate_pages_recursive,
+)
+from build_manifest import BuildManifest
+from build_stats import BuildStats
+from content_cache import ContentCache
+from image_size import ImageSizes
+from link_check import LinkIndex
+from output_writer import OutputWriter
+from search_index import SearchStore
+from test_helpers import read_tree, write_file
+
+
+class TestGeneratePages(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.template = os.path.join(self.root, "template.html")
+        write_file(self.template, '<a href="/">{{ Title }}</a>{{ Content }}')
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\n**hi**")
+        write_file(os.path.join(self.content, "blog", "a", "index.md"), "# A\n\n- x")
+        write_file(os.path.join(self.content, "blog", "b", "index.md"), "# B\n\n> q")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_discover_pages_sorted(self):
+        out = os.path.join(self.root, "out")
+        pages = discover_pages(self.content, out)
+        self.assertEqual(
+            pages,
+            [
+                (
+                    os.path.join(self.content, "blog", "a", "index.md"),
+                    os.path.join(out, "blog", "a", "index.html"),
+                ),
+                (
+                    os.path.join(self.content, "blog", "b", "index.md"),
+                    os.path.join(out, "blog", "b", "index.html"),
+                ),
+                (
+                    os.path.join(self.content, "index.md"),
+                    os.path.join(out, "index.html"),
+                ),
+            ],
+        )
+
+    def test_parallel_matches_serial(self):
+        serial = os.path.join(self.root, "serial")
+        parallel = os.path.join(self.root, "parallel")
+        generate_pages_recursive(self.content, self.template, serial, "/site/")
+        generate_pages_recursive(
+            self.content, self.template, parallel, "/site/", jobs=2
+        )
+        self.assertEqual(read_tree(serial), read_tree(parallel))
+
+    def test_writer_matches_inline_writes(self):
+        inline = os.path.join(self.root, "inline")
+        queued = os.path.join(self.root, "queued")
+        generate_pages_recursive(self.content, self.template, inline, "/site/")
+        with OutputWriter(workers=2) as writer:
+            generate_pages_recursive(
+                self.content, self.template, queued, "/site/", writer=writer
+            )
+        self.assertEqual(read_tree(inline), read_tree(queued))
+
+    def test_large_pages_bypass_the_writer(self):
+        big = os.path.join(self.content, "big.md")
+        write_file(big, "# Big\n\n" + "word " * (WRITER_MAX_MARKDOWN // 5))
+        out = os.path.join(self.root, "out")
+        stats = BuildStats()
+        with OutputWriter(workers=2, stats=stats) as writer:
+            generate_pages_recursive(
+                self.content, self.template, out, stats=stats, writer=writer
+            )
+        self.assertEqual(stats.pages_rebuilt, 4)
+        self.assertEqual(stats.outputs_written, 3)
+        self.assertTrue(os.path.exists(os.path.join(out, "big.html")))
+
+    def test_parallel_skips_identical_outputs(self):
+        out = os.path.join(self.root, "out")
+        generate_pages_recursive(self.content, self.template, out, jobs=2)
+        path = os.path.join(out, "index.html")
+        os.utime(path, ns=(0, 0))
+        stats = BuildStats()
+        generate_pages_recursive(self.content, self.template, out, stats=stats, jobs=2)
+        self.assertEqual((stats.outputs_written, stats.outputs_unchanged), (0, 3))
+        self.assertEqual(os.stat(path).st_mtime_ns, 0)
+
+    def test_streamed_matches_whole_file(self):
+        whole = os.path.join(self.root, "whole")
+        streamed = os.path.join(self.root, "streamed")
+        write_file(
+            os.path.join(self.content, "code.md"),
+            "# Code\n\n```\nfirst\n\nsecond\n```\n\n[x](/x)\n",
+        )
+        generate_pages_recursive(self.content, self.template, whole, "/site/")
+        generate_pages_recursive(
+            self.content, self.template, streamed, "/site/", stream=True
+        )
+        self.assertEqual(read_tree(whole), read_tree(streamed))
+
+    def test_streamed_pages_use_the_manifest(self):
+        out = os.path.join(self.root, "out")
+        manifest = BuildManifest()
+        generate_pages_recursive(
+            self.content, self.template, out, manifest=manifest, stream=True
+        )
+        # drop the stats so only the source hash can skip the pages
+        for entry in manifest.entries.values():
+            del entry["stat"]
+        stats = BuildStats()
+        generate_pages_recursive(
+            self.content, self.template, out, "/", manifest, stats, stream=True
+        )
+        self.assertEqual(stats.pages_skipped, 3)
+
+    def test_search_terms_match_across_build_modes(self):
+        write_file(
+            os.path.join(self.content, "road.md"),
+            "# The Road\n\nThe [road](/road) goes on\n\n- the road\n",
+        )
+        cache = ContentCache(os.path.join(self.root, "cache"))
+        records = []
+        for name, options in [
+            ("serial", {}),
+            ("streamed", {"stream": True}),
+            ("parallel", {"jobs": 2}),
+            ("cache miss", {"content_cache": cache}),
+            ("cache hit", {"content_cache": cache}),
+        ]:
+            out = os.path.join(self.root, name)
+            search = SearchStore(os.path.join(self.root, name + " terms"), out)
+            generate_pages_recursive(
+                self.content, self.template, out, search=search, **options
+            )
+            records.append(search.get(os.path.join(out, "road.html")))
+
+        expected = {
+            "key": "road.html",
+            "title": "The Road",
+            "terms": {"the": 3, "road": 3, "goes": 1, "on": 1},
+        }
+        for record in records:
+            self.assertEqual(record, expected)
+
+    def test_link_targets_match_across_build_modes(self):
+        write_file(
+            os.path.join(self.content, "links.md"),
+            "# Links\n\n![map](/map.png) [a](/blog/a)\n\n```\n[no](/no)\n```\n",
+        )
+        cache = ContentCache(os.path.join(self.root, "cache"))
+        for name, options in [
+            ("serial", {}),
+            ("streamed", {"stream": True}),
+            ("parallel", {"jobs": 2}),
+            ("cache miss", {"content_cache": cache}),
+            ("cache hit", {"content_cache": cache}),
+        ]:
+            out = os.path.join(self.root, name)
+            links = LinkIndex()
+            generate_pages_recursive(
+                self.content, self.template, out, links=links, **options
+            )
+            self.assertEqual(
+                links.entries[os.path.join(out, "links.html")],
+                [["image", "/map.png"], ["link", "/blog/a"]],
+            )
+
+    def test_cached_content_keeps_targets_for_later_link_checks(self):
+        write_file(
+            os.path.join(self.content, "links.md"), "# Links\n\n`[no](/no)` [a](/a)"
+        )
+        cache = ContentCache(os.path.join(self.root, "cache"))
+        out = os.path.join(self.root, "out")
+        generate_pages_recursive(self.content, self.template, out, content_cache=cache)
+        # fragments cached by a build that didn't check links still carry them
+        links = LinkIndex()
+        stats = BuildStats()
+        generate_pages_recursive(
+            self.content,
+            self.template,
+            out,
+            stats=stats,
+            content_cache=cache,
+            links=links,
+        )
+        self.assertEqual(stats.content_cache_hits, 4)
+        self.assertEqual(
+            links.entries[os.path.join(out, "links.html")], [["link", "/a"]]
+        )
+
+    def test_image_sizes_rebuild_pages_that_use_them(self):
+        write_file(os.path.join(self.content, "img.md"), "# Img\n\n![a](/a.png)\n")
+        out = os.path.join(self.root, "out")
+        manifest = BuildManifest()
+        small = ImageSizes({"/a.png": [1, 2]})
+        generate_pages_recursive(
+            self.content, self.template, out, "/", manifest, images=small
+        )
+        with open(os.path.join(out, "img.html")) as f:
+            self.assertIn('width="1" height="2" loading="lazy"', f.read())
+
+        stats = BuildStats()
+        generate_pages_recursive(
+            self.content, self.template, out, "/", manifest, stats, images=small
+        )
+        self.assertEqual(stats.pages_skipped, 4)
+
+        stats = BuildStats()
+        resized = ImageSizes({"/a.png": [1, 2], "/b.png": [3, 4]})
+        generate_pages_recursive(
+            self.content, self.template, out, "/", manifest, stats, images=resized
+        )
+        self.assertEqual(stats.pages_rebuilt, 0)
+
+        # only the page showing the image is rebuilt
+        stats = BuildStats()
+        large = ImageSizes({"/a.png": [10, 20]})
+        generate_pages_recursive(
+            self.content, self.template, out, "/", manifest, stats, images=large
+        )
+        self.assertEqual((stats.pages_rebuilt, stats.pages_skipped), (1, 3))
+        with open(os.path.join(out, "img.html")) as f:
+            self.assertIn('width="10" height="20"', f.read())
+
+    def test_minified_output_matches_across_build_modes(self):
+        write_file(
+            os.path.join(self.content, "code.md"),
+            "# Code\n\n```\nfirst  line\n\n    indented\n```\n\n![a](/a.png)\n",
+        )
+        trees = []
+        for name, options in [
+            ("serial", {}),
+            ("streamed", {"stream": True}),
+            ("block cache", {"block_cache": BlockCache()}),
+        ]:
+            out = os.path.join(self.root, name)
+            generate_pages_recursive(
+                self.content, self.template, out, minify=True, **options
+            )
+            trees.append(read_tree(out))
+        self.assertEqual(trees[0], trees[1])
+        self.assertEqual(trees[0], trees[2])
+        self.assertEqual(
+            trees[0]["code.html"],
+            '<a href="/">Code</a><div><h1>Code</h1>'
+            "<pre><code>first  line\n\n    indented</code></pre>"
+            '<p><img src="/a.png" alt="a"></p></div>',
+        )
+
+    def test_parallel_updates_manifest(self):
+        out = os.path.join(self.root, "out")
+        manifest = BuildManifest()
+        stats = BuildStats()
+        generate_pages_recursive(
+            self.content, self.template, out, "/", manifest, stats, jobs=2
+        )
+        self.assertEqual(stats.pages_rebuilt, 3)
+        self.assertEqual(len(manifest.entries), 3)
+
+        stats = BuildStats()
+        generate_pages_recursive(
+            self.content, self.template, out, "/", manifest, stats, jobs=2
+        )
+        self.assertEqual(stats.pages_skipped, 3)
+
+    def test_parallel_logs_pages_in_discovery_order(self):
+        out = os.path.join(self.root, "out")
+        log = io.StringIO()
+        with contextlib.redirect_stdout(log):
+            generate_pages_recursive(self.content, self.template, out, jobs=2)
+        self.assertEqual(
+            [line.split()[3] for line in log.getvalue().splitlines()],
+            [source for source, _ in discover_pages(self.content, out)],
+        )
+
+    def test_parallel_aggregates_errors(self):
+        write_file(os.path.join(self.content, "bad1.md"), "no title here")
+        write_file(os.path.join(self.content, "bad2.md"), "# T\n\n**unclosed")
+        out = os.path.join(self.root, "out")
+        with self.assertRaises(BuildError) as ctx:
+            generate_pages_recursive(self.content, self.template, out, jobs=2)
+        failed = [path for path, _ in ctx.exception.failures]
+        self.assertEqual(
+            failed,
+            [
+                os.path.join(self.content, "bad1.md"),
+                os.path.join(self.content, "bad2.md"),
+            ],
+        )
+        # the valid pages are still generated
+        self.assertTrue(os.path.exists(os.path.join(out, "index.html")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,19 @@
+import os
+
+
+def write_file(path, text):
+    """write text to path, creating its directory first"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def read_tree(root):
+    """map the path of every file under root, relative to root, to its text"""
+    files = {}
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            with open(path) as f:
+                files[os.path.relpath(path, root)] = f.read()
+    return files
@@ -1,9 +1,13 @@
+import io
 import unittest
 
 from htmlnode import (
     HTMLNode,
     LeafNode,
     ParentNode,
+    apply_basepath,
+    apply_image_sizes,
+    minify_node,
     text_node_to_html_node,
 )
 from textnode import TextNode, TextType
@@ -107,6 +111,28 @@ class TestParentNode(unittest.TestCase):
         with self.assertRaises(ValueError):
             node.to_html()
 
+    def test_iter_html_matches_to_html(self):
+        node = ParentNode(
+            "div",
+            [
+                ParentNode("p", [LeafNode("b", "bold"), LeafNode(None, " text")]),
+                LeafNode("a", "link", {"href": "/x"}),
+            ],
+            {"id": "main"},
+        )
+        self.assertEqual("".join(node.iter_html()), node.to_html())
+
+    def test_write_html(self):
+        node = ParentNode("ul", [ParentNode("li", [LeafNode(None, "item")])])
+        fp = io.StringIO()
+        node.write_html(fp)
+        self.assertEqual(fp.getvalue(), "<ul><li>item</li></ul>")
+
+    def test_iter_html_no_children_raises(self):
+        node = ParentNode("div", [ParentNode("p", [])])
+        with self.assertRaises(ValueError):
+            "".join(node.iter_html())
+
 
 class TestTextNodeToHTMLNode(unittest.TestCase):
     def test_text(self):
@@ -153,5 +179,72 @@ class TestTextNodeToHTMLNode(unittest.TestCase):
         )
 
 
+class TestApplyBasepath(unittest.TestCase):
+    def test_rewrites_root_relative_urls(self):
+        node = ParentNode(
+            "p",
+            [
+                LeafNode("a", "home", {"href": "/blog/"}),
+                LeafNode("img", "", {"src": "/images/a.png", "alt": "a"}),
+                LeafNode("a", "ext", {"href": "https://example.com/"}),
+            ],
+        )
+        apply_basepath(node, "/site/")
+        self.assertEqual(
+            node.to_html(),
+            '<p><a href="/site/blog/">home</a><img src="/site/images/a.png" alt="a"></img>'
+            '<a href="https://example.com/">ext</a></p>',
+        )
+
+    def test_default_basepath_is_noop(self):
+        node = LeafNode("a", "home", {"href": "/"})
+        apply_basepath(node, "/")
+        self.assertEqual(node.props, {"href": "/"})
+
+
+class TestApplyImageSizes(unittest.TestCase):
+    def test_sizes_and_lazy_loading(self):
+        node = ParentNode(
+            "p",
+            [
+                LeafNode("img", "", {"src": "/images/a.png", "alt": "a"}),
+                LeafNode("img", "", {"src": "https://example.com/b.png", "alt": "b"}),
+                LeafNode("a", "link", {"href": "/images/a.png"}),
+            ],
+        )
+        apply_image_sizes(node, {"/images/a.png": [640, 480]})
+        apply_basepath(node, "/site/")
+        self.assertEqual(
+            node.to_html(),
+            '<p><img src="/site/images/a.png" alt="a" width="640" height="480" '
+            'loading="lazy" decoding="async"></img>'
+            '<img src="https://example.com/b.png" alt="b" loading="lazy" '
+            'decoding="async"></img><a href="/site/images/a.png">link</a></p>',
+        )
+
+
+class TestMinifyNode(unittest.TestCase):
+    def test_collapses_text_outside_pre(self):
+        node = ParentNode(
+            "div",
+            [
+                ParentNode("p", [LeafNode(None, "a  b\n c"), LeafNode("b", " x\t")]),
+                ParentNode("pre", [ParentNode("code", [LeafNode(None, "a  b\n  c")])]),
+            ],
+        )
+        self.assertEqual(
+            minify_node(node).to_html(),
+            "<div><p>a b c<b> x </b></p><pre><code>a  b\n  c</code></pre></div>",
+        )
+
+    def test_void_elements_lose_closing_tag(self):
+        node = ParentNode("p", [LeafNode("img", "", {"src": "/a.png", "alt": "a"})])
+        self.assertEqual(
+            minify_node(node).to_html(), '<p><img src="/a.png" alt="a"></p>'
+        )
+        leaf = minify_node(LeafNode("img", "", {"src": "/a.png"}))
+        self.assertEqual(leaf.to_html(), '<img src="/a.png">')
+
+
 if __name__ == "__main__":
     unittest.main()
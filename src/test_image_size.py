@@ -0,0 +1,108 @@
+import os
+import struct
+import tempfile
+import unittest
+
+from image_size import load_records, read_image_size, save_records, scan_image_sizes
+
+
+def write_bytes(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def png(width, height):
+    ihdr = struct.pack(">II", width, height) + b"\x08\x06\x00\x00\x00"
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + ihdr + b"\0" * 64
+
+
+def jpeg(width, height):
+    app0 = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\0" + b"\0" * 9
+    sof = b"\xff\xc2" + struct.pack(">HBHHB", 11, 8, height, width, 1) + b"\0" * 3
+    return b"\xff\xd8" + app0 + b"\xff" + sof + b"\xff\xda" + b"\0" * 64
+
+
+class TestReadImageSize(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def size_of(self, data):
+        path = os.path.join(self.root, "image")
+        write_bytes(path, data)
+        return read_image_size(path)
+
+    def test_png(self):
+        self.assertEqual(self.size_of(png(1100, 438)), (1100, 438))
+
+    def test_gif(self):
+        data = b"GIF89a" + struct.pack("<HH", 32, 16) + b"\0" * 32
+        self.assertEqual(self.size_of(data), (32, 16))
+
+    def test_jpeg_skips_segments_before_the_frame(self):
+        self.assertEqual(self.size_of(jpeg(800, 600)), (800, 600))
+
+    def test_webp(self):
+        riff = b"RIFF" + struct.pack("<I", 100) + b"WEBP"
+        lossy = (
+            riff + b"VP8 " + b"\0" * 7 + b"\x9d\x01\x2a" + struct.pack("<HH", 300, 200)
+        )
+        self.assertEqual(self.size_of(lossy + b"\0" * 8), (300, 200))
+
+        bits = (300 - 1) | (200 - 1) << 14
+        lossless = riff + b"VP8L" + b"\0" * 4 + b"\x2f" + bits.to_bytes(4, "little")
+        self.assertEqual(self.size_of(lossless + b"\0" * 8), (300, 200))
+
+        extended = (
+            riff
+            + b"VP8X"
+            + b"\0" * 8
+            + (300 - 1).to_bytes(3, "little")
+            + (200 - 1).to_bytes(3, "little")
+        )
+        self.assertEqual(self.size_of(extended + b"\0" * 8), (300, 200))
+
+    def test_unknown_and_truncated_files(self):
+        self.assertIsNone(self.size_of(b"<svg></svg>"))
+        self.assertIsNone(self.size_of(png(10, 10)[:20]))
+        self.assertIsNone(self.size_of(jpeg(10, 10)[:25]))
+
+
+class TestScanImageSizes(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.static = os.path.join(self.tmp.name, "static")
+        write_bytes(os.path.join(self.static, "images", "a.png"), png(20, 10))
+        write_bytes(os.path.join(self.static, "index.css"), b"body{}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_maps_urls_to_sizes(self):
+        images = scan_image_sizes(self.static)
+        self.assertEqual(images.sizes, {"/images/a.png": [20, 10]})
+        self.assertEqual(images.get("/images/a.png"), [20, 10])
+        self.assertEqual(images, scan_image_sizes(self.static))
+
+    def test_unchanged_images_reuse_recorded_sizes(self):
+        path = os.path.join(self.tmp.name, "sizes.json")
+        save_records(scan_image_sizes(self.static), path)
+        records = load_records(path)
+        # a recorded size is trusted while the size and mtime match
+        records["images/a.png"][2:] = [1, 1]
+        images = scan_image_sizes(self.static, records)
+        self.assertEqual(images.get("/images/a.png"), [1, 1])
+
+        image = os.path.join(self.static, "images", "a.png")
+        write_bytes(image, png(40, 30))
+        os.utime(image, ns=(1, 1))
+        images = scan_image_sizes(self.static, records)
+        self.assertEqual(images.get("/images/a.png"), [40, 30])
+
+
+if __name__ == "__main__":
+    unittest.main()
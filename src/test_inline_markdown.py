@@ -103,6 +103,23 @@ class TestSplitNode(unittest.TestCase):
             new_nodes,
         )
 
+    def test_split_links_passes_through_plain_text(self):
+        node = TextNode("no markup [here] at all", TextType.TEXT)
+        new_nodes = split_nodes_link([node])
+        self.assertIs(new_nodes[0], node)
+
+    def test_split_links_leaves_images_alone(self):
+        node = TextNode("an ![a](/a.png) and a [a](/a.png)", TextType.TEXT)
+        new_nodes = split_nodes_link([node])
+        self.assertListEqual(
+            [
+                TextNode("an ![a](/a.png) and a ", TextType.TEXT),
+                TextNode("a", TextType.LINK, "/a.png"),
+            ],
+            new_nodes,
+        )
+
+
 
 class TestMarkdownExtraction(unittest.TestCase):
     def test_extract_markdown_images(self):
@@ -333,6 +350,40 @@ class TestTextToTextNodes(unittest.TestCase):
             nodes,
         )
 
+    def test_markup_inside_bold_is_literal(self):
+        nodes = text_to_textnodes("**[link](/a) and _x_** after")
+        self.assertListEqual(
+            [
+                TextNode("[link](/a) and _x_", TextType.BOLD),
+                TextNode(" after", TextType.TEXT),
+            ],
+            nodes,
+        )
+
+    def test_image_directly_after_link(self):
+        nodes = text_to_textnodes("[a](/a)![b](/b.png)")
+        self.assertListEqual(
+            [
+                TextNode("a", TextType.LINK, "/a"),
+                TextNode("b", TextType.IMAGE, "/b.png"),
+            ],
+            nodes,
+        )
+
+    def test_many_links(self):
+        text = " ".join(f"[{i}](/p/{i})" for i in range(300))
+        nodes = text_to_textnodes(text)
+        self.assertEqual(len(nodes), 599)
+        self.assertEqual(nodes[-1], TextNode("299", TextType.LINK, "/p/299"))
+
+    def test_italic_overlapping_bold_raises(self):
+        with self.assertRaises(ValueError):
+            text_to_textnodes("*a **b** c*")
+
+    def test_emphasis_inside_code_raises(self):
+        with self.assertRaises(ValueError):
+            text_to_textnodes("`a_b`")
+
 
 if __name__ == "__main__":
     unittest.main()
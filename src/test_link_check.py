@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+
+from inline_markdown import text_to_textnodes
+from link_check import LinkIndex, extract_targets, resolves, site_paths
+from test_helpers import write_file
+
+
+class TestExtractTargets(unittest.TestCase):
+    def test_root_relative_links_and_images(self):
+        self.assertEqual(
+            extract_targets(
+                text_to_textnodes("![a](/a.png) [b](/b) [c](https://c.com) [d](d.html)")
+            ),
+            [["image", "/a.png"], ["link", "/b"]],
+        )
+
+    def test_ignores_inline_code_and_protocol_relative_urls(self):
+        text = "`[a](/a)` and [b](//cdn.example.com/b.js)"
+        self.assertEqual(extract_targets(text_to_textnodes(text)), [])
+
+
+class TestResolves(unittest.TestCase):
+    paths = {"index.html", "blog/tom/index.html", "contact.html", "images/a b.png"}
+
+    def test_directory_urls(self):
+        self.assertTrue(resolves("/", self.paths))
+        self.assertTrue(resolves("/blog/tom/", self.paths))
+        self.assertTrue(resolves("/blog/tom", self.paths))
+        self.assertFalse(resolves("/blog/", self.paths))
+
+    def test_pages_and_files(self):
+        self.assertTrue(resolves("/contact", self.paths))
+        self.assertTrue(resolves("/contact.html", self.paths))
+        self.assertTrue(resolves("/images/a%20b.png", self.paths))
+        self.assertFalse(resolves("/images/c.png", self.paths))
+
+    def test_query_and_fragment_are_ignored(self):
+        self.assertTrue(resolves("/blog/tom/?page=2#top", self.paths))
+
+
+class TestLinkIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_site_paths(self):
+        static = os.path.join(self.root, "static")
+        write_file(os.path.join(static, "images", "a.png"), "png")
+        dest = os.path.join(self.root, "docs")
+        outputs = [os.path.join(dest, "index.html"), os.path.join(dest, "b.html")]
+        self.assertEqual(
+            site_paths(dest, outputs, static), {"index.html", "b.html", "images/a.png"}
+        )
+
+    def test_broken_targets_per_page(self):
+        links = LinkIndex()
+        links.record("docs/index.html", [["link", "/a"], ["image", "/x.png"]])
+        links.record("docs/a.html", [["link", "/"]])
+        paths = {"index.html", "a.html"}
+        self.assertEqual(
+            links.broken(["docs/index.html", "docs/a.html"], paths),
+            {"docs/index.html": [["image", "/x.png"]]},
+        )
+        # a removed target breaks pages that weren't rebuilt
+        paths.remove("a.html")
+        self.assertEqual(
+            links.broken(["docs/index.html"], paths),
+            {"docs/index.html": [["link", "/a"], ["image", "/x.png"]]},
+        )
+
+    def test_save_drops_removed_pages(self):
+        path = os.path.join(self.root, "links.json")
+        links = LinkIndex(path)
+        links.record("docs/a.html", [["link", "/"]])
+        links.record("docs/b.html", [])
+        links.save(["docs/b.html"])
+        loaded = LinkIndex.load(path)
+        self.assertEqual(loaded.entries, {"docs/b.html": []})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,31 @@
+import unittest
+
+from minify import minify_html
+
+
+class TestMinifyHtml(unittest.TestCase):
+    def test_drops_whitespace_around_block_tags(self):
+        html = "<!doctype html>\n<html>\n  <body>\n    <p>hi</p>\n  </body>\n"
+        self.assertEqual(
+            minify_html(html), "<!doctype html><html><body><p>hi</p></body>"
+        )
+
+    def test_keeps_one_space_between_inline_tags(self):
+        self.assertEqual(
+            minify_html("<b>a</b>\n   <i>b</i>  and\n  <a>c</a>"),
+            "<b>a</b> <i>b</i> and <a>c</a>",
+        )
+
+    def test_preserves_pre_script_and_textarea(self):
+        html = "<pre>\n  a\n\n  b\n</pre>\n<script>\n  x  =  1\n</script>"
+        self.assertEqual(minify_html(html), html.replace("</pre>\n", "</pre>"))
+        html = "<textarea>  two  spaces </textarea>"
+        self.assertEqual(minify_html(html), html)
+
+    def test_strip(self):
+        self.assertEqual(minify_html("  <b>x</b>  "), "<b>x</b>")
+        self.assertEqual(minify_html("  <b>x</b>  ", strip=False), " <b>x</b> ")
+
+
+if __name__ == "__main__":
+    unittest.main()
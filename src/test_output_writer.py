@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+
+import profiler
+from build_stats import BuildStats
+from output_writer import OutputWriteError, OutputWriter
+
+
+class TestOutputWriter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_writes_pages_and_creates_directories(self):
+        paths = [os.path.join(self.root, "blog", f"{i}.html") for i in range(20)]
+        with OutputWriter(workers=3, max_pending=2) as writer:
+            for i, path in enumerate(paths):
+                writer.write(path, f"<p>{i}</p>")
+        for i, path in enumerate(paths):
+            with open(path) as f:
+                self.assertEqual(f.read(), f"<p>{i}</p>")
+
+    def test_identical_pages_are_not_rewritten(self):
+        path = os.path.join(self.root, "index.html")
+        with OutputWriter() as writer:
+            writer.write(path, "<p>same</p>")
+        os.utime(path, ns=(0, 0))
+
+        stats = BuildStats()
+        with OutputWriter(stats=stats) as writer:
+            writer.write(path, "<p>same</p>")
+        self.assertEqual(os.stat(path).st_mtime_ns, 0)
+        self.assertEqual((stats.outputs_written, stats.outputs_unchanged), (0, 1))
+
+    def test_failures_are_raised_on_close(self):
+        blocker = os.path.join(self.root, "file")
+        with open(blocker, "w") as f:
+            f.write("not a directory")
+        writer = OutputWriter()
+        writer.write(os.path.join(blocker, "index.html"), "<p></p>")
+        with self.assertRaises(OutputWriteError) as cm:
+            writer.close()
+        self.assertEqual(len(cm.exception.failures), 1)
+
+    def test_close_is_profiled_as_write(self):
+        p = profiler.BuildProfiler()
+        profiler.enable(p)
+        try:
+            with OutputWriter() as writer:
+                writer.write(os.path.join(self.root, "index.html"), "<p></p>")
+        finally:
+            profiler.disable()
+        self.assertEqual(set(p.totals), {"write"})
+        self.assertEqual(p.pages, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
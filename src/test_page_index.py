@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+
+from page_index import PageEntry, PageIndex, build_page_index
+from test_helpers import write_file
+
+
+class TestPageIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        write_file(os.path.join(self.content, "index.md"), "# Home")
+        write_file(os.path.join(self.content, "blog", "post.md"), "# Post")
+        write_file(os.path.join(self.content, "blog", "photo.png"), "png")
+        os.makedirs(os.path.join(self.content, "empty"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_index_lists_markdown_sorted(self):
+        pages = build_page_index(self.content, "out")
+        self.assertEqual(
+            [(page.source, page.output) for page in pages],
+            [
+                (
+                    os.path.join(self.content, "blog", "post.md"),
+                    os.path.join("out", "blog", "post.html"),
+                ),
+                (
+                    os.path.join(self.content, "index.md"),
+                    os.path.join("out", "index.html"),
+                ),
+            ],
+        )
+
+    def test_entries_carry_source_stat(self):
+        path = os.path.join(self.content, "index.md")
+        st = os.stat(path)
+        page = build_page_index(self.content, "out")[1]
+        self.assertEqual(
+            page,
+            PageEntry(
+                path, os.path.join("out", "index.html"), st.st_size, st.st_mtime_ns
+            ),
+        )
+        self.assertEqual(page.stat, (6, st.st_mtime_ns))
+
+    def test_many_files_in_one_directory(self):
+        flat = os.path.join(self.tmp.name, "flat")
+        os.makedirs(flat)
+        for i in range(2000):
+            with open(os.path.join(flat, f"page-{i:04}.md"), "w") as f:
+                f.write("# p")
+        pages = build_page_index(flat, "out")
+        self.assertEqual(len(pages), 2000)
+        self.assertEqual(pages[0].output, os.path.join("out", "page-0000.html"))
+
+    def test_page_index_refresh_matches_a_fresh_walk(self):
+        index = PageIndex(self.content, "out")
+        self.assertEqual(index.refresh(), build_page_index(self.content, "out"))
+
+        write_file(os.path.join(self.content, "empty", "new.md"), "# New")
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        write_file(os.path.join(self.content, "index.md"), "# Home, edited")
+        self.assertEqual(index.refresh(), build_page_index(self.content, "out"))
+
+
+if __name__ == "__main__":
+    unittest.main()
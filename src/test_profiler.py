@@ -0,0 +1,68 @@
+import json
+import os
+import tempfile
+import unittest
+
+import profiler
+from block_markdown import markdown_to_html_node
+from profiler import BuildProfiler
+
+
+class TestBuildProfiler(unittest.TestCase):
+    def test_nested_phases_are_exclusive(self):
+        p = BuildProfiler()
+        with p.page("a.md"):
+            with p.phase("block parse"):
+                with p.phase("inline parse"):
+                    pass
+        self.assertEqual(set(p.pages["a.md"]), {"block parse", "inline parse"})
+        self.assertAlmostEqual(sum(p.pages["a.md"].values()), sum(p.totals.values()))
+
+    def test_phase_outside_page_only_in_totals(self):
+        p = BuildProfiler()
+        with p.phase("static copy"):
+            pass
+        self.assertIn("static copy", p.totals)
+        self.assertEqual(p.pages, {})
+
+    def test_merge(self):
+        a = BuildProfiler()
+        a.add("x.md", "read", 1.0)
+        b = BuildProfiler()
+        b.add("x.md", "read", 2.0)
+        b.add("y.md", "write", 0.5)
+        a.merge(b.records())
+        self.assertEqual(a.pages, {"x.md": {"read": 3.0}, "y.md": {"write": 0.5}})
+        self.assertEqual(a.totals, {"read": 3.0, "write": 0.5})
+
+    def test_summary_lists_slowest_page_first(self):
+        p = BuildProfiler()
+        p.add("fast.md", "read", 0.001)
+        p.add("slow.md", "render", 0.5)
+        summary = p.summary()
+        self.assertLess(summary.index("slow.md"), summary.index("fast.md"))
+
+    def test_dump(self):
+        p = BuildProfiler()
+        p.add("a.md", "write", 0.25)
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "trace.json")
+            p.dump(path)
+            with open(path) as f:
+                trace = json.load(f)
+        self.assertEqual(trace["pages"], {"a.md": {"write": 0.25}})
+        self.assertEqual(trace["total_seconds"], 0.25)
+
+    def test_module_level_hooks(self):
+        p = BuildProfiler()
+        profiler.enable(p)
+        try:
+            markdown_to_html_node("# Title\n\nSome **bold** text")
+        finally:
+            profiler.disable()
+        self.assertEqual(set(p.totals), {"block parse", "inline parse"})
+        self.assertFalse(profiler.is_enabled())
+
+
+if __name__ == "__main__":
+    unittest.main()
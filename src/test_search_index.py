@@ -0,0 +1,197 @@
+import json
+import os
+import tempfile
+import unittest
+from collections import Counter
+
+from search_index import SearchStore, page_url, tokenize, write_search_index
+
+
+def read_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def decode(flat):
+    """turn a delta encoded posting list back into {page id: count}"""
+    postings = {}
+    page_id = 0
+    for i in range(0, len(flat), 2):
+        page_id += flat[i]
+        postings[page_id] = flat[i + 1]
+    return postings
+
+
+class TestTokenize(unittest.TestCase):
+    def test_lowercases_and_splits_on_punctuation(self):
+        self.assertEqual(
+            tokenize("# The **Ring**-bearer, of_2"),
+            ["the", "ring", "bearer", "of"],
+        )
+
+    def test_keeps_link_labels_but_not_urls(self):
+        self.assertEqual(
+            tokenize("see [the shire](https://example.com/shire) ![map](/map.png)"),
+            ["see", "the", "shire", "map"],
+        )
+
+    def test_unicode_words(self):
+        self.assertEqual(tokenize("Éowyn naïve"), ["éowyn", "naïve"])
+
+
+class TestPageUrl(unittest.TestCase):
+    def test_index_pages_map_to_directories(self):
+        self.assertEqual(page_url("index.html", "/site/"), "/site/")
+        self.assertEqual(page_url("blog/a/index.html", "/"), "/blog/a/")
+        self.assertEqual(page_url("about.html", "/"), "/about.html")
+
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.site = os.path.join(self.root, "docs")
+        self.out = os.path.join(self.site, "search")
+        self.store = SearchStore(os.path.join(self.root, "store"), self.site)
+        self.pages = {
+            "index.html": ("Home", Counter({"ring": 2, "shire": 1})),
+            "blog/a/index.html": ("A", Counter({"ring": 1, "river": 3})),
+        }
+        for rel_path, (title, terms) in self.pages.items():
+            self.store.put(os.path.join(self.site, rel_path), title, terms)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def outputs(self):
+        return [os.path.join(self.site, rel_path) for rel_path in self.pages]
+
+    def search(self, term):
+        meta = read_json(os.path.join(self.out, "meta.json"))
+        prefix = term[: meta["prefix_length"]]
+        if prefix not in meta["prefixes"]:
+            return {}
+        shard = read_json(os.path.join(self.out, "terms", f"{prefix}.json"))
+        pages = read_json(os.path.join(self.out, "pages", "0.json"))
+        return {
+            pages[str(page_id)][0]: count
+            for page_id, count in decode(shard.get(term, [])).items()
+        }
+
+    def test_postings_point_at_pages(self):
+        write_search_index(self.store, self.outputs(), self.out)
+        self.assertEqual(self.search("ring"), {"/": 2, "/blog/a/": 1})
+        self.assertEqual(self.search("river"), {"/blog/a/": 3})
+        self.assertEqual(self.search("mordor"), {})
+
+    def test_terms_are_sharded_by_prefix(self):
+        write_search_index(self.store, self.outputs(), self.out)
+        shard = read_json(os.path.join(self.out, "terms", "ri.json"))
+        self.assertEqual(sorted(shard), ["ring", "river"])
+        shard = read_json(os.path.join(self.out, "terms", "sh.json"))
+        self.assertEqual(sorted(shard), ["shire"])
+
+    def test_ids_are_stable_across_additions_and_removals(self):
+        write_search_index(self.store, self.outputs(), self.out)
+        ring = read_json(os.path.join(self.out, "terms", "ri.json"))["ring"]
+
+        # a page sorting first is added, another removed
+        del self.pages["index.html"]
+        self.pages["a.html"] = ("New", Counter({"shire": 1}))
+        self.store.put(os.path.join(self.site, "a.html"), *self.pages["a.html"])
+        self.assertEqual(self.store.prune(self.outputs()), 1)
+        write_search_index(self.store, self.outputs(), self.out)
+
+        self.assertEqual(self.search("shire"), {"/a.html": 1})
+        self.assertEqual(self.search("ring"), {"/blog/a/": 1})
+        # the remaining page kept its id, the new one got a fresh id
+        pages = read_json(os.path.join(self.out, "pages", "0.json"))
+        self.assertEqual(pages["0"][0], "/blog/a/")
+        self.assertEqual(pages["2"][0], "/a.html")
+        self.assertEqual(ring, [0, 1, 1, 2])
+        self.assertEqual(
+            read_json(os.path.join(self.out, "terms", "ri.json"))["ring"], [0, 1]
+        )
+
+    def test_unchanged_shards_are_not_rewritten(self):
+        write_search_index(self.store, self.outputs(), self.out)
+        shire = os.path.join(self.out, "terms", "sh.json")
+        os.utime(shire, ns=(1, 1))
+
+        terms = Counter({"ring": 5, "shire": 1})
+        self.store.put(os.path.join(self.site, "index.html"), "Home", terms)
+        write_search_index(self.store, self.outputs(), self.out)
+        self.assertEqual(os.stat(shire).st_mtime_ns, 1)
+        self.assertEqual(self.search("ring")["/"], 5)
+
+    def test_empty_shards_are_removed(self):
+        write_search_index(self.store, self.outputs(), self.out)
+        self.store.put(os.path.join(self.site, "index.html"), "Home", Counter())
+        write_search_index(self.store, self.outputs(), self.out)
+        self.assertFalse(os.path.exists(os.path.join(self.out, "terms", "sh.json")))
+        meta = read_json(os.path.join(self.out, "meta.json"))
+        self.assertNotIn("sh", meta["prefixes"])
+
+    def test_unchanged_pages_are_not_read_again(self):
+        write_search_index(self.store, self.outputs(), self.out)
+        # a record the update would choke on, if it read it
+        path = self.store._path("blog/a/index.html")
+        with open(path, "w") as f:
+            f.write("not json")
+
+        terms = Counter({"ring": 5, "mordor": 1})
+        self.store.put(os.path.join(self.site, "index.html"), "Home", terms)
+        write_search_index(self.store, self.outputs(), self.out)
+        self.assertEqual(self.search("ring"), {"/": 5, "/blog/a/": 1})
+        self.assertEqual(self.search("river"), {"/blog/a/": 3})
+        self.assertEqual(self.search("shire"), {})
+        self.assertEqual(self.search("mordor"), {"/": 1})
+
+    def test_incremental_update_matches_full_rebuild(self):
+        write_search_index(self.store, self.outputs(), self.out)
+        self.pages["blog/a/index.html"] = ("A2", Counter({"river": 1, "elf": 2}))
+        self.pages["b.html"] = ("B", Counter({"ring": 4}))
+        del self.pages["index.html"]
+        for rel_path in ("blog/a/index.html", "b.html"):
+            self.store.put(os.path.join(self.site, rel_path), *self.pages[rel_path])
+        self.store.prune(self.outputs())
+        write_search_index(self.store, self.outputs(), self.out)
+        updated = {
+            rel_path: read_json(os.path.join(self.out, rel_path))
+            for rel_path in ("meta.json", "pages/0.json", "terms/ri.json")
+        }
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(self.out, "terms"))),
+            ["el.json", "ri.json"],
+        )
+
+        # a different basepath rebuilds the whole index
+        write_search_index(self.store, self.outputs(), self.out, "/x/")
+        write_search_index(self.store, self.outputs(), self.out)
+        for rel_path, data in updated.items():
+            self.assertEqual(read_json(os.path.join(self.out, rel_path)), data)
+
+    def test_identical_records_are_not_marked_changed(self):
+        write_search_index(self.store, self.outputs(), self.out)
+        self.store.put(os.path.join(self.site, "index.html"), *self.pages["index.html"])
+        self.assertEqual(list(self.store.changes()), [])
+
+    def test_records_imported_from_a_shard_are_indexed(self):
+        write_search_index(self.store, self.outputs(), self.out)
+        shard_dir = os.path.join(self.root, "shard")
+        shard = SearchStore(os.path.join(shard_dir, ".search"), shard_dir)
+        terms = Counter({"river": 1, "elf": 1})
+        shard.put(os.path.join(shard_dir, "blog/a/index.html"), "A", terms)
+        shard.put(os.path.join(shard_dir, "index.html"), *self.pages["index.html"])
+
+        self.assertEqual(self.store.import_records(shard), 2)
+        write_search_index(self.store, self.outputs(), self.out)
+        self.assertEqual(self.search("river"), {"/blog/a/": 1})
+        self.assertEqual(self.search("elf"), {"/blog/a/": 1})
+        self.assertEqual(self.search("shire"), {"/": 1})
+        # and nothing is copied again until the shard changes
+        self.assertEqual(self.store.import_records(shard), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+import os
+import tempfile
+import unittest
+
+from block_markdown import generate_pages_recursive
+from page_index import build_page_index
+from shard import (
+    SHARD_SEARCH_DIR,
+    IncompleteMergeError,
+    ShardConflictError,
+    merge_shards,
+    parse_shard,
+    select_shard,
+    shard_of,
+)
+from test_helpers import read_tree, write_file
+
+
+class TestShard(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.static = os.path.join(self.root, "static")
+        self.template = os.path.join(self.root, "template.html")
+        write_file(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        write_file(os.path.join(self.static, "index.css"), "body {}")
+        for i in range(12):
+            write_file(
+                os.path.join(self.content, f"section-{i % 3}", f"{i}.md"), f"# {i}"
+            )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("2/4"), (2, 4))
+        for text in ("0/4", "5/4", "1", "a/b", "1/0"):
+            with self.assertRaises(ValueError):
+                parse_shard(text)
+
+    def test_shard_of_ignores_checkout_location(self):
+        self.assertEqual(
+            shard_of(os.path.join("blog", "a.md"), 7), shard_of("blog/a.md", 7)
+        )
+
+    def test_shards_partition_the_index(self):
+        pages = build_page_index(self.content, "out")
+        shards = [select_shard(pages, self.content, i, 3) for i in (1, 2, 3)]
+        sources = [page.source for shard in shards for page in shard]
+        self.assertEqual(sorted(sources), [page.source for page in pages])
+
+    def test_merged_shards_match_full_build(self):
+        full = os.path.join(self.root, "full")
+        generate_pages_recursive(self.content, self.template, full)
+        write_file(os.path.join(full, "index.css"), "body {}")
+
+        shard_dirs = []
+        for i in (1, 2, 3):
+            shard_dir = os.path.join(self.root, "shards", str(i))
+            pages = build_page_index(self.content, shard_dir)
+            pages = select_shard(pages, self.content, i, 3)
+            generate_pages_recursive(
+                self.content, self.template, shard_dir, pages=pages
+            )
+            shard_dirs.append(shard_dir)
+
+        dest = os.path.join(self.root, "docs")
+        write_file(os.path.join(dest, "stale.html"), "old")
+        outputs = [
+            os.path.relpath(page.output, dest)
+            for page in build_page_index(self.content, dest)
+        ]
+        merge_shards(shard_dirs, self.static, dest, pages=outputs)
+        self.assertEqual(read_tree(dest), read_tree(full))
+
+    def test_conflicting_outputs_are_rejected(self):
+        a = os.path.join(self.root, "a")
+        b = os.path.join(self.root, "b")
+        write_file(os.path.join(a, "index.html"), "a")
+        write_file(os.path.join(b, "index.html"), "b")
+        write_file(os.path.join(b, "index.css"), "shadows a static file")
+        dest = os.path.join(self.root, "docs")
+
+        with self.assertRaises(ShardConflictError) as cm:
+            merge_shards([a, b], self.static, dest)
+        self.assertEqual(
+            [path for path, _ in cm.exception.conflicts], ["index.css", "index.html"]
+        )
+        self.assertFalse(os.path.exists(dest))
+
+    def test_missing_shard_dir_is_rejected(self):
+        shard_dir = os.path.join(self.root, "shards", "1")
+        write_file(os.path.join(shard_dir, "a.html"), "a")
+        dest = os.path.join(self.root, "docs")
+        write_file(os.path.join(dest, "b.html"), "built by shard 2")
+        typo = os.path.join(self.root, "shrads", "2")
+
+        with self.assertRaises(IncompleteMergeError) as cm:
+            merge_shards([shard_dir, typo], self.static, dest)
+        self.assertEqual(cm.exception.missing_dirs, [typo])
+        self.assertEqual(read_tree(dest), {"b.html": "built by shard 2"})
+
+    def test_pages_missing_from_every_shard_are_rejected(self):
+        shard_dir = os.path.join(self.root, "shards", "1")
+        write_file(os.path.join(shard_dir, "a.html"), "a")
+        dest = os.path.join(self.root, "docs")
+        write_file(os.path.join(dest, "b.html"), "built by shard 2")
+
+        with self.assertRaises(IncompleteMergeError) as cm:
+            merge_shards([shard_dir], self.static, dest, pages=["a.html", "b.html"])
+        self.assertEqual(cm.exception.missing_pages, ["b.html"])
+        self.assertEqual(read_tree(dest), {"b.html": "built by shard 2"})
+
+    def test_current_variants_and_kept_files_survive_a_merge(self):
+        shard_dir = os.path.join(self.root, "shards", "1")
+        write_file(os.path.join(shard_dir, "a.html"), "a")
+        write_file(os.path.join(shard_dir, "b.html"), "b")
+        write_file(os.path.join(shard_dir, SHARD_SEARCH_DIR, "record"), "{}")
+        dest = os.path.join(self.root, "docs")
+        merge_shards([shard_dir], self.static, dest)
+        write_file(os.path.join(dest, "a.html.gz"), "current")
+        write_file(os.path.join(dest, "b.html.gz"), "stale")
+        write_file(os.path.join(dest, "search", "meta.json"), "{}")
+        for name in ("a.html", "b.html"):
+            st = os.stat(os.path.join(dest, name))
+            os.utime(os.path.join(dest, name + ".gz"), ns=(0, st.st_mtime_ns))
+        write_file(os.path.join(shard_dir, "b.html"), "b2")
+
+        merge_shards(
+            [shard_dir],
+            self.static,
+            dest,
+            keep=[os.path.join("search", "meta.json")],
+            keep_variants=True,
+        )
+        self.assertEqual(
+            sorted(read_tree(dest)),
+            ["a.html", "a.html.gz", "b.html", "index.css", "search/meta.json"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+
+from htmlnode import LeafNode, ParentNode
+from template import Template, load_template
+
+
+class TestTemplate(unittest.TestCase):
+    def test_render_slots(self):
+        template = Template("<title>{{ Title }}</title><main>{{ Content }}</main>")
+        self.assertEqual(
+            template.render(Title="Hi", Content="<p>x</p>"),
+            "<title>Hi</title><main><p>x</p></main>",
+        )
+
+    def test_render_repeated_slot(self):
+        template = Template("{{ Title }}|{{ Title }}")
+        self.assertEqual(template.render(Title="a"), "a|a")
+
+    def test_unknown_slot_left_untouched(self):
+        template = Template("{{ Title }} {{ Other }}")
+        self.assertEqual(template.render(Title="a"), "a {{ Other }}")
+
+    def test_basepath_rewritten_in_static_segments(self):
+        template = Template(
+            '<link href="/index.css" /><img src="/a.png" />{{ Content }}', "/site/"
+        )
+        self.assertEqual(
+            template.render(Content='<a href="/x">'),
+            '<link href="/site/index.css" /><img src="/site/a.png" /><a href="/x">',
+        )
+
+    def test_slot_values_not_rewritten(self):
+        template = Template("{{ Title }}", "/site/")
+        self.assertEqual(template.render(Title='href="/'), 'href="/')
+
+    def test_iter_render_streams_nodes(self):
+        template = Template("<title>{{ Title }}</title><main>{{ Content }}</main>")
+        node = ParentNode("p", [LeafNode("b", "x")])
+        self.assertEqual(
+            "".join(template.iter_render(Title="Hi", Content=node)),
+            template.render(Title="Hi", Content=node.to_html()),
+        )
+
+    def test_load_template_cached_until_changed(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "template.html")
+            with open(path, "w") as f:
+                f.write("{{ Content }}")
+            first = load_template(path)
+            self.assertIs(load_template(path), first)
+
+            with open(path, "w") as f:
+                f.write("<main>{{ Content }}</main>")
+            second = load_template(path)
+            self.assertIsNot(second, first)
+            self.assertEqual(second.render(Content="x"), "<main>x</main>")
+
+    def test_minify_collapses_static_segments(self):
+        source = "<html>\n  <head>\n    <title>{{ Title }}</title>\n  </head>\n"
+        source += "  <body>\n    <b>{{ Title }}</b> <i>x</i>\n  </body>\n</html>\n"
+        template = Template(source, minify=True)
+        self.assertEqual(
+            template.render(Title="Hi"),
+            "<html><head><title>Hi</title></head>"
+            "<body><b>Hi</b> <i>x</i></body></html>",
+        )
+        self.assertNotEqual(template.digest, Template(source).digest)
+
+
+if __name__ == "__main__":
+    unittest.main()
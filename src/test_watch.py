@@ -0,0 +1,98 @@
+import os
+import tempfile
+import unittest
+
+from build_manifest import BuildManifest
+from build_stats import BuildStats
+from content_cache import ContentCache
+from test_helpers import write_file
+from watch import SiteWatcher, diff_snapshots
+
+
+class TestDiffSnapshots(unittest.TestCase):
+    def test_added_modified_removed(self):
+        old = {"a": (1, 1), "b": (1, 1), "c": (1, 1)}
+        new = {"a": (1, 1), "b": (2, 1), "d": (1, 1)}
+        self.assertEqual(diff_snapshots(old, new), ["b", "c", "d"])
+
+
+class TestSiteWatcher(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.template = os.path.join(root, "template.html")
+        self.dest = os.path.join(root, "docs")
+        write_file(self.template, "{{ Content }}")
+        write_file(os.path.join(self.content, "a.md"), "# A")
+        write_file(os.path.join(self.content, "b.md"), "# B")
+        write_file(os.path.join(self.static, "index.css"), "body {}")
+        self.stats = BuildStats()
+        self.watcher = SiteWatcher(
+            self.content,
+            self.static,
+            self.template,
+            self.dest,
+            manifest=BuildManifest(),
+            stats=self.stats,
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read(self, *parts):
+        with open(os.path.join(self.dest, *parts)) as f:
+            return f.read()
+
+    def test_content_change_rebuilds_only_that_page(self):
+        path = os.path.join(self.content, "a.md")
+        write_file(path, "# A2")
+        self.watcher.rebuild([path])
+        self.assertEqual(self.read("a.html"), "<div><h1>A2</h1></div>")
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "b.html")))
+
+    def test_template_change_rebuilds_all_pages(self):
+        self.watcher.rebuild([self.template])
+        self.assertEqual(self.stats.pages_rebuilt, 2)
+
+    def test_static_change_copies_asset(self):
+        path = os.path.join(self.static, "index.css")
+        self.watcher.rebuild([path])
+        self.assertEqual(self.read("index.css"), "body {}")
+        self.assertEqual(self.stats.pages_rebuilt, 0)
+
+    def test_removed_page_is_deleted(self):
+        path = os.path.join(self.content, "a.md")
+        self.watcher.rebuild([path])
+        os.remove(path)
+        self.watcher.rebuild([path])
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "a.html")))
+
+    def test_removed_page_is_deleted_with_template_change(self):
+        path = os.path.join(self.content, "a.md")
+        self.watcher.rebuild([path])
+        os.remove(path)
+        self.watcher.rebuild([self.template, path])
+        a_html = os.path.join(self.dest, "a.html")
+        self.assertFalse(os.path.exists(a_html))
+        self.assertNotIn(a_html, self.watcher.manifest.entries)
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "b.html")))
+
+    def test_template_change_reuses_cached_content(self):
+        self.watcher.content_cache = ContentCache(os.path.join(self.tmp.name, "cache"))
+        self.watcher.rebuild([self.template])
+        write_file(self.template, "<main>{{ Content }}</main>")
+        self.watcher.rebuild([self.template])
+        self.assertEqual(self.stats.content_cache_hits, 2)
+        self.assertEqual(self.read("a.html"), "<main><div><h1>A</h1></div></main>")
+
+    def test_poll_reports_changes(self):
+        self.assertEqual(self.watcher.poll(), [])
+        path = os.path.join(self.content, "new.md")
+        write_file(path, "# New")
+        self.assertEqual(self.watcher.poll(), [path])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -13,6 +13,8 @@ class TextType(Enum):
 class TextNode:
     """represents a single text node with type and optional url"""
 
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text, text_type, url=None):
         self.text = text
         self.text_type = text_type
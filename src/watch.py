@@ -0,0 +1,184 @@
+import functools
+import os
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from block_markdown import generate_page, generate_pages_recursive
+from file_utils import copy_file
+
+
+def snapshot(paths):
+    """map every file under paths to its (mtime, size)"""
+    files = {}
+    stack = list(paths)
+    while stack:
+        path = stack.pop()
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        if os.path.isdir(path):
+            with os.scandir(path) as entries:
+                stack.extend(entry.path for entry in entries)
+        else:
+            files[path] = (st.st_mtime_ns, st.st_size)
+    return files
+
+
+def diff_snapshots(old, new):
+    """return the sorted paths that were added, modified or removed"""
+    changed = {path for path in new if old.get(path) != new[path]}
+    changed.update(path for path in old if path not in new)
+    return sorted(changed)
+
+
+class SiteWatcher:
+    """rebuilds only the outputs affected by each changed source file"""
+
+    def __init__(
+        self,
+        content_dir,
+        static_dir,
+        template_path,
+        dest_dir,
+        basepath="/",
+        manifest=None,
+        stats=None,
+        block_cache=None,
+        content_cache=None,
+        stream=False,
+        jobs=1,
+    ):
+        self.content_dir = content_dir
+        self.static_dir = static_dir
+        self.template_path = template_path
+        self.dest_dir = dest_dir
+        self.basepath = basepath
+        self.manifest = manifest
+        self.stats = stats
+        # kept warm across rebuilds, so a template edit only re-renders
+        # blocks that weren't seen before
+        self.block_cache = block_cache
+        # the rest of the build's options, so rebuilt pages come out the
+        # same as a full build would write them
+        self.content_cache = content_cache
+        self.stream = stream
+        self.jobs = jobs
+        self.files = snapshot(self.watched_paths())
+
+    def watched_paths(self):
+        return [self.content_dir, self.static_dir, self.template_path]
+
+    def poll(self):
+        """return files changed since the last poll"""
+        files = snapshot(self.watched_paths())
+        changed = diff_snapshots(self.files, files)
+        self.files = files
+        return changed
+
+    def rebuild(self, changed):
+        """update docs for a batch of changed source files"""
+        pages = [
+            path
+            for path in changed
+            if _is_under(path, self.content_dir) and path.endswith(".md")
+        ]
+        if self.template_path in changed:
+            # every page embeds the template, pages deleted in the same
+            # batch still need their outputs removed
+            for path in pages:
+                if not os.path.exists(path):
+                    self.rebuild_page(path)
+            generate_pages_recursive(
+                self.content_dir,
+                self.template_path,
+                self.dest_dir,
+                self.basepath,
+                self.manifest,
+                self.stats,
+                jobs=self.jobs,
+                content_cache=self.content_cache,
+                block_cache=self.block_cache,
+                stream=self.stream,
+            )
+        else:
+            for path in pages:
+                self.rebuild_page(path)
+
+        for path in changed:
+            if _is_under(path, self.static_dir):
+                self.sync_asset(path)
+
+        if self.manifest is not None:
+            self.manifest.save()
+        if self.content_cache is not None:
+            self.content_cache.evict()
+
+    def rebuild_page(self, md_path):
+        rel_path = os.path.relpath(md_path, self.content_dir)
+        dest_path = os.path.join(self.dest_dir, rel_path[:-3] + ".html")
+        if os.path.exists(md_path):
+            generate_page(
+                md_path,
+                self.template_path,
+                dest_path,
+                self.basepath,
+                self.manifest,
+                self.stats,
+                content_cache=self.content_cache,
+                block_cache=self.block_cache,
+                stream=self.stream,
+            )
+        else:
+            _remove(dest_path)
+            if self.manifest is not None:
+                self.manifest.discard(dest_path)
+
+    def sync_asset(self, static_path):
+        rel_path = os.path.relpath(static_path, self.static_dir)
+        dest_path = os.path.join(self.dest_dir, rel_path)
+        if os.path.exists(static_path):
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            copy_file(static_path, dest_path)
+            print(f"Copied file: {static_path} -> {dest_path}")
+        else:
+            _remove(dest_path)
+
+    def run(self, interval=0.5):
+        """poll forever, rebuilding and logging latency for each change"""
+        while True:
+            time.sleep(interval)
+            changed = self.poll()
+            if not changed:
+                continue
+
+            start = time.perf_counter()
+            try:
+                self.rebuild(changed)
+            except Exception as e:
+                # keep watching, the next save will most likely fix it
+                print(f"Rebuild failed: {e}")
+                continue
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"Rebuilt {', '.join(changed)} in {elapsed:.1f} ms")
+
+
+def serve(directory, port=8888):
+    """serve directory over http from a background thread"""
+    handler = functools.partial(SimpleHTTPRequestHandler, directory=directory)
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    print(f"Serving {directory} at http://127.0.0.1:{port}/")
+    return server
+
+
+def _is_under(path, directory):
+    return os.path.commonpath([path, directory]) == directory
+
+
+def _remove(path):
+    if os.path.exists(path):
+        os.remove(path)
+        print(f"Deleted: {path}")